@@ -0,0 +1,301 @@
+import re
+import logging
+from itertools import islice
+from typing import Iterator, List, Dict, Any, Optional
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+
+from interfaces import ILineSource
+from log_file_parser import LogFileParser
+
+logger = logging.getLogger(__name__)
+
+
+class ArrowLogFileParser(LogFileParser):
+    """
+    Vectorized parse engine built on Arrow compute kernels.
+
+    The gzipped log is streamed through pyarrow.csv.open_csv in blocks, one raw line per value,
+    and every step of LogFileParser.parse_row (literal '\\t' replacement, strip/split, resource
+    prefix, accession, filename and completeness filters, timestamp parsing and value cleaning)
+    runs over whole columns instead of per row. The output is identical to LogFileParser.
+    """
+
+    BLOCK_SIZE = 16 * 1024 * 1024  # Bytes of uncompressed log text per Arrow block
+    SOURCE_BLOCK_LINES = 65536  # Lines per Arrow block when parsing a line source
+    LINE_DELIMITER = '\x01'  # Never present in the logs, so each line is read as a single value
+    COLUMN_COUNT = 13
+    TIMESTAMP_LAYOUT = r"^\d{4}-\d{2}-\d{2}T([01]\d|2[0-3]):[0-5]\d:[0-5]\d\.\d{1,6}$"
+
+    def __init__(
+        self,
+        file_path: str,
+        resource_list: List[str],
+        completeness_list: List[str],
+        accession_pattern_list: List[str],
+        columns: Optional[List[str]] = None
+    ) -> None:
+        super().__init__(file_path, resource_list, completeness_list, accession_pattern_list, columns)
+        self._completeness_values = pa.array(sorted(self.completeness), type=pa.string())
+        self._arrow_accession_patterns: Optional[List[str]] = self._compile_arrow_patterns(self._accession_patterns)
+
+    @staticmethod
+    def _compile_arrow_patterns(accession_patterns: List[re.Pattern]) -> Optional[List[str]]:
+        """
+        Translate the compiled accession patterns into RE2 patterns with a named group for extract_regex.
+        Returns None when a pattern is not supported by RE2, in which case accessions are
+        resolved with LogFileParser.get_accession on the rows that survived the other filters.
+        """
+        patterns = []
+        for pattern in accession_patterns:
+            arrow_pattern = f"(?P<accession>{pattern.pattern})"
+            try:
+                pc.extract_regex(pa.array([], type=pa.string()), pattern=arrow_pattern)
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+                logger.warning("Accession pattern not supported by Arrow, using Python regex",
+                               extra={"pattern": pattern.pattern, "error": str(e)})
+                return None
+            patterns.append(arrow_pattern)
+        return patterns
+
+    def parse_gzipped_tsv(self, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Read the gzipped TSV file with Arrow and yield data in batches.
+        :param batch_size: Number of rows to include in each batch.
+        :return: Generator that yields batches of parsed data.
+        """
+        for table in self.parse_tables(batch_size):
+            yield table.to_pylist()
+
+    def parse_record_batches(self, batch_size: int, source: Optional[ILineSource] = None) -> Iterator[pa.RecordBatch]:
+        """
+        Read the gzipped TSV file with Arrow and yield RecordBatches.
+        :param batch_size: Number of rows to include in each batch.
+        :param source: Parse the lines of this source (e.g. a shard of the file) instead of the whole file
+        :return: Generator that yields RecordBatches matching the parser schema.
+        """
+        for table in self.parse_tables(batch_size, source):
+            yield from table.combine_chunks().to_batches()
+
+    def parse_tables(self, batch_size: int, source: Optional[ILineSource] = None) -> Iterator[pa.Table]:
+        """
+        Read the gzipped TSV file with Arrow and yield tables of parsed rows.
+        :param batch_size: Number of rows to include in each table.
+        :param source: Parse the lines of this source (e.g. a shard of the file) instead of the whole file
+        :return: Generator that yields tables matching the parser schema.
+        """
+        pending: List[pa.Table] = []
+        pending_rows = 0
+        self.parse_summary = {}
+        try:
+            for lines in self._iter_line_blocks(source):
+                table = self.parse_lines(lines)
+                if table.num_rows == 0:
+                    continue
+                pending.append(table)
+                pending_rows += table.num_rows
+                # Yield full batches once enough rows are buffered
+                if batch_size and pending_rows >= batch_size:
+                    merged = pa.concat_tables(pending)
+                    offset = 0
+                    while merged.num_rows - offset >= batch_size:
+                        yield merged.slice(offset, batch_size)
+                        offset += batch_size
+                    pending = [merged.slice(offset)]
+                    pending_rows = merged.num_rows - offset
+            if pending_rows:
+                yield pa.concat_tables(pending)
+        except OSError as e:
+            logger.warning("Skipping corrupted file", extra={"file_path": self.file_path, "error": str(e)})
+        except Exception as e:
+            logger.error("Exception while processing file", extra={"file_path": self.file_path, "error": str(e)}, exc_info=True)
+        finally:
+            if self.parse_summary:
+                logger.info("Parse summary", extra={"file_path": self.file_path, **self.parse_summary})
+
+    def _iter_line_blocks(self, source: Optional[ILineSource] = None) -> Iterator[pa.Array]:
+        """
+        Stream the raw lines of the file (or of a line source) as string arrays.
+        """
+        if source is not None:
+            lines = source.iter_lines()
+            while True:
+                block = list(islice(lines, self.SOURCE_BLOCK_LINES))
+                if not block:
+                    return
+                yield pa.array(block, type=pa.binary()).cast(pa.string())
+
+        with pa.input_stream(self.file_path, compression="gzip") as stream:
+            reader = pa_csv.open_csv(
+                stream,
+                read_options=pa_csv.ReadOptions(column_names=["line"], block_size=self.BLOCK_SIZE),
+                parse_options=pa_csv.ParseOptions(
+                    delimiter=self.LINE_DELIMITER,
+                    quote_char=False,
+                    escape_char=False,
+                    double_quote=False,
+                    ignore_empty_lines=False,
+                    invalid_row_handler=lambda row: "skip"
+                ),
+                convert_options=pa_csv.ConvertOptions(
+                    column_types={"line": pa.string()},
+                    strings_can_be_null=False,
+                    quoted_strings_can_be_null=False
+                )
+            )
+            for block in reader:
+                yield block.column(0)
+
+    def parse_lines(self, lines: pa.Array) -> pa.Table:
+        """
+        Parse a column of raw log lines into a table of relevant rows.
+        :param lines: String array with one raw log line per value
+        :return: Table matching the parser schema
+        """
+        lines_read = len(lines)
+        lines = self._prefilter_lines(lines)
+        table = self._parse_prefiltered_lines(lines)
+        self._update_parse_summary(lines_read, lines_read - len(lines), table.num_rows)
+        return table
+
+    def _prefilter_lines(self, lines: pa.Array) -> pa.Array:
+        """
+        Drop lines that contain no resource identifier (or completeness status) before splitting,
+        mirroring the byte-level pre-filter of LogFileParser.parse_lines.
+        """
+        for tokens, ignore_case in ((self._resource_tokens, False), (self._completeness_tokens, True)):
+            if tokens is None or len(lines) == 0:
+                continue
+            keep = None
+            for token in tokens:
+                found = pc.match_substring(lines, pattern=token.decode("ascii"), ignore_case=ignore_case)
+                keep = found if keep is None else pc.or_(keep, found)
+            if keep is None:
+                return lines.slice(0, 0)
+            lines = lines.filter(keep)
+        return lines
+
+    def _parse_prefiltered_lines(self, lines: pa.Array) -> pa.Table:
+        """
+        Split, filter and convert the lines that survived the pre-filter.
+        """
+        lines = pc.replace_substring(lines, pattern="\\t", replacement="\t")  # Replace literal '\t' with actual tab
+        fields = pc.split_pattern(pc.utf8_trim_whitespace(lines), pattern="\t")
+
+        column_count = pc.list_value_length(fields)
+        expected = pc.equal(column_count, self.COLUMN_COUNT)
+        unexpected_count = len(fields) - pc.sum(expected).as_py() if len(fields) else 0
+        if unexpected_count:
+            logger.warning("Unexpected column count", extra={"file_path": self.file_path, "expected": self.COLUMN_COUNT,
+                                                             "row_count": unexpected_count})
+        fields = fields.filter(expected)
+
+        # Resource prefix filter first, it drops most of the rows
+        path = pc.list_element(fields, 3)
+        relevant = pc.match_substring(path, "/")
+        prefix_match = None
+        for identifier in self.RESOURCE_IDENTIFIERS:
+            starts = pc.starts_with(path, pattern=identifier)
+            prefix_match = starts if prefix_match is None else pc.or_(prefix_match, starts)
+        if prefix_match is None:
+            return self._empty_table()
+        fields = fields.filter(pc.and_(relevant, prefix_match))
+        path = pc.list_element(fields, 3)
+
+        # Accession, filename and completeness filters
+        accession = self._extract_accession(path)
+        filename = pc.struct_field(pc.extract_regex(path, pattern=r"(?P<filename>[^/]*)$"), [0])
+        completed = pc.utf8_lower(pc.utf8_trim_whitespace(pc.list_element(fields, 6)))
+        relevant = pc.and_(
+            pc.and_(pc.is_valid(accession), pc.not_equal(filename, "")),
+            pc.is_in(completed, value_set=self._completeness_values)
+        )
+        relevant = pc.fill_null(relevant, False)
+        fields = fields.filter(relevant)
+        if len(fields) == 0:
+            return self._empty_table()
+        accession = accession.filter(relevant)
+        filename = filename.filter(relevant)
+        completed = completed.filter(relevant)
+
+        raw_timestamp = pc.list_element(fields, 0)
+        dates = self._parse_dates(raw_timestamp)
+
+        # Only the columns of the parser schema are computed
+        columns = {
+            "date": lambda: dates,
+            "year": lambda: pc.year(dates),
+            "month": lambda: pc.month(dates),
+            "user": lambda: pc.utf8_trim_whitespace(pc.list_element(fields, 1)),
+            "accession": lambda: accession,
+            "filename": lambda: filename,
+            "completed": lambda: completed,
+            "country": lambda: pc.list_element(fields, 7),
+            "method": lambda: pc.list_element(fields, 11),
+            "timestamp": lambda: pc.utf8_trim_whitespace(raw_timestamp),
+            "geoip_region_name": lambda: self._clean_geoip_column(pc.list_element(fields, 8)),
+            "geoip_city_name": lambda: self._clean_geoip_column(pc.list_element(fields, 9)),
+            "geo_location": lambda: pc.utf8_trim_whitespace(pc.list_element(fields, 10)),
+        }
+        return pa.Table.from_arrays(
+            [pc.cast(columns[field.name](), field.type) for field in self.schema],
+            schema=self.schema
+        )
+
+    def _extract_accession(self, path: pa.Array) -> pa.Array:
+        """
+        Extract the accession of each path, null where no pattern matches.
+        Patterns are tried in order and the first match wins, as in get_accession.
+        """
+        if self._arrow_accession_patterns is None:
+            return pa.array([self.get_accession(value) for value in path.to_pylist()], type=pa.string())
+
+        matches = [pc.struct_field(pc.extract_regex(path, pattern=pattern), [0])
+                   for pattern in self._arrow_accession_patterns]
+        if not matches:
+            return pa.nulls(len(path), type=pa.string())
+        return pc.coalesce(*matches) if len(matches) > 1 else matches[0]
+
+    def _parse_dates(self, raw_timestamp: pa.Array) -> pa.Array:
+        """
+        Parse the download date of each timestamp.
+        Timestamps that do not follow the fixed log layout go through clean_timestamp and strptime,
+        so malformed values fail exactly as they do in LogFileParser.parse_row.
+        """
+        has_fraction = pc.match_substring(raw_timestamp, ".")
+        trimmed = pc.binary_join_element_wise(pc.utf8_slice_codeunits(raw_timestamp, 0, 26), "Z", "")
+        cleaned = pc.utf8_rtrim(pc.if_else(has_fraction, trimmed, raw_timestamp), characters="Z")
+
+        day = pc.utf8_slice_codeunits(cleaned, 0, 10)
+        parsed = pc.strptime(day, format="%Y-%m-%d", unit="s", error_is_null=True)
+        # Arrow rolls invalid days over (2023-02-30 -> 2023-03-02), so round-trip the day string
+        well_formed = pc.and_(
+            pc.match_substring_regex(cleaned, pattern=self.TIMESTAMP_LAYOUT),
+            pc.equal(pc.strftime(parsed, format="%Y-%m-%d"), day)
+        )
+        if pc.all(pc.fill_null(well_formed, False)).as_py():
+            return pc.cast(parsed, pa.date32())
+
+        return pa.array(
+            [datetime.strptime(self.clean_timestamp(value), self.DATETIME_FORMAT).date()
+             for value in raw_timestamp.to_pylist()],
+            type=pa.date32()
+        )
+
+    @staticmethod
+    def _clean_geoip_column(values: pa.Array) -> pa.Array:
+        """
+        Column-wise equivalent of LogFileParser.clean_geoip_value.
+        """
+        values = pc.utf8_trim_whitespace(values)
+        placeholder = pc.and_(
+            pc.or_(pc.starts_with(values, pattern="{"), pc.starts_with(values, pattern="%{")),
+            pc.ends_with(values, pattern="}")
+        )
+        return pc.if_else(placeholder, "", values)
+
+    def _empty_table(self) -> pa.Table:
+        return self.schema.empty_table()
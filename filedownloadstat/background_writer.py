@@ -0,0 +1,110 @@
+import queue
+import logging
+import threading
+from typing import List, Dict, Any, Optional
+
+from exceptions import ParquetWriteError
+from interfaces import IParquetWriter
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundWriter(IParquetWriter):
+    """
+    Parquet writer running a wrapped writer on a dedicated thread, so that a record batch is converted,
+    encoded and compressed while the next one is parsed.
+
+    Record batches go through a bounded queue: once max_pending batches wait for the writer thread,
+    write_record_batch blocks until it catches up, which bounds the memory held by the pipeline.
+    Arrow releases the GIL while encoding and compressing, so parsing keeps running meanwhile.
+    A failure of the writer thread is raised as a ParquetWriteError by the next call of the producer;
+    the batches still queued are dropped.
+    """
+
+    DEFAULT_MAX_PENDING = 4
+    _STOP = object()
+
+    def __init__(self, writer: IParquetWriter, max_pending: int = DEFAULT_MAX_PENDING) -> None:
+        """
+        :param writer: Writer run on the writer thread
+        :param max_pending: Record batches queued before write_record_batch blocks
+        """
+        self.writer = writer
+        self.parquet_path = getattr(writer, "parquet_path", None)
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, max_pending))
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="parquet-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = self._queue.get()
+            try:
+                if batch is self._STOP:
+                    return
+                if self._error is None:
+                    self.writer.write_record_batch(batch)
+            except BaseException as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _raise_error(self) -> None:
+        """
+        Raise the failure of the writer thread, if any, as a ParquetWriteError.
+        """
+        if self._error is None:
+            return
+        if isinstance(self._error, ParquetWriteError):
+            raise self._error
+        raise ParquetWriteError(
+            f"Background writer failed: {self.parquet_path}",
+            parquet_path=self.parquet_path,
+            original_error=str(self._error)
+        ) from self._error
+
+    def write_record_batch(self, batch: Any) -> bool:
+        """
+        Queue a record batch for the writer thread, waiting while the queue is full.
+        :return: Whether the batch has rows to write
+        """
+        self._raise_error()
+        if batch.num_rows == 0:
+            return False
+        self._queue.put(batch)
+        return True
+
+    def drain(self) -> None:
+        """
+        Wait until the writer thread has written every queued batch.
+        """
+        self._queue.join()
+        self._raise_error()
+
+    def write_all(self, data: List[Dict[str, Any]]) -> bool:
+        self.drain()
+        return self.writer.write_all(data)
+
+    def write_batch(self, data: List[Dict[str, Any]]) -> bool:
+        self.drain()
+        return self.writer.write_batch(data)
+
+    def finalize(self) -> bool:
+        """
+        Write the queued batches, stop the writer thread and finalize the wrapped writer.
+        """
+        self._stop()
+        self._raise_error()
+        return self.writer.finalize()
+
+    def abort(self) -> None:
+        """
+        Stop the writer thread after a failure of the producer, without finalizing the wrapped writer.
+        """
+        self._error = self._error or ParquetWriteError("Aborted", parquet_path=self.parquet_path)
+        self._stop()
+
+    def _stop(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
@@ -0,0 +1,123 @@
+import re
+import calendar
+from datetime import date
+from typing import Any, Iterable, List, Optional, Tuple
+
+from exceptions import ValidationError
+
+
+class DateWindow:
+    """
+    Window of dates used to prune the log tree during discovery.
+
+    The log tree is organised by date: a year directory (`2023`) optionally holds month directories
+    (`01` to `12`), and file names may embed a date (`2023-01-15`, `20230115`, `2023_01`). Each
+    path below an access method directory covers the period given by the most specific of these,
+    and is pruned when that period falls outside the window or in a skipped year. A path without
+    any date is always kept.
+    """
+
+    DATE_FORMAT = re.compile(r"(\d{4})(?:-(\d{2})(?:-(\d{2}))?)?")
+    YEAR_DIRECTORY = re.compile(r"(?:19|20)\d{2}")
+    MONTH_DIRECTORY = re.compile(r"0[1-9]|1[0-2]")
+    FILE_NAME_DATE = re.compile(r"(?<!\d)((?:19|20)\d{2})[-_.]?(0[1-9]|1[0-2])(?:[-_.]?(0[1-9]|[12]\d|3[01]))?(?!\d)")
+
+    def __init__(
+        self,
+        from_date: Optional[str] = None,
+        to_date: Optional[str] = None,
+        skipped_years: Optional[Iterable[int]] = None
+    ) -> None:
+        """
+        :param from_date: First date of the window (YYYY, YYYY-MM or YYYY-MM-DD), unbounded if None
+        :param to_date: Last date of the window, inclusive (YYYY, YYYY-MM or YYYY-MM-DD), unbounded if None
+        :param skipped_years: Years pruned whatever the window
+        """
+        self.start = self.parse_date(from_date, "from_date")[0] if from_date else date.min
+        self.end = self.parse_date(to_date, "to_date")[1] if to_date else date.max
+        self.skipped_years = frozenset(skipped_years or ())
+        if self.start > self.end:
+            raise ValidationError(f"Date window starts after it ends: {from_date} > {to_date}",
+                                  field="from_date", value=from_date)
+
+    def __bool__(self) -> bool:
+        return self.start != date.min or self.end != date.max or bool(self.skipped_years)
+
+    @classmethod
+    def parse_date(cls, value: str, field: str) -> Tuple[date, date]:
+        """
+        First and last day of a year, month or day written as YYYY, YYYY-MM or YYYY-MM-DD.
+        """
+        match = cls.DATE_FORMAT.fullmatch(value.strip())
+        try:
+            if match is None:
+                raise ValueError("expected YYYY, YYYY-MM or YYYY-MM-DD")
+            return cls._period(*match.groups())
+        except ValueError as e:
+            raise ValidationError(f"Invalid date {value!r}: {e}", field=field, value=value)
+
+    @staticmethod
+    def _period(year: str, month: Optional[str] = None, day: Optional[str] = None) -> Tuple[date, date]:
+        year = int(year)
+        if month is None:
+            return date(year, 1, 1), date(year, 12, 31)
+        month = int(month)
+        if day is None:
+            return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+        return date(year, month, int(day)), date(year, month, int(day))
+
+    def path_period(self, relative_path: str) -> Optional[Tuple[date, date]]:
+        """
+        Period covered by a path below an access method directory, None if the path holds no date.
+        """
+        year = month = None
+        period = None
+        parts = relative_path.replace("\\", "/").split("/")
+        for position, part in enumerate(parts):
+            if position == len(parts) - 1:
+                match = self.FILE_NAME_DATE.search(part)
+                if match:
+                    try:
+                        return self._period(*match.groups())
+                    except ValueError:
+                        pass  # Not a date after all (e.g. 2023-02-30)
+            if self.YEAR_DIRECTORY.fullmatch(part):
+                year, month = part, None
+                period = self._period(year)
+            elif year is not None and month is None and self.MONTH_DIRECTORY.fullmatch(part):
+                month = part
+                period = self._period(year, month)
+        return period
+
+    def includes(self, relative_path: str) -> bool:
+        """
+        Whether a directory or file below an access method directory may hold log records of the window.
+        """
+        period = self.path_period(relative_path)
+        if period is None:
+            return True
+        first, last = period
+        if last < self.start or first > self.end:
+            return False
+        return not (first.year == last.year and first.year in self.skipped_years)
+
+    def partition_filters(self) -> Optional[List[List[Tuple[str, str, Any]]]]:
+        """
+        Filters on the year and month columns keeping the months of the window outside the skipped years,
+        in the disjunctive normal form taken by pyarrow and dask; None without a window.
+        On a dataset partitioned by year and month, the partitions they exclude are never opened.
+        """
+        if not self:
+            return None
+        skipped = [("year", "not in", sorted(self.skipped_years))] if self.skipped_years else []
+        first = (self.start.year, self.start.month) if self.start != date.min else None
+        last = (self.end.year, self.end.month) if self.end != date.max else None
+        if first and last and first[0] == last[0]:
+            return [[("year", "=", first[0]), ("month", ">=", first[1]), ("month", "<=", last[1])] + skipped]
+        filters = []
+        if first:
+            filters.append([("year", "=", first[0]), ("month", ">=", first[1])] + skipped)
+        filters.append(([("year", ">", first[0])] if first else []) + ([("year", "<", last[0])] if last else []) + skipped)
+        if last:
+            filters.append([("year", "=", last[0]), ("month", "<=", last[1])] + skipped)
+        return [conjunction for conjunction in filters if conjunction]
@@ -0,0 +1,165 @@
+import os
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import List, Optional, Dict, Any, Tuple
+
+from date_window import DateWindow
+
+logger = logging.getLogger(__name__)
+
+
+class ScannedFile:
+    """
+    A file found by the DirectoryScanner.
+    :param path: Path of the file
+    :param size: Size of the file in bytes
+    :param mtime_ns: Modification time of the file in nanoseconds
+    """
+
+    def __init__(self, path: str, size: int, mtime_ns: int) -> None:
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+    def __repr__(self) -> str:
+        return f"ScannedFile(path={self.path!r}, size={self.size}, mtime_ns={self.mtime_ns})"
+
+
+class DirectoryScanner:
+    """
+    Find the log files of directory trees with os.scandir, listing directories from a thread pool.
+
+    Every directory is listed by its own task, so the latency of a network file system is paid
+    concurrently across the protocol, visibility, year and month subtrees, and file sizes come from
+    the stat results of the directory entries. With a listing cache, a directory whose modification
+    time is the one recorded by the previous scan is not listed again: its files and subdirectories
+    are taken from the cache and only the subdirectories are visited.
+    A directory modification time only changes when entries are added, removed or renamed, so the
+    size of a file rewritten in place is the one of the scan that listed its directory.
+    With a date window, year and month directories and dated files outside the window are pruned
+    without being listed.
+    """
+
+    DEFAULT_WORKERS = 16
+    FILE_SUFFIX = ".tsv.gz"
+    LISTING_CACHE_VERSION = 1
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        listing_cache: Optional[str] = None,
+        file_suffix: str = FILE_SUFFIX,
+        date_window: Optional[DateWindow] = None
+    ) -> None:
+        """
+        :param workers: Number of threads listing directories
+        :param listing_cache: JSON file keeping the directory listings between scans, None to list every directory
+        :param file_suffix: Suffix of the files to find
+        :param date_window: Dates of the log files to find (paths relative to each root directory), all if None
+        """
+        self.workers = workers
+        self.listing_cache = listing_cache
+        self.file_suffix = file_suffix
+        self.date_window = date_window or None
+        self._cached_listings = self._load_listing_cache() if listing_cache else {}
+        self._listings: Dict[str, Dict[str, Any]] = {}
+        self._pruned: List[str] = []
+
+    def scan(self, root_dirs: List[str]) -> List[List[ScannedFile]]:
+        """
+        Find the files under each root directory, following no symbolic link to a directory.
+        :param root_dirs: Directories to scan, a missing one has no files
+        :return: Files under each root directory, sorted by path
+        """
+        self._listings = {}
+        self._pruned = []
+        files = [[] for _ in root_dirs]
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = {executor.submit(self._list_directory, root_dir): index for index, root_dir in enumerate(root_dirs)}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = pending.pop(future)
+                    directory, listing = future.result()
+                    if listing is None:
+                        continue
+                    for name, size, mtime_ns in listing["files"]:
+                        file_path = os.path.join(directory, name)
+                        if self._in_window(file_path, root_dirs[index]):
+                            files[index].append(ScannedFile(file_path, size, mtime_ns))
+                    for name in listing["dirs"]:
+                        subdirectory = os.path.join(directory, name)
+                        if self._in_window(subdirectory, root_dirs[index]):
+                            pending[executor.submit(self._list_directory, subdirectory)] = index
+                        else:
+                            self._pruned.append(subdirectory)
+        for root_files in files:
+            root_files.sort(key=lambda scanned_file: scanned_file.path)
+
+        reused = sum(1 for directory, listing in self._listings.items() if self._cached_listings.get(directory) is listing)
+        logger.info("Directories scanned", extra={"directory_count": len(self._listings), "reused_listings": reused,
+                                                  "pruned_directories": len(self._pruned),
+                                                  "file_count": sum(len(root_files) for root_files in files)})
+        if self.listing_cache:
+            self._save_listing_cache(root_dirs)
+        return files
+
+    def _in_window(self, path: str, root_dir: str) -> bool:
+        return self.date_window is None or self.date_window.includes(os.path.relpath(path, root_dir))
+
+    def _list_directory(self, directory: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        List the matching files and the subdirectories of a directory, from the cache when it did not change.
+        :return: (directory, listing), the listing is None when the directory does not exist
+        """
+        try:
+            # Taken before listing, so a directory changed while it is listed is listed again next time
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except (FileNotFoundError, NotADirectoryError):
+            return directory, None
+        listing = self._cached_listings.get(directory)
+        if listing is None or listing["mtime_ns"] != mtime_ns:
+            listing = {"mtime_ns": mtime_ns, "files": [], "dirs": []}
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        listing["dirs"].append(entry.name)
+                    elif entry.name.endswith(self.file_suffix) and entry.is_file():
+                        stat = entry.stat()
+                        listing["files"].append([entry.name, stat.st_size, stat.st_mtime_ns])
+        self._listings[directory] = listing
+        return directory, listing
+
+    def _load_listing_cache(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.listing_cache) as f:
+                cache = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable listing cache", extra={"listing_cache": self.listing_cache, "error": str(e)})
+            return {}
+        if cache.get("version") != self.LISTING_CACHE_VERSION:
+            return {}
+        return cache["directories"]
+
+    def _save_listing_cache(self, root_dirs: List[str]) -> None:
+        """
+        Write the listings of this scan, keeping the cached listings of directories outside the scanned
+        trees or pruned by the date window.
+        """
+        roots = tuple(os.path.join(root_dir, "") for root_dir in root_dirs)
+        pruned = set(self._pruned)
+        pruned_trees = tuple(os.path.join(directory, "") for directory in self._pruned)
+        directories = {
+            directory: listing for directory, listing in self._cached_listings.items()
+            if (directory not in root_dirs and not directory.startswith(roots))
+            or directory in pruned or directory.startswith(pruned_trees)
+        }
+        directories.update(self._listings)
+        temp_path = f"{self.listing_cache}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"version": self.LISTING_CACHE_VERSION, "directories": directories}, f)
+        os.replace(temp_path, self.listing_cache)
+        self._cached_listings = directories
@@ -3,10 +3,14 @@ import re
 import click
 from typing import Optional
 
+from date_window import DateWindow
 from log_file_analyzer import LogFileAnalyzer
 from log_file_util import FileUtil
 from parquet_analyzer import ParquetAnalyzer
+from parquet_cache import ParquetCache
 from parquet_reader import ParquetReader
+from parquet_sorter import ParquetSorter
+from parquet_writer import ParquetWriterProfile
 from report_stat import ReportStat
 
 
@@ -38,11 +42,70 @@ from report_stat import ReportStat
     required=True,
     type=str
 )
-def get_log_files(root_dir: str, output: str, protocols: str, public: str) -> str:
+@click.option(
+    "--cache_dir",
+    help="ingestion cache directory; logs how many log files are new or unchanged since they were last parsed",
+    required=False,
+    default=None,
+    type=str
+)
+@click.option(
+    "--listing_cache",
+    help="directory listing cache file; directories unchanged since the previous run are not listed again",
+    required=False,
+    default=None,
+    type=str
+)
+@click.option(
+    "--scan_workers",
+    help="number of threads listing the log directories",
+    required=False,
+    default=16,
+    type=click.IntRange(min=1),
+)
+@click.option(
+    "--from",
+    "from_date",
+    help="first date of the log files to list (YYYY, YYYY-MM or YYYY-MM-DD); earlier year/month directories "
+         "and dated file names are pruned",
+    required=False,
+    default=None,
+    type=str
+)
+@click.option(
+    "--to",
+    "to_date",
+    help="last date of the log files to list, inclusive (YYYY, YYYY-MM or YYYY-MM-DD)",
+    required=False,
+    default=None,
+    type=str
+)
+@click.option(
+    "-y",
+    "--skipped_years",
+    help="years whose log files are not listed",
+    required=False,
+    type=str
+)
+def get_log_files(
+    root_dir: str,
+    output: str,
+    protocols: str,
+    public: str,
+    cache_dir: Optional[str],
+    listing_cache: Optional[str],
+    scan_workers: int,
+    from_date: Optional[str],
+    to_date: Optional[str],
+    skipped_years: Optional[str]
+) -> str:
     protocol_list = protocols.split(",")
     public_list = public.split(",")
+    skipped_years_list = list(map(int, skipped_years.split(","))) if skipped_years else []
+    date_window = DateWindow(from_date, to_date, skipped_years_list)
     fileutil = FileUtil()
-    file_paths_list = fileutil.process_access_methods(root_dir, output, protocol_list, public_list)
+    file_paths_list = fileutil.process_access_methods(root_dir, output, protocol_list, public_list, cache_dir,
+                                                      listing_cache, scan_workers, date_window)
     return file_paths_list
 
 
@@ -88,19 +151,283 @@ def get_log_files(root_dir: str, output: str, protocols: str, public: str) -> st
     required=True,
     type=str
 )
+@click.option(
+    "-e",
+    "--engine",
+    help="Parse engine: 'python' (line by line) or 'arrow' (vectorized Arrow compute kernels)",
+    required=False,
+    default="python",
+    type=click.Choice(["python", "arrow"]),
+)
+@click.option(
+    "-w",
+    "--workers",
+    help="Number of processes parsing one log file; BGZF and multi-member gzip files are split at member boundaries",
+    required=False,
+    default=1,
+    type=click.IntRange(min=1),
+)
+@click.option(
+    "--cache_dir",
+    help="ingestion cache directory; an unchanged log file reuses the parquet output of its last parse",
+    required=False,
+    default=None,
+    type=str
+)
+@click.option(
+    "--cache_max_bytes",
+    help="size bound of the cache directory; least recently used outputs are evicted beyond it",
+    required=False,
+    default=None,
+    type=click.IntRange(min=0),
+)
+@click.option(
+    "--checkpoint",
+    help="checkpoint file of a log file still being appended to; only the records appended since the last run "
+         "are parsed, into the next <output>.part-NNNN.parquet",
+    required=False,
+    default=None,
+    type=str
+)
+@click.option(
+    "--columns",
+    help="comma separated output columns to parse and write (e.g. date,year,month,user,accession,filename,country,method); "
+         "all columns if omitted",
+    required=False,
+    default=None,
+    type=str
+)
+@click.option(
+    "--compact_schema",
+    help="write the compact physical schema: date32 dates, UTC timestamps, 20-byte user digests and "
+         "dictionary-encoded accession, completed, country and method",
+    is_flag=True,
+    default=False,
+)
+@click.option(
+    "--writer_profile",
+    help="Parquet encoding profile: a profile name (default, zstd, indexed) or a JSON object of settings "
+         "such as {\"profile\": \"zstd\", \"row_group_rows\": 500000}",
+    required=False,
+    default=None,
+    type=str
+)
+@click.option(
+    "--write_queue",
+    help="record batches queued for a background thread encoding the parquet output while parsing goes on; "
+         "0 writes inline",
+    required=False,
+    default=0,
+    type=click.IntRange(min=0),
+)
 def process_log_file(
     tsvfilepath: str,
     output_parquet: str,
     resource: str,
     complete: str,
     batch: int,
-    accession_pattern: str
+    accession_pattern: str,
+    engine: str,
+    workers: int,
+    cache_dir: Optional[str],
+    cache_max_bytes: Optional[int],
+    checkpoint: Optional[str],
+    columns: Optional[str],
+    compact_schema: bool,
+    writer_profile: Optional[str],
+    write_queue: int
 ) -> None:
     resource_list = resource.split(",")
     completeness_list = complete.split(",")
     accession_pattern_list = re.split(r',(?![^{}]*\})', accession_pattern)
+    column_list = columns.split(",") if columns else None
+    fileutil = FileUtil()
+    fileutil.process_log_file(tsvfilepath, output_parquet, resource_list, completeness_list, batch,
+                              accession_pattern_list, engine, workers, cache_dir, cache_max_bytes, checkpoint,
+                              column_list, compact_schema, ParquetWriterProfile.load(writer_profile), write_queue)
+
+
+@click.command("pack_work_units",
+               short_help="pack the log files of a file list into balanced work units", )
+@click.option(
+    "-f",
+    "--file_list",
+    help="file list written by get_log_files (path, file name, size and protocol of each log file)",
+    required=True,
+)
+@click.option(
+    "-o",
+    "--output_dir",
+    help="directory to write one file list per work unit and the work_units.tsv manifest to",
+    required=True,
+)
+@click.option(
+    "-t",
+    "--target_bytes",
+    help="compressed bytes of log files wanted per work unit",
+    required=True,
+    type=click.IntRange(min=1),
+)
+@click.option(
+    "-s",
+    "--shard_threshold_bytes",
+    help="log files of at least this size get a work unit of their own, flagged for intra-file sharding",
+    required=False,
+    default=None,
+    type=click.IntRange(min=1),
+)
+def pack_work_units(file_list: str, output_dir: str, target_bytes: int, shard_threshold_bytes: Optional[int]) -> None:
     fileutil = FileUtil()
-    fileutil.process_log_file(tsvfilepath, output_parquet, resource_list, completeness_list, batch, accession_pattern_list)
+    fileutil.pack_work_units(file_list, output_dir, target_bytes, shard_threshold_bytes)
+
+
+@click.command("process_log_files",
+               short_help="process many log files in one process pool", )
+@click.option(
+    "-l",
+    "--file_list",
+    help="file list written by get_log_files (log file path in the first column)",
+    required=True,
+)
+@click.option(
+    "-o",
+    "--output_dir",
+    help="directory to write one parquet file per log file and the manifest.tsv to",
+    required=True,
+)
+@click.option(
+    "-r",
+    "--resource",
+    help="List of identifiers(paths) in file URIs to identify resources from(Eg: /pride/data/archive)",
+    required=True,
+    type=str
+)
+@click.option(
+    "-c",
+    "--complete",
+    help="File download status can be complete or incomplete",
+    required=True,
+    type=str
+)
+@click.option(
+    "-b",
+    "--batch",
+    help="Batch size of the TVS file to read",
+    required=False,
+    type=int
+)
+@click.option(
+    "-a",
+    "--accession_pattern",
+    help="Resource accession pattern as a regular expression(Eg: PRIDE accessions '^PXD\\d{6}$'",
+    required=True,
+    type=str
+)
+@click.option(
+    "-e",
+    "--engine",
+    help="Parse engine: 'python' (line by line) or 'arrow' (vectorized Arrow compute kernels)",
+    required=False,
+    default="python",
+    type=click.Choice(["python", "arrow"]),
+)
+@click.option(
+    "-w",
+    "--workers",
+    help="Number of log files parsed in parallel",
+    required=False,
+    default=1,
+    type=click.IntRange(min=1),
+)
+@click.option(
+    "--start",
+    help="Index of the first file of the list to process",
+    required=False,
+    default=0,
+    type=click.IntRange(min=0),
+)
+@click.option(
+    "--count",
+    help="Number of files to process from --start (default: all remaining files)",
+    required=False,
+    default=None,
+    type=click.IntRange(min=0),
+)
+@click.option(
+    "--cache_dir",
+    help="ingestion cache directory; unchanged log files reuse the parquet output of their last parse",
+    required=False,
+    default=None,
+    type=str
+)
+@click.option(
+    "--cache_max_bytes",
+    help="size bound of the cache directory; least recently used outputs are evicted beyond it",
+    required=False,
+    default=None,
+    type=click.IntRange(min=0),
+)
+@click.option(
+    "--columns",
+    help="comma separated output columns to parse and write (e.g. date,year,month,user,accession,filename,country,method); "
+         "all columns if omitted",
+    required=False,
+    default=None,
+    type=str
+)
+@click.option(
+    "--compact_schema",
+    help="write the compact physical schema: date32 dates, UTC timestamps, 20-byte user digests and "
+         "dictionary-encoded accession, completed, country and method",
+    is_flag=True,
+    default=False,
+)
+@click.option(
+    "--writer_profile",
+    help="Parquet encoding profile: a profile name (default, zstd, indexed) or a JSON object of settings "
+         "such as {\"profile\": \"zstd\", \"row_group_rows\": 500000}",
+    required=False,
+    default=None,
+    type=str
+)
+@click.option(
+    "--write_queue",
+    help="record batches queued for a background thread encoding the parquet output while parsing goes on; "
+         "0 writes inline",
+    required=False,
+    default=0,
+    type=click.IntRange(min=0),
+)
+def process_log_files(
+    file_list: str,
+    output_dir: str,
+    resource: str,
+    complete: str,
+    batch: int,
+    accession_pattern: str,
+    engine: str,
+    workers: int,
+    start: int,
+    count: Optional[int],
+    cache_dir: Optional[str],
+    cache_max_bytes: Optional[int],
+    columns: Optional[str],
+    compact_schema: bool,
+    writer_profile: Optional[str],
+    write_queue: int
+) -> None:
+    resource_list = resource.split(",")
+    completeness_list = complete.split(",")
+    accession_pattern_list = re.split(r',(?![^{}]*\})', accession_pattern)
+    column_list = columns.split(",") if columns else None
+    fileutil = FileUtil()
+    manifest = fileutil.process_log_files(file_list, output_dir, resource_list, completeness_list, batch,
+                                          accession_pattern_list, engine, workers, start, count, cache_dir,
+                                          cache_max_bytes, column_list, compact_schema,
+                                          ParquetWriterProfile.load(writer_profile), write_queue)
+    failed = [record["path"] for record in fileutil.read_manifest(manifest) if record["status"] == "failed"]
+    if failed:
+        raise click.ClickException(f"{len(failed)} log file(s) failed, see {manifest}")
 
 
 @click.command("run_log_file_stat",
@@ -161,9 +488,104 @@ def read_parquet_files(file: str) -> None:
               "--profile",
               required=True,
               )
-def merge_parquet_files(input_dir: str, output_parquet: str, profile: str) -> None:
+@click.option(
+    "--writer_profile",
+    help="Parquet encoding profile: a profile name (default, zstd, indexed) or a JSON object of settings "
+         "such as {\"profile\": \"zstd\", \"row_group_rows\": 500000}",
+    required=False,
+    default=None,
+    type=str
+)
+@click.option(
+    "--partitioned",
+    help="Write the merged output as a directory partitioned by year and month (year=YYYY/month=M), "
+         "so that readers filtering on years or months skip the other partitions",
+    is_flag=True,
+    default=False
+)
+@click.option(
+    "--sort_by",
+    help="Sort the merged rows by these comma-separated columns, e.g. accession,date, so that the row groups "
+         "of a project are found from their statistics; rows stay in input order if not set",
+    required=False,
+    default=None,
+    type=str
+)
+@click.option(
+    "-w",
+    "--workers",
+    help="Worker processes merging groups of input files into parts, which a final pass concatenates",
+    required=False,
+    default=1,
+    type=click.IntRange(min=1)
+)
+@click.option(
+    "--part_bytes",
+    help="Input bytes merged into one part by the workers, 256 MiB if 0",
+    required=False,
+    default=0,
+    type=click.IntRange(min=0)
+)
+@click.option(
+    "--dataset_output",
+    help="Write the output as a directory of part files with a _metadata summary file instead of a single file",
+    is_flag=True,
+    default=False
+)
+def merge_parquet_files(input_dir: str, output_parquet: str, profile: str, writer_profile: Optional[str],
+                        partitioned: bool, sort_by: Optional[str], workers: int, part_bytes: int,
+                        dataset_output: bool) -> None:
     stat_parquet = ParquetAnalyzer()
-    stat_parquet.merge_parquet_files(input_dir, output_parquet)
+    stat_parquet.merge_parquet_files(input_dir, output_parquet, ParquetWriterProfile.load(writer_profile), partitioned,
+                                     ParquetSorter.parse_sort_by(sort_by) if sort_by else None,
+                                     workers=workers, part_bytes=part_bytes or None, dataset_output=dataset_output)
+
+
+@click.command(
+    "sort_parquet_files",
+    short_help="Rewrite Parquet files sorted by accession and date",
+)
+@click.option("-i",
+              "--input_parquet",
+              help="Parquet file or partitioned dataset to sort, can be repeated",
+              required=True,
+              multiple=True,
+              )
+@click.option("-m",
+              "--output_parquet",
+              required=True,
+              )
+@click.option(
+    "--sort_by",
+    help="Comma-separated columns to sort by",
+    required=False,
+    default="accession,date",
+    type=str
+)
+@click.option(
+    "--writer_profile",
+    help="Parquet encoding profile: a profile name (default, zstd, indexed) or a JSON object of settings",
+    required=False,
+    default=None,
+    type=str
+)
+@click.option(
+    "--partitioned",
+    help="Write the output as a directory partitioned by year and month, each file sorted",
+    is_flag=True,
+    default=False
+)
+@click.option(
+    "--max_rows_in_memory",
+    help="Rows sorted at a time; larger inputs are sorted in runs through temporary files",
+    required=False,
+    default=ParquetSorter.DEFAULT_MAX_ROWS_IN_MEMORY,
+    type=click.IntRange(min=1)
+)
+def sort_parquet_files(input_parquet: tuple, output_parquet: str, sort_by: str, writer_profile: Optional[str],
+                       partitioned: bool, max_rows_in_memory: int) -> None:
+    sorter = ParquetSorter(max_rows_in_memory=max_rows_in_memory)
+    sorter.sort(list(input_parquet), output_parquet, sort_by, ParquetWriterProfile.load(writer_profile), partitioned)
 
 
 @click.command(
@@ -172,6 +594,7 @@ def merge_parquet_files(input_dir: str, output_parquet: str, profile: str) -> No
 )
 @click.option("-m",
               "--output_parquet",
+              help="Merged Parquet file, or a directory or list of per-file Parquet outputs",
               required=True,
               )
 @click.option("-g",
@@ -198,6 +621,14 @@ def merge_parquet_files(input_dir: str, output_parquet: str, profile: str) -> No
               "--profile",
               required=True,
               )
+@click.option(
+    "-w",
+    "--workers",
+    help="Worker processes aggregating runs of row groups, whose partial counts are then combined",
+    required=False,
+    default=1,
+    type=click.IntRange(min=1)
+)
 def analyze_parquet_files(
     output_parquet: str,
     project_level_download_counts: str,
@@ -205,7 +636,8 @@ def analyze_parquet_files(
     project_level_yearly_download_counts: str,
     project_level_top_download_counts: str,
     all_data: str,
-    profile: str
+    profile: str,
+    workers: int
 ) -> None:
     stat_parquet = ParquetAnalyzer()
     stat_parquet.analyze_parquet_files(
@@ -214,7 +646,8 @@ def analyze_parquet_files(
         file_level_download_counts,
         project_level_yearly_download_counts,
         project_level_top_download_counts,
-        all_data
+        all_data,
+        workers
     )
 
 
@@ -223,7 +656,7 @@ def analyze_parquet_files(
 @click.option(
     "-f",
     "--file",
-    help="Parquet file containing file download stats",
+    help="Parquet file containing file download stats, or a directory or list of per-file Parquet outputs",
     required=True,
     type=str
 )
@@ -354,12 +787,50 @@ def main():
     pass
 
 
+@click.group("cache", short_help="inspect or prune the cache of parsed log file outputs")
+def cache():
+    pass
+
+
+@cache.command("stats", short_help="show the size of the cache")
+@click.option(
+    "--cache_dir",
+    help="cache directory given to process_log_file",
+    required=True,
+    type=str
+)
+def cache_stats(cache_dir: str) -> None:
+    for name, value in ParquetCache(cache_dir).stats().items():
+        click.echo(f"{name}\t{value}")
+
+
+@cache.command("prune", short_help="evict the least recently used outputs beyond a size bound")
+@click.option(
+    "--cache_dir",
+    help="cache directory given to process_log_file",
+    required=True,
+    type=str
+)
+@click.option(
+    "--max_bytes",
+    help="size the cache is pruned down to",
+    required=True,
+    type=click.IntRange(min=0),
+)
+def cache_prune(cache_dir: str, max_bytes: int) -> None:
+    for name, value in ParquetCache(cache_dir).prune(max_bytes).items():
+        click.echo(f"{name}\t{value}")
+
+
 # =============== Features Used ===============
 
 main.add_command(get_log_files)
 main.add_command(run_log_file_stat)
 main.add_command(process_log_file)
+main.add_command(process_log_files)
+main.add_command(pack_work_units)
 main.add_command(merge_parquet_files)
+main.add_command(sort_parquet_files)
 main.add_command(analyze_parquet_files)
 main.add_command(run_file_download_stat)
 main.add_command(classify_bots)
@@ -367,6 +838,7 @@ main.add_command(classify_bots)
 # =============== Additional Features ===============
 
 main.add_command(read_parquet_files)
+main.add_command(cache)
 
 if __name__ == "__main__":
     main()
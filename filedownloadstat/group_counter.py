@@ -0,0 +1,180 @@
+from typing import List, Dict, Optional, Sequence, Tuple, Union
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from exceptions import ValidationError
+
+
+class KeyEncoder:
+    """
+    Dense integer ids of the distinct keys seen so far, numbered in order of first appearance.
+    """
+
+    def __init__(self) -> None:
+        self._ids: Dict[object, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def encode(self, keys: List[object]) -> np.ndarray:
+        """
+        Ids of some distinct keys, new keys getting the next ids.
+        """
+        ids = self._ids
+        return np.fromiter((ids.setdefault(key, len(ids)) for key in keys), dtype=np.int64, count=len(keys))
+
+    def keys(self) -> List[object]:
+        """
+        Keys in the order of their ids.
+        """
+        return list(self._ids)
+
+
+class GroupCounter:
+    """
+    Streaming group-by counting the rows of every combination of some key columns, and optionally
+    summing some numeric or boolean columns, over record batches.
+
+    The values of each key column are dictionary-encoded per batch (dictionary-encoded columns of
+    compact files are used as they are) and mapped to running ids, so only the distinct values of a
+    batch are looked up. Key combinations are mapped in the same way, two columns at a time, from
+    their ids packed into one integer. Counts and sums are kept in arrays indexed by the group ids
+    and updated in place with numpy.bincount, so memory grows with the number of distinct keys and
+    not with the number of batches. Rows whose key has a null are not counted, as in pandas.
+    """
+
+    # Bits of the id of the right-hand key in a packed key combination
+    _ID_BITS = 32
+
+    def __init__(self, key_columns: Sequence[str], sum_columns: Optional[Dict[str, str]] = None) -> None:
+        """
+        :param key_columns: Columns grouped by
+        :param sum_columns: Output column of each summed column, e.g. {"bot_count": "is_bot"}
+        """
+        if not key_columns:
+            raise ValidationError("key_columns must not be empty", field="key_columns", value=key_columns)
+        self.key_columns = list(key_columns)
+        self.sum_columns = dict(sum_columns or {})
+        self._column_encoders = [KeyEncoder() for _ in self.key_columns]
+        # Ids of the combinations of the first i + 2 key columns
+        self._pair_encoders = [KeyEncoder() for _ in self.key_columns[1:]]
+        self._counts = np.zeros(0, dtype=np.int64)
+        self._sums = {name: np.zeros(0, dtype=np.int64) for name in self.sum_columns}
+        self.row_count = 0
+
+    @property
+    def group_count(self) -> int:
+        """
+        Number of groups seen so far.
+        """
+        return len(self._pair_encoders[-1] if self._pair_encoders else self._column_encoders[0])
+
+    def update(self, batch: Union[pa.RecordBatch, pa.Table]) -> None:
+        """
+        Add the rows of a batch to the counts and sums.
+        """
+        if isinstance(batch, pa.Table):
+            for record_batch in batch.to_batches():
+                self.update(record_batch)
+            return
+        if batch.num_rows == 0:
+            return
+        ids, inverse = self._group_ids(batch)
+        self._counts[ids] += np.bincount(inverse, minlength=len(ids))
+        for name, column in self.sum_columns.items():
+            values = pc.cast(batch.column(column), pa.int64()).fill_null(0).to_numpy()
+            self._sums[name][ids] += np.bincount(inverse, weights=values, minlength=len(ids)).astype(np.int64)
+        self.row_count += batch.num_rows
+
+    def combine(self, table: pa.Table) -> None:
+        """
+        Add the groups of another counter with the same columns (see to_table), e.g. the partial counts
+        of a worker. Combining is associative, so partial counts may be added in any grouping.
+        """
+        for batch in table.to_batches():
+            if batch.num_rows == 0:
+                continue
+            ids, inverse = self._group_ids(batch)
+            self._counts[ids] += np.bincount(inverse, weights=batch.column("count").to_numpy(),
+                                             minlength=len(ids)).astype(np.int64)
+            for name in self.sum_columns:
+                self._sums[name][ids] += np.bincount(inverse, weights=batch.column(name).to_numpy(),
+                                                     minlength=len(ids)).astype(np.int64)
+            self.row_count += int(pc.sum(batch.column("count")).as_py())
+
+    def _group_ids(self, batch: pa.RecordBatch) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Ids of the distinct groups of a batch, and the position of each row's group among them. The
+        accumulators are grown to the groups seen.
+        """
+        ids, inverse = self._encode_column(0, batch.column(self.key_columns[0]))
+        for level, column in enumerate(self.key_columns[1:]):
+            column_ids, column_inverse = self._encode_column(level + 1, batch.column(column))
+            packed = (ids[inverse] << self._ID_BITS) | column_ids[column_inverse]
+            distinct, inverse = np.unique(packed, return_inverse=True)
+            ids = self._pair_encoders[level].encode(distinct.tolist())
+        self._grow(self.group_count)
+        return ids, inverse
+
+    def _encode_column(self, index: int, values: pa.Array) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Running ids of the distinct values of a key column in a batch, and the position of each row's
+        value among them.
+        """
+        if not pa.types.is_dictionary(values.type):
+            values = pc.dictionary_encode(values, null_encoding="encode")
+        dictionary = values.dictionary.to_pylist()
+        indices = values.indices
+        if indices.null_count:
+            indices = indices.fill_null(len(dictionary))
+            dictionary.append(None)
+        ids = self._column_encoders[index].encode(dictionary)
+        return ids, indices.to_numpy(zero_copy_only=False).astype(np.int64, copy=False)
+
+    def _grow(self, size: int) -> None:
+        if size <= len(self._counts):
+            return
+        capacity = max(size, 2 * len(self._counts))
+        self._counts = np.concatenate([self._counts, np.zeros(capacity - len(self._counts), dtype=np.int64)])
+        for name, sums in self._sums.items():
+            self._sums[name] = np.concatenate([sums, np.zeros(capacity - len(sums), dtype=np.int64)])
+
+    def _group_keys(self) -> List[np.ndarray]:
+        """
+        Id of each group's value of every key column, by group id.
+        """
+        if not self._pair_encoders:
+            return [np.arange(self.group_count, dtype=np.int64)]
+        mask = (1 << self._ID_BITS) - 1
+        packed = np.array(self._pair_encoders[-1].keys(), dtype=np.int64)
+        keys = [packed & mask]
+        for level in range(len(self._pair_encoders) - 1, 0, -1):
+            packed = np.array(self._pair_encoders[level - 1].keys(), dtype=np.int64)[packed >> self._ID_BITS]
+            keys.append(packed & mask)
+        keys.append(packed >> self._ID_BITS)
+        return keys[::-1]
+
+    def to_table(self) -> pa.Table:
+        """
+        Key columns, "count" and the sums of the groups, sorted by the key columns.
+        """
+        counts = self._counts[:self.group_count]
+        rows = np.flatnonzero(counts)
+        columns = {}
+        for column, encoder, key_ids in zip(self.key_columns, self._column_encoders, self._group_keys()):
+            columns[column] = pa.array(encoder.keys()).take(pa.array(key_ids[rows]))
+        columns["count"] = pa.array(counts[rows])
+        for name, sums in self._sums.items():
+            columns[name] = pa.array(sums[rows])
+        table = pa.table(columns)
+        for column in self.key_columns:
+            table = table.filter(pc.is_valid(table.column(column)))
+        return table.sort_by([(column, "ascending") for column in self.key_columns])
+
+    def to_pandas(self) -> pd.DataFrame:
+        """
+        Groups as a DataFrame (see to_table).
+        """
+        return self.to_table().to_pandas()
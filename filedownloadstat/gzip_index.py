@@ -0,0 +1,507 @@
+import os
+import json
+import hashlib
+import logging
+import struct
+import zlib
+from collections import deque
+from typing import Iterator, List, Optional, Tuple, Dict, Any
+
+from interfaces import ILineSource
+
+logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b"\x1f\x8b"
+MEMBER_HEADER = GZIP_MAGIC + b"\x08"  # Magic and deflate method starting every gzip member
+GZIP_WBITS = 31  # zlib window bits for a gzip wrapped deflate stream
+READ_SIZE = 1024 * 1024  # Compressed bytes read at a time
+HEAD_BYTES = 64 * 1024  # Uncompressed bytes identifying a log file in a checkpoint
+BOUNDARY_BYTES = 32  # Compressed bytes before a member boundary identifying it in a checkpoint
+PROBE_BYTES = 16 * 1024  # Compressed bytes decompressed to tell a member header from chance bytes
+
+
+class GzipMember:
+    """
+    A gzip member of a log file.
+    :param offset: Compressed offset of the member header
+    :param ends_with_newline: Whether the uncompressed data up to the end of this member ends with a newline,
+                              None when it is not known (BGZF blocks are indexed without decompressing them)
+    """
+
+    def __init__(self, offset: int, ends_with_newline: Optional[bool] = None) -> None:
+        self.offset = offset
+        self.ends_with_newline = ends_with_newline
+
+    def __repr__(self) -> str:
+        return f"GzipMember(offset={self.offset}, ends_with_newline={self.ends_with_newline})"
+
+
+class GzipShard(ILineSource):
+    """
+    A range of whole gzip members of a log file, parsed independently of the other shards.
+
+    A shard owns the lines that start inside its range: a line cut by the start of the range
+    belongs to the previous shard, and the line cut by the end of the range is completed by
+    decompressing past the end.
+    :param file_path: Path of the gzipped log file
+    :param start: Compressed offset of the first member of the shard
+    :param end: Compressed offset of the first member after the shard (the file size for the last shard)
+    :param skip_partial_line: Whether the shard starts in the middle of a line
+    :param index: Position of the shard in the file
+    """
+
+    def __init__(self, file_path: str, start: int, end: int, skip_partial_line: bool, index: int = 0) -> None:
+        self.file_path = file_path
+        self.start = start
+        self.end = end
+        self.skip_partial_line = skip_partial_line
+        self.index = index
+
+    def __repr__(self) -> str:
+        return (f"GzipShard(file_path={self.file_path!r}, start={self.start}, end={self.end}, "
+                f"skip_partial_line={self.skip_partial_line}, index={self.index})")
+
+    def iter_lines(self) -> Iterator[bytes]:
+        """
+        Yield the raw lines owned by the shard, without their trailing newline.
+        """
+        skipping = self.skip_partial_line
+        pending = b""
+        for data, in_range in iter_member_data(self.file_path, self.start, self.end):
+            if skipping:
+                newline = data.find(b"\n")
+                if newline < 0:
+                    continue
+                data = data[newline + 1:]
+                skipping = False
+                if not in_range:
+                    # The skipped line ran past the end of the shard, nothing is owned by it
+                    return
+            if not in_range:
+                if not pending:
+                    return
+                newline = data.find(b"\n")
+                if newline < 0:
+                    pending += data
+                    continue
+                yield pending + data[:newline]
+                return
+            lines = (pending + data).split(b"\n") if pending else data.split(b"\n")
+            pending = lines.pop()
+            yield from lines
+        if pending:
+            yield pending
+
+
+def iter_member_data(file_path: str, start: int, end: int) -> Iterator[Tuple[bytes, bool]]:
+    """
+    Decompress the gzip members of a file from a member boundary.
+    :param file_path: Path of the gzipped file
+    :param start: Compressed offset of a member header
+    :param end: Compressed offset after which the data is flagged as out of range
+    :return: Generator of (uncompressed data, whether its member starts before end)
+    """
+    with open(file_path, "rb") as log_file:
+        log_file.seek(start)
+        member_start = start
+        member_read = 0
+        decompressor = zlib.decompressobj(GZIP_WBITS)
+        while True:
+            data = log_file.read(READ_SIZE)
+            if not data:
+                break
+            while data:
+                if not member_read and not data.strip(b"\x00"):
+                    # Only the trailing zero padding that gzip tolerates is left
+                    return
+                in_range = member_start < end
+                output = decompressor.decompress(data)
+                if output:
+                    yield output, in_range
+                if not decompressor.eof:
+                    member_read += len(data)
+                    break
+                used = len(data) - len(decompressor.unused_data)
+                member_start += member_read + used
+                member_read = 0
+                data = decompressor.unused_data
+                decompressor = zlib.decompressobj(GZIP_WBITS)
+        if member_read:
+            raise EOFError("Compressed file ended before the end-of-stream marker was reached")
+
+
+def build_gzip_index(file_path: str) -> List[GzipMember]:
+    """
+    Find the member boundaries of a gzipped file.
+    BGZF files are indexed by hopping over the block sizes stored in their headers; other files are
+    decompressed once to find where each member ends. A file written as a single member (plain
+    `gzip`) has one entry and cannot be split; it is recognised without decompressing it when no
+    gzip header follows the first one.
+    :param file_path: Path of the gzipped file
+    :return: Members in file order
+    """
+    members = _scan_bgzf_blocks(file_path)
+    if members is not None:
+        logger.info("BGZF file indexed", extra={"file_path": file_path, "member_count": len(members)})
+        return members
+    if not _has_later_member_header(file_path):
+        logger.info("Gzip file is a single member", extra={"file_path": file_path})
+        return [GzipMember(0)]
+    members = _scan_gzip_members(file_path)
+    logger.info("Gzip members indexed", extra={"file_path": file_path, "member_count": len(members)})
+    return members
+
+
+def _scan_bgzf_blocks(file_path: str) -> Optional[List[GzipMember]]:
+    """
+    Index a BGZF file from its block headers, None if the file is not BGZF.
+    """
+    members = []
+    with open(file_path, "rb") as log_file:
+        offset = 0
+        while True:
+            header = log_file.read(12)
+            if not header:
+                return members or None
+            if len(header) < 12 or header[:2] != GZIP_MAGIC or header[2] != 8 or not header[3] & 4:
+                return None
+            extra_length = struct.unpack("<H", header[10:12])[0]
+            block_size = _bgzf_block_size(log_file.read(extra_length))
+            if block_size is None:
+                return None
+            members.append(GzipMember(offset))
+            offset += block_size
+            log_file.seek(offset)
+
+
+def _bgzf_block_size(extra: bytes) -> Optional[int]:
+    """
+    Read the total block size from the 'BC' subfield of a BGZF header.
+    """
+    position = 0
+    while position + 4 <= len(extra):
+        subfield_length = struct.unpack("<H", extra[position + 2:position + 4])[0]
+        if extra[position:position + 2] == b"BC" and subfield_length == 2:
+            return struct.unpack("<H", extra[position + 4:position + 6])[0] + 1
+        position += 4 + subfield_length
+    return None
+
+
+def _has_later_member_header(file_path: str) -> bool:
+    """
+    Whether a gzip member header may start after the first one, from a search of the compressed bytes.
+    The header bytes also occur by chance in deflate data, so a match is only taken as a header when
+    its reserved flag bits are clear and the data after it starts decompressing as a gzip member.
+    """
+    with open(file_path, "rb") as log_file:
+        log_file.seek(1)
+        offset = 1  # File offset of buffer[0]
+        buffer = b""
+        while True:
+            data = log_file.read(READ_SIZE)
+            if not data:
+                return False
+            buffer += data
+            position = buffer.find(MEMBER_HEADER)
+            while 0 <= position < len(buffer) - len(MEMBER_HEADER):
+                if not buffer[position + len(MEMBER_HEADER)] & 0xe0 and _starts_member(file_path, offset + position):
+                    return True
+                position = buffer.find(MEMBER_HEADER, position + 1)
+            # Keep the bytes of a header cut by the end of the read
+            cut = max(0, len(buffer) - len(MEMBER_HEADER))
+            offset += cut
+            buffer = buffer[cut:]
+
+
+def _starts_member(file_path: str, offset: int) -> bool:
+    """
+    Whether the compressed data at an offset decompresses as the start of a gzip member.
+    """
+    with open(file_path, "rb") as log_file:
+        log_file.seek(offset)
+        data = log_file.read(PROBE_BYTES)
+    try:
+        zlib.decompressobj(GZIP_WBITS).decompress(data)
+    except zlib.error:
+        return False
+    return True
+
+
+def _scan_gzip_members(file_path: str) -> List[GzipMember]:
+    """
+    Index the members of a gzipped file by decompressing it once.
+    """
+    members = []
+    last_newline = True  # No partial line before the first member
+    member_read = 0
+    with open(file_path, "rb") as log_file:
+        offset = 0
+        decompressor = zlib.decompressobj(GZIP_WBITS)
+        while True:
+            data = log_file.read(READ_SIZE)
+            if not data:
+                break
+            while data:
+                if not member_read:
+                    if members and not data.strip(b"\x00"):
+                        return members
+                    members.append(GzipMember(offset))
+                output = decompressor.decompress(data)
+                if output:
+                    last_newline = output.endswith(b"\n")
+                if not decompressor.eof:
+                    member_read += len(data)
+                    break
+                offset += member_read + len(data) - len(decompressor.unused_data)
+                member_read = 0
+                members[-1].ends_with_newline = last_newline
+                data = decompressor.unused_data
+                decompressor = zlib.decompressobj(GZIP_WBITS)
+    if member_read:
+        raise EOFError("Compressed file ended before the end-of-stream marker was reached")
+    return members or [GzipMember(0)]
+
+
+def ends_with_newline(file_path: str, members: List[GzipMember], position: int) -> bool:
+    """
+    Whether the uncompressed data before members[position] ends with a newline.
+    Members indexed without decompression (BGZF) are decompressed backwards until one holds data.
+    """
+    for previous in range(position - 1, -1, -1):
+        member = members[previous]
+        if member.ends_with_newline is not None:
+            return member.ends_with_newline
+        last_data = b""
+        for data, in_range in iter_member_data(file_path, member.offset, members[previous + 1].offset):
+            if not in_range:
+                break
+            last_data = data
+        if last_data:
+            return last_data.endswith(b"\n")
+    return True
+
+
+def plan_shards(file_path: str, members: List[GzipMember], file_size: int, shard_count: int) -> List[GzipShard]:
+    """
+    Group consecutive members into shards of about the same compressed size.
+    :param file_path: Path of the gzipped file
+    :param members: Members from build_gzip_index
+    :param file_size: Size of the gzipped file
+    :param shard_count: Number of shards wanted, fewer are returned when there are not enough members
+    :return: Shards in file order
+    """
+    boundaries = [0]
+    target = file_size / max(shard_count, 1)
+    for position, member in enumerate(members[1:], start=1):
+        if len(boundaries) < shard_count and member.offset >= target * len(boundaries):
+            boundaries.append(position)
+
+    shards = []
+    for index, position in enumerate(boundaries):
+        end = members[boundaries[index + 1]].offset if index + 1 < len(boundaries) else file_size
+        shards.append(GzipShard(
+            file_path,
+            members[position].offset,
+            end,
+            skip_partial_line=not ends_with_newline(file_path, members, position),
+            index=index
+        ))
+    return shards
+
+
+class GzipCheckpoint:
+    """
+    Position reached in a gzipped log file that is still being appended to.
+    :param compressed_offset: Compressed offset of the gzip member to resume decompressing from
+    :param member_uncompressed_offset: Uncompressed offset at which that member starts
+    :param uncompressed_offset: Uncompressed offset after the last consumed line
+    :param line_no: Number of the last consumed line
+    :param head_digest: Digest of the first head_length uncompressed bytes, identifies the file
+    :param head_length: Number of uncompressed bytes in head_digest
+    :param boundary_digest: Digest of the compressed bytes before compressed_offset, identifies the member boundary
+    :param part: Index of the last Parquet part written from the file, -1 if none
+    """
+
+    def __init__(
+        self,
+        compressed_offset: int,
+        member_uncompressed_offset: int,
+        uncompressed_offset: int,
+        line_no: int,
+        head_digest: str,
+        head_length: int,
+        boundary_digest: str,
+        part: int = -1
+    ) -> None:
+        self.compressed_offset = compressed_offset
+        self.member_uncompressed_offset = member_uncompressed_offset
+        self.uncompressed_offset = uncompressed_offset
+        self.line_no = line_no
+        self.head_digest = head_digest
+        self.head_length = head_length
+        self.boundary_digest = boundary_digest
+        self.part = part
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+    @classmethod
+    def load(cls, checkpoint_file: str) -> Optional["GzipCheckpoint"]:
+        """
+        Read a checkpoint, None if there is none (or it cannot be read).
+        """
+        try:
+            with open(checkpoint_file) as f:
+                return cls(**json.load(f))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning("Ignoring unreadable checkpoint", extra={"checkpoint_file": checkpoint_file, "error": str(e)})
+            return None
+
+    def save(self, checkpoint_file: str) -> None:
+        """
+        Write the checkpoint atomically.
+        """
+        temp_path = f"{checkpoint_file}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(temp_path, checkpoint_file)
+
+
+class ResumableLineReader(ILineSource):
+    """
+    Read the complete lines of a gzipped log file from a checkpoint onwards.
+
+    Decompression resumes at the gzip member that holds the checkpoint, so records appended as new
+    members (as `gzip -c >>` or rotating writers do) are read without decompressing the file again;
+    a file recompressed from scratch is decompressed from the start and the consumed bytes skipped.
+    A file whose head no longer matches the checkpoint has been replaced and is read from the start.
+    A trailing line without newline, or a member still being written, is left for the next run.
+    :param file_path: Path of the gzipped log file
+    :param checkpoint: Checkpoint of the previous run, None to read the file from the start
+    """
+
+    def __init__(self, file_path: str, checkpoint: Optional[GzipCheckpoint] = None) -> None:
+        self.file_path = file_path
+        self.resumed = False
+        start = (0, 0, 0, 0)
+        if checkpoint is not None:
+            if self._read_head(checkpoint.head_length)[1] != checkpoint.head_digest:
+                logger.warning("Log file does not match its checkpoint, reading it from the start",
+                               extra={"file_path": file_path})
+            else:
+                self.resumed = True
+                if self._boundary_digest(checkpoint.compressed_offset) == checkpoint.boundary_digest:
+                    start = (checkpoint.compressed_offset, checkpoint.member_uncompressed_offset,
+                             checkpoint.uncompressed_offset, checkpoint.line_no)
+                else:
+                    start = (0, 0, checkpoint.uncompressed_offset, checkpoint.line_no)
+        self._resume_member = start[:2]
+        self._consumed, self._line_no = start[2:]
+        self.first_line_no = self._line_no + 1
+
+    def iter_lines(self) -> Iterator[bytes]:
+        """
+        Yield the complete lines after the checkpoint, without their trailing newline.
+        """
+        position = self._resume_member[1]
+        boundaries = deque()  # (uncompressed, compressed) offsets of member starts not yet consumed
+        pending = b""
+        for data, member_end in self._iter_data(self._resume_member[0]):
+            chunk_start = position
+            position += len(data)
+            if position > self._consumed:
+                if chunk_start < self._consumed:
+                    data = data[self._consumed - chunk_start:]
+                lines = (pending + data).split(b"\n") if pending else data.split(b"\n")
+                pending = lines.pop()
+                for line in lines:
+                    self._consumed += len(line) + 1
+                    self._line_no += 1
+                    yield line
+            if member_end is not None:
+                boundaries.append((position, member_end))
+            while boundaries and boundaries[0][0] <= self._consumed:
+                uncompressed, compressed = boundaries.popleft()
+                self._resume_member = (compressed, uncompressed)
+
+    def _iter_data(self, start: int) -> Iterator[Tuple[bytes, Optional[int]]]:
+        """
+        Decompress the members of the file from a member boundary, stopping quietly at a member
+        still being written.
+        :return: Generator of (uncompressed data, compressed offset of the next member if the data ends a member)
+        """
+        with open(self.file_path, "rb") as log_file:
+            log_file.seek(start)
+            member_start = start
+            member_read = 0
+            decompressor = zlib.decompressobj(GZIP_WBITS)
+            while True:
+                data = log_file.read(READ_SIZE)
+                if not data:
+                    return
+                while data:
+                    if not member_read and not data.strip(b"\x00"):
+                        return
+                    try:
+                        output = decompressor.decompress(data)
+                    except zlib.error as e:
+                        logger.warning("Stopped reading at an invalid gzip member",
+                                       extra={"file_path": self.file_path, "offset": member_start, "error": str(e)})
+                        return
+                    if not decompressor.eof:
+                        if output:
+                            yield output, None
+                        member_read += len(data)
+                        break
+                    member_start += member_read + len(data) - len(decompressor.unused_data)
+                    member_read = 0
+                    yield output, member_start
+                    data = decompressor.unused_data
+                    decompressor = zlib.decompressobj(GZIP_WBITS)
+
+    def checkpoint(self, part: int) -> GzipCheckpoint:
+        """
+        Checkpoint after the last line yielded.
+        :param part: Index of the last Parquet part written from the file
+        """
+        head_length, head_digest = self._read_head(min(HEAD_BYTES, self._consumed))
+        compressed, uncompressed = self._resume_member
+        return GzipCheckpoint(
+            compressed_offset=compressed,
+            member_uncompressed_offset=uncompressed,
+            uncompressed_offset=self._consumed,
+            line_no=self._line_no,
+            head_digest=head_digest,
+            head_length=head_length,
+            boundary_digest=self._boundary_digest(compressed),
+            part=part
+        )
+
+    def _read_head(self, length: int) -> Tuple[int, str]:
+        """
+        Length and digest of the first uncompressed bytes of the file (fewer if the file is shorter).
+        """
+        head = b""
+        try:
+            for data, _ in iter_member_data(self.file_path, 0, 0):
+                head += data
+                if len(head) >= length:
+                    break
+        except (OSError, EOFError, zlib.error):
+            pass
+        head = head[:length]
+        return len(head), hashlib.blake2b(head, digest_size=16).hexdigest()
+
+    def _boundary_digest(self, compressed_offset: int) -> str:
+        """
+        Digest of the compressed bytes just before a member boundary (its CRC and size trailer included).
+        """
+        with open(self.file_path, "rb") as log_file:
+            start = max(0, compressed_offset - BOUNDARY_BYTES)
+            log_file.seek(start)
+            data = log_file.read(compressed_offset - start)
+        if len(data) != compressed_offset - start:
+            return ""
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
@@ -0,0 +1,144 @@
+import os
+import json
+import hashlib
+import logging
+from typing import List, Optional, Dict, Any
+
+from log_file_parser import LogFileParser
+from parquet_writer import ParquetWriter, ParquetWriterProfile
+
+logger = logging.getLogger(__name__)
+
+
+class IngestManifest:
+    """
+    Persistent record of the log files already parsed.
+
+    Each log file has an entry keyed by its path, size, modification time and the hash of the parser
+    configuration, pointing to the content key of its output in the ParquetCache. When none of them
+    changed, the cached output is reused without reading the file again, so a run only parses (or even
+    hashes) new or modified logs.
+    Entries are written as one JSON file per log file, so that concurrent tasks sharing the cache
+    directory never rewrite each other's entries.
+    """
+
+    ENTRIES_DIR = "entries"
+
+    def __init__(self, cache_dir: str) -> None:
+        """
+        :param cache_dir: Directory holding the manifest entries
+        """
+        self.cache_dir = cache_dir
+        self.entries_dir = os.path.join(cache_dir, self.ENTRIES_DIR)
+        os.makedirs(self.entries_dir, exist_ok=True)
+
+    @staticmethod
+    def config_hash(
+        resource_list: List[str],
+        completeness_list: List[str],
+        accession_pattern_list: List[str],
+        columns: Optional[List[str]] = None,
+        compact: bool = False,
+        writer_profile: Optional[ParquetWriterProfile] = None
+    ) -> str:
+        """
+        Hash of the parser version and configuration; a change of either invalidates every entry.
+        :param columns: Output columns, all if None
+        :param compact: Whether outputs have the compact physical schema
+        :param writer_profile: Encoding settings of the outputs, the default profile if None
+        """
+        config = {
+            "parser_version": LogFileParser.PARSER_VERSION,
+            "resource_list": list(resource_list),
+            "completeness_list": sorted(c.lower().strip() for c in completeness_list),
+            "accession_pattern_list": list(accession_pattern_list),
+        }
+        schema = ParquetWriter.project_schema(columns)
+        if not schema.equals(ParquetWriter.schema):
+            config["columns"] = schema.names
+        if compact:
+            config["compact"] = True
+        if writer_profile is not None and not writer_profile.is_default():
+            config["writer_profile"] = writer_profile.to_dict()
+        return hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+    @staticmethod
+    def _path_key(file_path: str) -> str:
+        return hashlib.sha1(os.path.abspath(file_path).encode()).hexdigest()
+
+    def _entry_path(self, file_path: str) -> str:
+        return os.path.join(self.entries_dir, f"{self._path_key(file_path)}.json")
+
+    def get(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """
+        The entry of a log file, None if it was never recorded.
+        """
+        try:
+            with open(self._entry_path(file_path)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable manifest entry", extra={"file_path": file_path, "error": str(e)})
+            return None
+
+    def is_unchanged(
+        self,
+        file_path: str,
+        entry: Optional[Dict[str, Any]] = None,
+        size: Optional[int] = None,
+        mtime_ns: Optional[int] = None
+    ) -> bool:
+        """
+        Whether a log file has the size and modification time recorded in its entry.
+        :param size: Size of the log file when already known, it is stat-ed otherwise
+        :param mtime_ns: Modification time of the log file when already known
+        """
+        entry = entry if entry is not None else self.get(file_path)
+        if entry is None:
+            return False
+        if size is None or mtime_ns is None:
+            stat = os.stat(file_path)
+            size, mtime_ns = stat.st_size, stat.st_mtime_ns
+        return entry["size"] == size and entry["mtime_ns"] == mtime_ns
+
+    def lookup(self, file_path: str, config_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        The entry of a log file that can be reused: same path, size, modification time and parser configuration.
+        :return: The entry, None on a miss
+        """
+        entry = self.get(file_path)
+        if entry is None or entry["config_hash"] != config_hash or not self.is_unchanged(file_path, entry):
+            return None
+        return entry
+
+    def record(
+        self,
+        file_path: str,
+        config_hash: str,
+        key: str,
+        stat: Optional[os.stat_result] = None
+    ) -> Dict[str, Any]:
+        """
+        Record a parsed log file.
+        :param file_path: Parsed log file
+        :param config_hash: Hash of the parser configuration used
+        :param key: Content key of its output in the ParquetCache
+        :param stat: Status of the log file taken before parsing it, so that a file growing while
+                     it is parsed is not recorded as unchanged
+        :return: The new entry
+        """
+        stat = stat or os.stat(file_path)
+        entry = {
+            "path": os.path.abspath(file_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "config_hash": config_hash,
+            "key": key,
+        }
+        entry_path = self._entry_path(file_path)
+        temp_path = f"{entry_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(temp_path, entry_path)
+        return entry
@@ -6,6 +6,18 @@ from typing import Iterator, Dict, Any, Optional, List
 from pathlib import Path
 
 
+class ILineSource(ABC):
+    """Interface for sources of raw log lines, such as a range of a gzipped log file."""
+
+    file_path: str
+    first_line_no: int = 1  # Line number of the first line yielded
+
+    @abstractmethod
+    def iter_lines(self) -> Iterator[bytes]:
+        """Yield raw log lines, without their trailing newline."""
+        pass
+
+
 class ILogParser(ABC):
     """Interface for log file parsers."""
     
@@ -13,6 +25,11 @@ class ILogParser(ABC):
     def parse_gzipped_tsv(self, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
         """Parse gzipped TSV file and yield batches of parsed data."""
         pass
+
+    @abstractmethod
+    def parse_record_batches(self, batch_size: int, source: Optional[ILineSource] = None) -> Iterator[Any]:
+        """Parse gzipped TSV file and yield columnar Arrow RecordBatches."""
+        pass
     
     @abstractmethod
     def parse_row(self, row: List[str], line_no: int) -> Optional[Dict[str, Any]]:
@@ -32,6 +49,11 @@ class IParquetWriter(ABC):
     def write_batch(self, data: List[Dict[str, Any]]) -> bool:
         """Write a batch of data to Parquet file."""
         pass
+
+    @abstractmethod
+    def write_record_batch(self, batch: Any) -> bool:
+        """Write a columnar Arrow RecordBatch to Parquet file."""
+        pass
     
     @abstractmethod
     def finalize(self) -> bool:
@@ -43,8 +65,8 @@ class IParquetReader(ABC):
     """Interface for Parquet file readers."""
     
     @abstractmethod
-    def read(self, parquet_path: Path) -> Any:
-        """Read a Parquet file and return the data."""
+    def read(self, parquet_path: Path, filters: Optional[Any] = None) -> Any:
+        """Read a Parquet file or partitioned dataset and return the data."""
         pass
 
 
@@ -59,13 +81,16 @@ class IParquetAnalyzer(ABC):
         file_level_download_counts: Path,
         project_level_yearly_download_counts: Path,
         project_level_top_download_counts: Path,
-        all_data: Path
+        all_data: Path,
+        workers: int = 1
     ) -> None:
         """Analyze parquet files and generate statistics."""
         pass
     
     @abstractmethod
-    def merge_parquet_files(self, input_files: Path, output_parquet: Path) -> None:
+    def merge_parquet_files(self, input_files: Path, output_parquet: Path, writer_profile: Optional[Any] = None,
+                            partitioned: bool = False, sort_by: Optional[List[str]] = None, workers: int = 1,
+                            part_bytes: Optional[int] = None, dataset_output: bool = False) -> None:
         """Merge multiple parquet files into one."""
         pass
 
@@ -84,7 +109,11 @@ class IFileUtil(ABC):
         root_directory: str,
         file_paths_list: str,
         protocols: List[str],
-        public_list: List[str]
+        public_list: List[str],
+        cache_dir: Optional[str] = None,
+        listing_cache: Optional[str] = None,
+        scan_workers: int = 16,
+        date_window: Optional[Any] = None
     ) -> str:
         """Process access methods and generate file list."""
         pass
@@ -97,8 +126,17 @@ class IFileUtil(ABC):
         resource_list: List[str],
         completeness_list: List[str],
         batch_size: int,
-        accession_pattern_list: List[str]
-    ) -> None:
+        accession_pattern_list: List[str],
+        engine: str = "python",
+        workers: int = 1,
+        cache_dir: Optional[str] = None,
+        cache_max_bytes: Optional[int] = None,
+        checkpoint_file: Optional[str] = None,
+        columns: Optional[List[str]] = None,
+        compact: bool = False,
+        writer_profile: Optional[Any] = None,
+        write_queue: int = 0
+    ) -> bool:
         """Process a log file and convert to Parquet."""
         pass
 
@@ -1,11 +1,16 @@
 import gzip
 import re
 import logging
-from typing import Iterator, List, Dict, Any, Optional, Set
+from functools import lru_cache
+from typing import Iterator, Iterable, List, Dict, Any, Optional, Set, Tuple, Callable
 from datetime import datetime, date
 import warnings
 
-from interfaces import ILogParser
+import pyarrow as pa
+
+from interfaces import ILogParser, ILineSource
+from parquet_writer import ParquetWriter
+from record_batch_builder import RecordBatchBuilder
 
 # Suppress specific warnings
 warnings.filterwarnings("ignore", category=FutureWarning, module="dask.dataframe")
@@ -20,18 +25,100 @@ class LogFileParser(ILogParser):
     """
 
     DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+    PARSER_VERSION = "1"  # Bump whenever the rows produced from a log file change, it invalidates cached outputs
+    FIELD_NAMES: Tuple[str, ...] = tuple(ParquetWriter.schema.names)  # Parsed fields, in schema order
+    ACCESSION_CACHE_SIZE = 4096  # Project directories remembered by the accession matcher
+    # Cleaned timestamp layout that can be sliced instead of going through strptime
+    TIMESTAMP_LAYOUT = re.compile(r"\d{4}-\d{2}-\d{2}T(?:[01]\d|2[0-3]):[0-5]\d:[0-5]\d\.\d{1,6}", re.ASCII)
 
     def __init__(
         self,
         file_path: str,
         resource_list: List[str],
         completeness_list: List[str],
-        accession_pattern_list: List[str]
+        accession_pattern_list: List[str],
+        columns: Optional[List[str]] = None
     ) -> None:
+        """
+        :param columns: Output columns to produce (see ParquetWriter.project_schema), all if None
+        """
         self.file_path: str = file_path
         self.RESOURCE_IDENTIFIERS: List[str] = resource_list
         self.completeness: Set[str] = {c.lower().strip() for c in completeness_list}
         self.accession_pattern_list: List[str] = accession_pattern_list
+        self._accession_patterns: List[re.Pattern] = self._compile_accession_patterns(accession_pattern_list)
+        self._accession_matcher: Optional[re.Pattern] = self._compile_accession_matcher(self._accession_patterns)
+        # Thousands of rows share a project directory, so remember the accessions found in each directory
+        self._directory_accessions = lru_cache(maxsize=self.ACCESSION_CACHE_SIZE)(self._search_accessions)
+        self._resource_tokens: Optional[Tuple[bytes, ...]] = self._prefilter_tokens(resource_list)
+        self._completeness_tokens: Optional[Tuple[bytes, ...]] = self._prefilter_tokens(sorted(self.completeness))
+        self.parse_summary: Dict[str, Any] = {}
+        self.schema: pa.Schema = ParquetWriter.project_schema(columns)
+        self.FIELD_NAMES = tuple(self.schema.names)
+        # Only the requested fields are computed, unless all of them are
+        self._field_getters: Optional[Tuple[Callable, ...]] = (
+            None if self.schema.equals(ParquetWriter.schema) else tuple(self._field_getter(name) for name in self.FIELD_NAMES)
+        )
+
+    def _field_getter(self, name: str) -> Callable[[List[str], str, Tuple[date, int, int]], Any]:
+        """
+        Function computing one output field from the split row, its accession and its decoded timestamp.
+        """
+        return {
+            "date": lambda row, accession, day: day[0],
+            "year": lambda row, accession, day: day[1],
+            "month": lambda row, accession, day: day[2],
+            "user": lambda row, accession, day: row[1].strip(),
+            "accession": lambda row, accession, day: accession,
+            "filename": lambda row, accession, day: row[3].split('/')[-1],
+            "completed": lambda row, accession, day: row[6].lower().strip(),
+            "country": lambda row, accession, day: row[7],
+            "method": lambda row, accession, day: row[11],
+            "timestamp": lambda row, accession, day: row[0].strip(),
+            "geoip_region_name": lambda row, accession, day: self.clean_geoip_value(row[8]) if row[8] else "",
+            "geoip_city_name": lambda row, accession, day: self.clean_geoip_value(row[9]) if row[9] else "",
+            "geo_location": lambda row, accession, day: row[10].strip() if row[10] else "",
+        }[name]
+
+    @staticmethod
+    def _prefilter_tokens(values: List[str]) -> Optional[Tuple[bytes, ...]]:
+        """
+        Encode values for the byte-level pre-filter of raw lines.
+        Returns None (no pre-filter) when a value could be altered by the literal '\\t' replacement
+        or by lower-casing non-ASCII text, as the pre-filter must never drop a relevant line.
+        """
+        if any(not value or not value.isascii() or '\\' in value or '\t' in value for value in values):
+            return None
+        return tuple(value.encode("ascii") for value in values)
+
+    @staticmethod
+    def _compile_accession_patterns(accession_pattern_list: List[str]) -> List[re.Pattern]:
+        """
+        Compile the accession patterns once, in order.
+        An invalid pattern stops the list, as get_accession used to give up at the first regex error.
+        """
+        patterns = []
+        for pattern in accession_pattern_list:
+            try:
+                patterns.append(re.compile(re.sub(r"\\\\", r"\\", pattern)))  # Fix escaping issues
+            except re.error as regex_err:
+                logger.error("Regex error in accession pattern", extra={"pattern": pattern, "error": str(regex_err)})
+                break
+        return patterns
+
+    @staticmethod
+    def _compile_accession_matcher(patterns: List[re.Pattern]) -> Optional[re.Pattern]:
+        """
+        Combine the accession patterns into a single alternation, used to reject paths in one search.
+        """
+        if len(patterns) == 1:
+            return patterns[0]
+        try:
+            return re.compile("|".join(f"(?:{pattern.pattern})" for pattern in patterns)) if patterns else None
+        except re.error as regex_err:
+            # e.g. inline global flags, which are only allowed at the start of a pattern
+            logger.warning("Accession patterns cannot be combined", extra={"error": str(regex_err)})
+            return None
 
     def parse_gzipped_tsv(self, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
         """
@@ -40,24 +127,93 @@ class LogFileParser(ILogParser):
         :return: Generator that yields batches of parsed data.
         """
         batch = []
+        for fields in self._iter_parsed_fields():
+            batch.append(dict(zip(self.FIELD_NAMES, fields)))
+            # Yield the batch when it reaches the desired size
+            if len(batch) == batch_size:
+                yield batch
+                batch = []  # Reset the batch after yielding
+        if batch:
+            yield batch
+
+    def parse_record_batches(self, batch_size: int, source: Optional[ILineSource] = None) -> Iterator[pa.RecordBatch]:
+        """
+        Read the gzipped TSV file, parse each line, and yield columnar RecordBatches.
+        Parsed fields are appended straight into per-column buffers instead of per-row dicts.
+        :param batch_size: Number of rows to include in each batch.
+        :param source: Parse the lines of this source (e.g. a shard of the file) instead of the whole file
+        :return: Generator that yields RecordBatches matching the parser schema.
+        """
+        builder = RecordBatchBuilder(self.schema)
+        for fields in self._iter_parsed_fields(source):
+            builder.append(fields)
+            if len(builder) == batch_size:
+                yield builder.build()
+        if len(builder):
+            yield builder.build()
+
+    def _iter_parsed_fields(self, source: Optional[ILineSource] = None) -> Iterator[Tuple[Any, ...]]:
+        """
+        Read the gzipped TSV file and yield the parsed fields of every relevant row.
+        :param source: Parse the lines of this source instead of the whole file
+        :return: Generator of field tuples in FIELD_NAMES order.
+        """
+        self.parse_summary = {}
         try:
-            with gzip.open(self.file_path, "rt", encoding="utf-8") as log_file:
-                for line_no, line in enumerate(log_file, start=1):
-                    line = line.replace('\\t', '\t')  # Replace literal '\t' with actual tab
-                    row = line.strip().split('\t')  # Split each line by tab
-                    parsed_line = self.parse_row(row, line_no)
-                    if parsed_line:
-                        batch.append(parsed_line)
-                        # Yield the batch when it reaches the desired size
-                        if len(batch) == batch_size:
-                            yield batch
-                            batch = []  # Reset the batch after yielding
-                if batch:
-                    yield batch
+            if source is not None:
+                yield from self.parse_lines(source.iter_lines(), source.first_line_no)
+            else:
+                with gzip.open(self.file_path, "rb") as log_file:
+                    yield from self.parse_lines(log_file)
         except OSError as e:
             logger.warning("Skipping corrupted file", extra={"file_path": self.file_path, "error": str(e)})
         except Exception as e:
             logger.error("Exception while processing file", extra={"file_path": self.file_path, "error": str(e)}, exc_info=True)
+        finally:
+            if self.parse_summary:
+                logger.info("Parse summary", extra={"file_path": self.file_path, **self.parse_summary})
+
+    def parse_lines(self, lines: Iterable[bytes], start_line_no: int = 1) -> Iterator[Tuple[Any, ...]]:
+        """
+        Parse raw (undecoded) log lines and yield the fields of every relevant row.
+        Lines that do not contain any resource identifier (or completeness status) are rejected with a
+        byte search before they are decoded and split; the counts are kept in parse_summary.
+        :param lines: Iterable of raw log lines
+        :param start_line_no: Line number of the first line
+        :return: Generator of field tuples in FIELD_NAMES order.
+        """
+        resource_tokens = self._resource_tokens
+        completeness_tokens = self._completeness_tokens
+        lines_read = lines_prefiltered = rows_parsed = 0
+        try:
+            for line_no, raw_line in enumerate(lines, start=start_line_no):
+                lines_read += 1
+                if resource_tokens is not None and not any(token in raw_line for token in resource_tokens):
+                    lines_prefiltered += 1
+                    continue
+                if completeness_tokens is not None:
+                    lowered_line = raw_line.lower()
+                    if not any(token in lowered_line for token in completeness_tokens):
+                        lines_prefiltered += 1
+                        continue
+                line = raw_line.decode("utf-8").replace('\\t', '\t')  # Replace literal '\t' with actual tab
+                row = line.strip().split('\t')  # Split each line by tab
+                fields = self.parse_fields(row, line_no)
+                if fields:
+                    rows_parsed += 1
+                    yield fields
+        finally:
+            self._update_parse_summary(lines_read, lines_prefiltered, rows_parsed)
+
+    def _update_parse_summary(self, lines_read: int, lines_prefiltered: int, rows_parsed: int) -> None:
+        """
+        Accumulate line counts into parse_summary, including the share of lines skipped by the pre-filter.
+        """
+        summary = self.parse_summary
+        summary["lines_read"] = summary.get("lines_read", 0) + lines_read
+        summary["lines_prefiltered"] = summary.get("lines_prefiltered", 0) + lines_prefiltered
+        summary["rows_parsed"] = summary.get("rows_parsed", 0) + rows_parsed
+        summary["skip_ratio"] = round(summary["lines_prefiltered"] / summary["lines_read"], 4) if summary["lines_read"] else 0.0
 
     def is_relevant_row(self, row: List[str]) -> bool:
         """
@@ -65,27 +221,34 @@ class LogFileParser(ILogParser):
         :param row: List of row values
         :return: Boolean indicating if the row is relevant
         """
-        if  '/' in row[3]:
+        return self.relevant_accession(row) is not None
 
-            if any(row[3].startswith(identifier) for identifier in self.RESOURCE_IDENTIFIERS):
-                accession_field = self.get_accession(row[3])
-                if accession_field is not None:
-                    if row[3].split('/')[-1] is not None and row[3].split('/')[-1] != "":    # filename cannot be null
-                        if  row[6].lower().strip() in self.completeness:
-                            return True # all condition matched
-                    else:
-                        return False
-                else:
-                    return False
-
-            else:
-                return False
-        else:
-            return False
+    def relevant_accession(self, row: List[str]) -> Optional[str]:
+        """
+        Checks if the row is relevant and returns its accession, so it is only looked up once per row.
+        :param row: List of row values
+        :return: Accession of a relevant row, None otherwise
+        """
+        path = row[3]
+        if '/' not in path:
+            return None
+        if not any(path.startswith(identifier) for identifier in self.RESOURCE_IDENTIFIERS):
+            return None
+        accession = self.get_accession(path)
+        if accession is None:
+            return None
+        if path.endswith('/'):  # filename cannot be empty
+            return None
+        if row[6].lower().strip() not in self.completeness:
+            return None
+        return accession  # all condition matched
 
     def get_accession(self, path: str) -> Optional[str]:
         """
         Searches for an accession number in the given path.
+        The first pattern matching anywhere in the path wins. The match of each pattern in the directory
+        part of the path is cached, because resources keep their files under a project directory; the
+        file name is only searched for the patterns before the first one matching the directory.
 
         Args:
             path (str): The file path to check.
@@ -94,18 +257,29 @@ class LogFileParser(ILogParser):
             str or None: The matched accession number as a string, or None if no match is found.
         """
         try:
-            for pattern in self.accession_pattern_list:
-                corrected_pattern = re.sub(r"\\\\", r"\\", pattern)  # Fix escaping issues
-                match = re.search(corrected_pattern, path)
-                if match:
-                    return match.group()
-        except re.error as regex_err:
-            logger.error("Regex error in get_accession", extra={"pattern": pattern, "error": str(regex_err)})
+            directory_end = path.rfind('/') + 1
+            directory_accessions = self._directory_accessions(path[:directory_end])
+            for pattern, accession in zip(self._accession_patterns, directory_accessions):
+                if accession is not None:
+                    return accession
+                if directory_end < len(path):
+                    match = pattern.search(path, directory_end)
+                    if match:
+                        return match.group()
         except Exception as e:
             logger.error("Unexpected error in get_accession", extra={"error": str(e)}, exc_info=True)
 
         return None  # No match found or an error occurred
 
+    def _search_accessions(self, text: str) -> Tuple[Optional[str], ...]:
+        """
+        First match of each accession pattern in the text, in pattern order.
+        """
+        if self._accession_matcher is not None and self._accession_matcher.search(text) is None:
+            return (None,) * len(self._accession_patterns)
+        return tuple(match.group() if match else None
+                     for match in (pattern.search(text) for pattern in self._accession_patterns))
+
     def parse_row(self, row: List[str], line_no: int) -> Optional[Dict[str, Any]]:
         """
         Define a function to parse each row by extracting fields by column index
@@ -113,32 +287,40 @@ class LogFileParser(ILogParser):
         :param line_no:
         :return:
         """
+        fields = self.parse_fields(row, line_no)
+        return dict(zip(self.FIELD_NAMES, fields)) if fields else None
+
+    def parse_fields(self, row: List[str], line_no: int) -> Optional[Tuple[Any, ...]]:
+        """
+        Parse a row into a tuple of field values in FIELD_NAMES order
+        :param row:
+        :param line_no:
+        :return:
+        """
         if len(row) == 13:
-            if self.is_relevant_row(row):
+            accession = self.relevant_accession(row)
+            if accession is not None:
                 try:
-                    timestamp = self.clean_timestamp(row[0])
-                    parsed_time = datetime.strptime(timestamp, self.DATETIME_FORMAT)
-
-                    # Extract year, month, and date
-                    year = parsed_time.year
-                    month = parsed_time.month
-                    date = parsed_time.date()
-
-                    return {
-                        "date": date,  # Date
-                        "year": year,
-                        "month": month,
-                        "user": row[1].strip(),
-                        "accession": self.get_accession(row[3]),  # Project accession of the resource(eg: PXD accession in PRIDE)
-                        "filename": row[3].split('/')[-1],  # Files that are associate to a project(project acceesion)
-                        "completed": row[6].lower().strip(),  # Completion Status (e.g., Complete or Incomplete)
-                        "country": row[7],  # Country
-                        "method": row[11],  # Method (e.g., ftp, aspera)
-                        "timestamp": row[0].strip(),  # Original timestamp string
-                        "geoip_region_name": self.clean_geoip_value(row[8]) if row[8] else "",  # GeoIP region name (e.g., Shaanxi)
-                        "geoip_city_name": self.clean_geoip_value(row[9]) if row[9] else "",  # GeoIP city name (e.g., Xi'an)
-                        "geo_location": row[10].strip() if row[10] else "",  # Geo location coordinates (e.g., 34.3287,109.0337)
-                    }
+                    download_date, year, month = self.decode_timestamp(row[0])
+                    if self._field_getters is not None:
+                        day = (download_date, year, month)
+                        return tuple(getter(row, accession, day) for getter in self._field_getters)
+
+                    return (
+                        download_date,  # Date
+                        year,
+                        month,
+                        row[1].strip(),  # User
+                        accession,  # Project accession of the resource(eg: PXD accession in PRIDE)
+                        row[3].split('/')[-1],  # Files that are associate to a project(project acceesion)
+                        row[6].lower().strip(),  # Completion Status (e.g., Complete or Incomplete)
+                        row[7],  # Country
+                        row[11],  # Method (e.g., ftp, aspera)
+                        row[0].strip(),  # Original timestamp string
+                        self.clean_geoip_value(row[8]) if row[8] else "",  # GeoIP region name (e.g., Shaanxi)
+                        self.clean_geoip_value(row[9]) if row[9] else "",  # GeoIP city name (e.g., Xi'an)
+                        row[10].strip() if row[10] else "",  # Geo location coordinates (e.g., 34.3287,109.0337)
+                    )
                 except IndexError as e:
                     logger.error("Error processing line", extra={"line_no": line_no, "row": row, "error": str(e)})
                     raise IndexError(f"IndexError: Row {line_no} with insufficient columns: {row}. Error: {e}")
@@ -148,6 +330,36 @@ class LogFileParser(ILogParser):
             logger.warning("Unexpected column count", extra={"line_no": line_no, "expected": 13, "found": len(row), "row": row})
             return None
 
+    def decode_timestamp(self, timestamp: str) -> Tuple[date, int, int]:
+        """
+        Decodes the date, year and month of a raw timestamp.
+        Well-formed timestamps are sliced at their fixed positions and the day is memoized, because a
+        daily log only covers one or two days. Anything else goes through strptime, which raises
+        ValueError for malformed values.
+        eg: 2024-09-13T23:58:17.000Z / 2024-09-14T07:14:07.419698061Z
+        :param timestamp: Raw timestamp string
+        :return: Tuple of (date, year, month)
+        """
+        timestamp = self.clean_timestamp(timestamp)
+        if self.TIMESTAMP_LAYOUT.fullmatch(timestamp):
+            try:
+                return self._decode_day(timestamp[:10])
+            except ValueError:
+                pass  # Impossible day such as 2023-02-30, let strptime report it
+        parsed_time = datetime.strptime(timestamp, self.DATETIME_FORMAT)
+        return parsed_time.date(), parsed_time.year, parsed_time.month
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _decode_day(day: str) -> Tuple[date, int, int]:
+        """
+        Decodes a YYYY-MM-DD day prefix.
+        :param day: First 10 characters of a timestamp
+        :return: Tuple of (date, year, month)
+        """
+        decoded = date(int(day[:4]), int(day[5:7]), int(day[8:10]))
+        return decoded, decoded.year, decoded.month
+
     @staticmethod
     def clean_timestamp(timestamp: str) -> str:
         """
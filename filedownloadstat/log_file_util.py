@@ -1,26 +1,104 @@
 import os
+import time
+import heapq
+import shutil
+import hashlib
 import logging
-from typing import List, Optional, Callable
+import tempfile
+import zlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Callable, Iterator, Tuple, Dict, Any
 from pathlib import Path
 
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from background_writer import BackgroundWriter
+from date_window import DateWindow
+from directory_scanner import DirectoryScanner
+from gzip_index import GzipShard, GzipCheckpoint, ResumableLineReader, build_gzip_index, plan_shards
+from ingest_manifest import IngestManifest
+from parquet_cache import ParquetCache
 from log_file_parser import LogFileParser
-from parquet_writer import ParquetWriter
+from arrow_log_parser import ArrowLogFileParser
+from parquet_writer import ParquetWriter, ParquetWriterProfile
 from exceptions import (
     LogFileNotFoundError,
     ParquetWriteError,
-    LogFileCorruptedError
+    LogFileCorruptedError,
+    ValidationError
 )
 from interfaces import IFileUtil
 
 logger = logging.getLogger(__name__)
 
 
+def _parse_shard(task: Tuple[Callable, GzipShard, Tuple[List[str], List[str], List[str], Optional[List[str]]], int, str]) -> Optional[str]:
+    """
+    Parse one shard of a log file into a partial Parquet file, run in a worker process.
+    :return: Path of the partial Parquet file, None if the shard has no relevant rows
+    """
+    parser_factory, shard, parser_args, batch_size, part_path = task
+    parser = parser_factory(shard.file_path, *parser_args)
+    writer = ParquetWriter(parquet_path=part_path, write_strategy='batch', batch_size=batch_size,
+                           columns=list(parser.FIELD_NAMES))
+    data_written = False
+    for batch in parser.parse_record_batches(batch_size, shard):
+        if writer.write_record_batch(batch):
+            data_written = True
+    writer.finalize()
+    return part_path if data_written else None
+
+
+def _process_log_file_task(
+    task: Tuple[Callable, Callable, str, str, Tuple[List[str], List[str], List[str], Optional[List[str]]], int, str, Optional[str], Optional[int], bool,
+                Optional[ParquetWriterProfile], int]
+) -> Dict[str, Any]:
+    """
+    Process one log file of a batch, run in a worker process.
+    :return: Manifest record of the file
+    """
+    parser_factory, writer_factory, file_path, parquet_output_file, parser_args, batch_size, engine, cache_dir, cache_max_bytes, compact, writer_profile, write_queue = task
+    resource_list, completeness_list, accession_pattern_list, columns = parser_args
+    started = time.perf_counter()
+    status, error = "success", ""
+    try:
+        file_util = FileUtil(parser_factory=parser_factory, writer_factory=writer_factory)
+        if not file_util.process_log_file(file_path, parquet_output_file, resource_list, completeness_list, batch_size,
+                                          accession_pattern_list, engine=engine, cache_dir=cache_dir,
+                                          cache_max_bytes=cache_max_bytes, columns=columns, compact=compact,
+                                          writer_profile=writer_profile, write_queue=write_queue):
+            status = "empty"
+    except Exception as e:
+        status, error = "failed", str(e)
+    return {
+        "path": file_path,
+        "output": parquet_output_file if status == "success" else "",
+        "status": status,
+        "seconds": round(time.perf_counter() - started, 3),
+        "error": error,
+    }
+
+
 class FileUtil(IFileUtil):
     """
     File utility class for processing log files.
     Supports dependency injection for better testability.
     """
 
+    # Parse engines selectable from the process_log_file command
+    PARSER_ENGINES = {
+        "python": LogFileParser,
+        "arrow": ArrowLogFileParser,
+    }
+    SHARDS_PER_WORKER = 4  # More shards than workers keeps the pool busy when shards parse at different speeds
+    MANIFEST_FILE = "manifest.tsv"
+    MANIFEST_COLUMNS = ("path", "output", "status", "seconds", "error")
+    FILE_LIST_COLUMNS = ("path", "filename", "size", "protocol")  # Columns written by process_access_methods
+    WORK_UNITS_FILE = "work_units.tsv"
+    WORK_UNIT_COLUMNS = ("unit", "kind", "file_count", "size", "file_list")
+
     def __init__(
         self,
         parser_factory: Optional[Callable] = None,
@@ -39,57 +117,65 @@ class FileUtil(IFileUtil):
     def get_file_paths(self, root_dir: str) -> List[str]:
         """
         Traverse the directory tree and retrieve all file paths.
-        Handles variable folder depth safely using pathlib.
         :param root_dir: Root directory to start traversal.
         :return: List of file paths.
         """
-        root_path = Path(root_dir)
-        return [str(file) for file in root_path.rglob("*.tsv.gz")]
-
+        return [scanned_file.path for scanned_file in DirectoryScanner().scan([root_dir])[0]]
 
     def process_access_methods(
         self,
         root_directory: str,
         file_paths_list: str,
         protocols: List[str],
-        public_list: List[str]
+        public_list: List[str],
+        cache_dir: Optional[str] = None,
+        listing_cache: Optional[str] = None,
+        scan_workers: int = DirectoryScanner.DEFAULT_WORKERS,
+        date_window: Optional[DateWindow] = None
     ) -> str:
         """
         Process logs and generate Parquet files for each file in the specified access method directories.
+        With cache_dir, the number of files new or changed since they were last parsed is logged; the file
+        list keeps its four columns. Files counted as unchanged are still parsed again after a change of the
+        parser configuration.
+        :param listing_cache: Directory listings kept between runs; unchanged directories are not listed again
+        :param scan_workers: Number of threads listing the access method directories
+        :param date_window: Only list the log files whose year, month or date directories and file names
+                            fall in this window; undated paths are always listed
         """
+        manifest = IngestManifest(cache_dir) if cache_dir else None
 
-        file_metadata = []
-
-        for protocol in protocols:
-            for public_private in public_list:
-                method_directory = Path(root_directory) / protocol.strip() / public_private.strip()
-                files = self.get_file_paths(str(method_directory))
-
-                for file_path in files:
-                    file_path_obj = Path(file_path)
+        access_methods = [(protocol, public_private) for protocol in protocols for public_private in public_list]
+        scanner = DirectoryScanner(scan_workers, listing_cache, date_window=date_window)
+        scanned = scanner.scan([
+            str(Path(root_directory) / protocol.strip() / public_private.strip())
+            for protocol, public_private in access_methods
+        ])
 
-                    # Retrieve file size
-                    file_size = file_path_obj.stat().st_size
-
-                    # Count number of lines in the gzipped file
-                    # line_count = self.count_lines_in_gz(file_path)
-
-                    file_info = {
-                        "path": file_path,
-                        "filename": file_path_obj.name,
-                        "size": file_size,
-                        "protocol": protocol,
-                    }
-                    file_metadata.append(file_info)
+        file_metadata = []
+        unchanged_count = 0
+        for (protocol, _), scanned_files in zip(access_methods, scanned):
+            for scanned_file in scanned_files:
+                file_info = {
+                    "path": scanned_file.path,
+                    "filename": os.path.basename(scanned_file.path),
+                    "size": scanned_file.size,
+                    "protocol": protocol,
+                }
+                if manifest and manifest.is_unchanged(scanned_file.path, size=scanned_file.size,
+                                                      mtime_ns=scanned_file.mtime_ns):
+                    unchanged_count += 1
+                file_metadata.append(file_info)
 
-            # Write metadata to the output file
+        # Write metadata to the output file
         with open(file_paths_list, "w") as f:
             for metadata in file_metadata:
-                f.write(
-                    f"{metadata['path']}\t{metadata['filename']}\t{metadata['size']}\t{metadata['protocol']}\n"
-                )
+                f.write(f"{metadata['path']}\t{metadata['filename']}\t{metadata['size']}\t{metadata['protocol']}\n")
 
         logger.info("File metadata written", extra={"output_file": file_paths_list, "file_count": len(file_metadata)})
+        if manifest:
+            logger.info("Files to ingest", extra={"new": len(file_metadata) - unchanged_count,
+                                                  "unchanged": unchanged_count})
         return file_paths_list
 
     def process_log_file(
@@ -99,11 +185,48 @@ class FileUtil(IFileUtil):
         resource_list: List[str],
         completeness_list: List[str],
         batch_size: int,
-        accession_pattern_list: List[str]
-    ) -> None:
+        accession_pattern_list: List[str],
+        engine: str = "python",
+        workers: int = 1,
+        cache_dir: Optional[str] = None,
+        cache_max_bytes: Optional[int] = None,
+        checkpoint_file: Optional[str] = None,
+        columns: Optional[List[str]] = None,
+        compact: bool = False,
+        writer_profile: Optional[ParquetWriterProfile] = None,
+        write_queue: int = 0
+    ) -> bool:
+        """
+        Parse a log file into a Parquet file.
+        With cache_dir, a log file already parsed with the same parser version and configuration reuses
+        the cached Parquet output: unchanged paths are found through the IngestManifest (size and
+        modification time), other files through the content hash of the ParquetCache.
+        Newly parsed outputs are stored there, evicting the least recently used beyond cache_max_bytes.
+        With checkpoint_file, only the records appended since the checkpoint are parsed, into the next
+        part of the output (see part_output_path); the checkpoint is advanced once the part is written.
+        A log file replaced since the checkpoint is parsed again from part 0.
+        With columns, only these output columns are computed and written (see ParquetWriter.project_schema).
+        With compact, the output has the physical types of ParquetWriter.COMPACT_SCHEMA.
+        With writer_profile, the output is encoded with these settings instead of the default profile.
+        With write_queue, record batches are encoded on a BackgroundWriter thread while the next ones are
+        parsed, at most write_queue batches waiting for it.
+        :return: Whether any row was written (no Parquet file is created otherwise)
+        """
         data_written = False
+        if engine not in self.PARSER_ENGINES:
+            raise ValidationError(
+                f"Unknown parser engine: {engine}. Expected one of {', '.join(self.PARSER_ENGINES)}",
+                field="engine",
+                value=engine
+            )
+        if checkpoint_file and (workers > 1 or cache_dir):
+            raise ValidationError(
+                "A checkpoint cannot be combined with several workers or a cache directory",
+                field="checkpoint_file",
+                value=checkpoint_file
+            )
         try:
-            logger.info("Parsing log file started", extra={"file_path": file_path, "output_file": parquet_output_file})
+            logger.info("Parsing log file started", extra={"file_path": file_path, "output_file": parquet_output_file, "engine": engine})
 
             if not os.path.exists(file_path):
                 raise LogFileNotFoundError(
@@ -111,12 +234,62 @@ class FileUtil(IFileUtil):
                     file_path=file_path
                 )
 
-            lp = self._parser_factory(file_path, resource_list, completeness_list, accession_pattern_list)
-            writer = self._writer_factory(parquet_path=parquet_output_file, write_strategy='batch', batch_size=batch_size)
+            cache = ParquetCache(cache_dir, cache_max_bytes) if cache_dir else None
+            if cache:
+                manifest = IngestManifest(cache_dir)
+                config_hash = IngestManifest.config_hash(resource_list, completeness_list, accession_pattern_list, columns,
+                                                         compact, writer_profile)
+                file_stat = os.stat(file_path)
+                entry = manifest.lookup(file_path, config_hash)
+                object_path = cache.lookup(entry["key"]) if entry else None
+                if object_path is not None:
+                    key = entry["key"]
+                else:
+                    key = cache.content_key(file_path, config_hash)
+                    object_path = cache.lookup(key)
+                    if object_path is not None:
+                        manifest.record(file_path, config_hash, key, file_stat)
+                if object_path is not None:
+                    logger.info("Reusing cached Parquet output", extra={"file_path": file_path, "output_file": parquet_output_file, "key": key})
+                    return cache.restore(object_path, parquet_output_file)
+
+            source = None
+            if checkpoint_file:
+                checkpoint = GzipCheckpoint.load(checkpoint_file)
+                source = ResumableLineReader(file_path, checkpoint)
+                if source.resumed:
+                    part = checkpoint.part + 1
+                    logger.info("Resuming log file from checkpoint", extra={"file_path": file_path, "line_no": checkpoint.line_no})
+                else:
+                    part = 0
+                    # Parts of a replaced log file are stale
+                    stale_part = 0
+                    while os.path.exists(self.part_output_path(parquet_output_file, stale_part)):
+                        os.remove(self.part_output_path(parquet_output_file, stale_part))
+                        stale_part += 1
+                parquet_output_file = self.part_output_path(parquet_output_file, part)
+
+            parser_factory = self._parser_factory if engine == "python" else self.PARSER_ENGINES[engine]
+            parser_args = (resource_list, completeness_list, accession_pattern_list, columns)
+            writer = self._writer_factory(parquet_path=parquet_output_file, write_strategy='batch', batch_size=batch_size,
+                                          columns=columns, compact=compact, profile=writer_profile)
+            if write_queue > 0:
+                writer = BackgroundWriter(writer, write_queue)
+
+            shards = self._plan_log_file_shards(file_path, workers) if workers > 1 else None
+            if shards:
+                batches = self._iter_shard_batches(shards, parser_factory, parser_args, batch_size, parquet_output_file, workers)
+            else:
+                batches = parser_factory(file_path, *parser_args).parse_record_batches(batch_size, source)
 
-            for batch in lp.parse_gzipped_tsv(batch_size):
-                if writer.write_batch(batch):
-                    data_written = True
+            try:
+                for batch in batches:
+                    if writer.write_record_batch(batch):
+                        data_written = True
+            except BaseException:
+                if write_queue > 0:
+                    writer.abort()
+                raise
 
             # Finalize and check if any data was written
             if writer.finalize():
@@ -126,6 +299,12 @@ class FileUtil(IFileUtil):
                 logger.info("Parquet file written successfully", extra={"file_path": file_path, "output_file": parquet_output_file})
             else:
                 logger.warning("No data found to write", extra={"file_path": file_path})
+            if cache:
+                cache.store(key, parquet_output_file if data_written else None)
+                manifest.record(file_path, config_hash, key, file_stat)
+            if source:
+                source.checkpoint(part if data_written else part - 1).save(checkpoint_file)
+            return data_written
         except LogFileNotFoundError:
             # Re-raise as-is - this is a fatal error
             raise
@@ -142,3 +321,228 @@ class FileUtil(IFileUtil):
             )
             logger.error("Error while processing file", extra={"file_path": file_path, "error": str(e)}, exc_info=True)
             raise error
+
+    def process_log_files(
+        self,
+        file_list: str,
+        output_dir: str,
+        resource_list: List[str],
+        completeness_list: List[str],
+        batch_size: int,
+        accession_pattern_list: List[str],
+        engine: str = "python",
+        workers: int = 1,
+        start: int = 0,
+        count: Optional[int] = None,
+        cache_dir: Optional[str] = None,
+        cache_max_bytes: Optional[int] = None,
+        columns: Optional[List[str]] = None,
+        compact: bool = False,
+        writer_profile: Optional[ParquetWriterProfile] = None,
+        write_queue: int = 0
+    ) -> str:
+        """
+        Parse many log files in one process pool, one Parquet file per log file.
+        A file that fails does not stop the batch; the outcome of every file is written to a manifest.
+        :param file_list: File list written by process_access_methods (path in the first column)
+        :param output_dir: Directory for the Parquet files and the manifest
+        :param workers: Number of worker processes
+        :param start: Index of the first file of the list to process
+        :param count: Number of files to process from start, all remaining files if None
+        :param cache_dir: Reuse the outputs of log files already parsed kept in this directory (see process_log_file)
+        :param cache_max_bytes: Size bound of the cache directory
+        :param columns: Output columns to write, all if None
+        :param compact: Write the compact physical schema (see ParquetWriter.COMPACT_SCHEMA)
+        :param writer_profile: Encoding settings of the Parquet files, the default profile if None
+        :param write_queue: Record batches queued for a background writer thread per file, 0 to write inline
+        :return: Path of the manifest
+        """
+        file_paths = self.read_file_list(file_list)
+        file_paths = file_paths[start:start + count if count is not None else None]
+        os.makedirs(output_dir, exist_ok=True)
+        parser_args = (resource_list, completeness_list, accession_pattern_list, columns)
+        tasks = [
+            (self._parser_factory, self._writer_factory, file_path,
+             os.path.join(output_dir, self.parquet_output_name(file_path)), parser_args, batch_size, engine, cache_dir,
+             cache_max_bytes, compact, writer_profile, write_queue)
+            for file_path in file_paths
+        ]
+        logger.info("Processing log files", extra={"file_list": file_list, "file_count": len(tasks), "workers": workers})
+
+        if workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                records = list(executor.map(_process_log_file_task, tasks))
+        else:
+            records = [_process_log_file_task(task) for task in tasks]
+
+        manifest_path = os.path.join(output_dir, self.MANIFEST_FILE)
+        with open(manifest_path, "w") as f:
+            f.write("\t".join(self.MANIFEST_COLUMNS) + "\n")
+            for record in records:
+                f.write("\t".join(" ".join(str(record[column]).split()) for column in self.MANIFEST_COLUMNS) + "\n")
+
+        statuses = [record["status"] for record in records]
+        summary = {status: statuses.count(status) for status in ("success", "empty", "failed")}
+        if summary["failed"]:
+            logger.error("Some log files failed", extra={"manifest": manifest_path, **summary})
+        else:
+            logger.info("Log files processed", extra={"manifest": manifest_path, **summary})
+        return manifest_path
+
+    @classmethod
+    def read_manifest(cls, manifest_path: str) -> List[Dict[str, str]]:
+        """
+        Read the manifest written by process_log_files.
+        """
+        with open(manifest_path) as f:
+            next(f)  # Header
+            return [dict(zip(cls.MANIFEST_COLUMNS, line.rstrip("\n").split("\t"))) for line in f if line.strip()]
+
+    def pack_work_units(
+        self,
+        file_list: str,
+        output_dir: str,
+        target_bytes: int,
+        shard_threshold_bytes: Optional[int] = None
+    ) -> str:
+        """
+        Pack the log files of a file list into work units of about target_bytes compressed bytes each.
+        Files are assigned largest first to the least filled unit, so small files fill the gaps left by
+        large ones. Files of at least shard_threshold_bytes get a unit of their own of kind 'shard',
+        meant to be parsed with intra-file sharding; the other units are of kind 'pack'.
+        Every unit is written as a file list in the process_access_methods format, and a work_units.tsv
+        manifest lists the units.
+        :param file_list: File list written by process_access_methods
+        :param output_dir: Directory for the unit file lists and the manifest
+        :param target_bytes: Compressed bytes wanted per packed unit
+        :param shard_threshold_bytes: Size from which a file is flagged for sharding, never if None
+        :return: Path of the work unit manifest
+        """
+        if target_bytes <= 0:
+            raise ValidationError("Work unit size must be positive", field="target_bytes", value=target_bytes)
+        files = self.read_file_metadata(file_list)
+        oversized, packed = [], []
+        for file_info in files:
+            (oversized if shard_threshold_bytes and file_info["size"] >= shard_threshold_bytes else packed).append(file_info)
+
+        # Longest-processing-time-first: enough bins for target_bytes each, filled largest file first
+        bin_count = max(1, -(-sum(f["size"] for f in packed) // target_bytes)) if packed else 0
+        bins: List[List[Dict[str, Any]]] = [[] for _ in range(bin_count)]
+        heap = [(0, index) for index in range(bin_count)]
+        for file_info in sorted(packed, key=lambda f: f["size"], reverse=True):
+            size, index = heapq.heappop(heap)
+            bins[index].append(file_info)
+            heapq.heappush(heap, (size + file_info["size"], index))
+
+        units = [("shard", [file_info]) for file_info in sorted(oversized, key=lambda f: f["size"], reverse=True)]
+        units += [("pack", unit_files) for unit_files in sorted(bins, key=lambda b: -sum(f["size"] for f in b)) if unit_files]
+
+        os.makedirs(output_dir, exist_ok=True)
+        manifest_path = os.path.join(output_dir, self.WORK_UNITS_FILE)
+        with open(manifest_path, "w") as manifest:
+            manifest.write("\t".join(self.WORK_UNIT_COLUMNS) + "\n")
+            for unit, (kind, unit_files) in enumerate(units):
+                unit_list = os.path.join(output_dir, f"unit-{unit:05d}.{kind}.txt")
+                with open(unit_list, "w") as f:
+                    for file_info in unit_files:
+                        f.write("\t".join(str(file_info.get(column, "")) for column in self.FILE_LIST_COLUMNS) + "\n")
+                unit_size = sum(f["size"] for f in unit_files)
+                manifest.write(f"{unit}\t{kind}\t{len(unit_files)}\t{unit_size}\t{os.path.basename(unit_list)}\n")
+
+        logger.info("Work units packed", extra={
+            "manifest": manifest_path,
+            "file_count": len(files),
+            "pack_units": len(units) - len(oversized),
+            "shard_units": len(oversized),
+        })
+        return manifest_path
+
+    @classmethod
+    def read_file_metadata(cls, file_list: str) -> List[Dict[str, Any]]:
+        """
+        Read the path, file name, size and protocol of every file of a file list written by process_access_methods.
+        """
+        files = []
+        with open(file_list) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                file_info = dict(zip(cls.FILE_LIST_COLUMNS, line.rstrip("\n").split("\t")))
+                file_info["size"] = int(file_info.get("size") or 0)
+                files.append(file_info)
+        return files
+
+    @staticmethod
+    def read_file_list(file_list: str) -> List[str]:
+        """
+        Read the log file paths from a file list written by process_access_methods.
+        """
+        with open(file_list) as f:
+            return [line.split("\t")[0].strip() for line in f if line.strip()]
+
+    @staticmethod
+    def part_output_path(parquet_output_file: str, part: int) -> str:
+        """
+        Path of a part of the output of a log file parsed incrementally (process_log_file with a checkpoint).
+        """
+        stem = parquet_output_file[:-len(".parquet")] if parquet_output_file.endswith(".parquet") else parquet_output_file
+        return f"{stem}.part-{part:04d}.parquet"
+
+    @staticmethod
+    def parquet_output_name(file_path: str) -> str:
+        """
+        Name of the Parquet file of a log file. Log files of different protocols share file names,
+        so a digest of the full path keeps the names unique within one output directory.
+        """
+        name = os.path.basename(file_path)
+        for suffix in (".log.tsv.gz", ".tsv.gz", ".gz"):
+            if name.endswith(suffix):
+                name = name[:-len(suffix)]
+                break
+        return f"{name}-{hashlib.sha1(file_path.encode()).hexdigest()[:8]}.parquet"
+
+    def _plan_log_file_shards(self, file_path: str, workers: int) -> Optional[List[GzipShard]]:
+        """
+        Split a log file into shards at gzip member boundaries.
+        :return: Shards in file order, None when the file cannot be split and has to be parsed serially
+        """
+        try:
+            members = build_gzip_index(file_path)
+        except (OSError, EOFError, zlib.error) as e:
+            logger.warning("Could not index gzip members, parsing serially", extra={"file_path": file_path, "error": str(e)})
+            return None
+        shards = plan_shards(file_path, members, os.path.getsize(file_path), workers * self.SHARDS_PER_WORKER)
+        if len(shards) < 2:
+            logger.info("Log file is a single gzip member, parsing serially", extra={"file_path": file_path})
+            return None
+        logger.info("Log file split into shards", extra={"file_path": file_path, "shard_count": len(shards), "workers": workers})
+        return shards
+
+    @staticmethod
+    def _iter_shard_batches(
+        shards: List[GzipShard],
+        parser_factory: Callable,
+        parser_args: Tuple[List[str], List[str], List[str], Optional[List[str]]],
+        batch_size: int,
+        parquet_output_file: str,
+        workers: int
+    ) -> Iterator[pa.RecordBatch]:
+        """
+        Parse the shards in a process pool and yield their rows in file order.
+        Each shard is written to a partial Parquet file next to the output, which is read back
+        as soon as all shards before it are done and then removed.
+        """
+        part_dir = tempfile.mkdtemp(prefix=".parts-", dir=os.path.dirname(os.path.abspath(parquet_output_file)))
+        tasks = [
+            (parser_factory, shard, parser_args, batch_size, os.path.join(part_dir, f"part-{shard.index:05d}.parquet"))
+            for shard in shards
+        ]
+        try:
+            with multiprocessing.Pool(workers) as pool:
+                for part_path in pool.imap(_parse_shard, tasks):
+                    if part_path is None:
+                        continue
+                    yield from pq.ParquetFile(part_path).iter_batches(batch_size=batch_size)
+                    os.remove(part_path)
+        finally:
+            shutil.rmtree(part_dir, ignore_errors=True)
@@ -1,23 +1,41 @@
 import os
+import shutil
 import logging
-from typing import List
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Iterable, Optional, TextIO, Tuple
 from pathlib import Path
 import pandas as pd
-import pyarrow.parquet as pq
 import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 from scipy.stats import rankdata
 
 from exceptions import (
     ParquetReadError,
     ParquetMergeError,
-    AnalysisError
+    AnalysisError,
+    ValidationError
 )
+from group_counter import GroupCounter
 from interfaces import IParquetAnalyzer
+from parquet_reader import ParquetReader
+from parquet_sorter import ParquetSorter
+from parquet_writer import ParquetWriter, ParquetWriterProfile, PartitionedWriter, RowGroupWriter
 
 logger = logging.getLogger(__name__)
 
 
 class ParquetAnalyzer(IParquetAnalyzer):
+    # Input bytes merged into one part by a tree merge
+    DEFAULT_PART_BYTES = 256 * 1024 * 1024
+    PART_PREFIX = "part-"
+    METADATA_FILE = "_metadata"
+    # Row-group runs per worker of a parallel analysis, so that workers finishing early take more
+    TASKS_PER_WORKER = 4
+    # Project-level count of each bot classification column
+    BOT_COUNT_COLUMNS = {"bot_count": "is_bot", "hub_count": "is_hub", "organic_count": "is_organic"}
+
     def __init__(self, batch_size: int = 100000) -> None:
         """Initialize with a batch size for processing."""
         self.batch_size: int = int(batch_size)  # Number of rows to process at a time
@@ -29,87 +47,140 @@ class ParquetAnalyzer(IParquetAnalyzer):
         file_level_download_counts: str,
         project_level_yearly_download_counts: str,
         project_level_top_download_counts: str,
-        all_data: str
+        all_data: str,
+        workers: int = 1
     ) -> None:
-        """Processes Parquet files in a single pass with batch-wise aggregation and JSON export."""
-        parquet_file = pq.ParquetFile(output_parquet)
+        """
+        Processes Parquet files in a single pass with batch-wise aggregation and JSON export.
+        The counts are kept by GroupCounter accumulators updated in place by every batch, so memory
+        grows with the number of projects and files, not with the number of batches.
+        Files of the compact schema (see ParquetWriter.COMPACT_SCHEMA) are exported with the user ids and
+        timestamps as strings; their dictionary-encoded columns are grouped by their dictionary codes.
+        output_parquet may be a dataset partitioned by year and month (see PartitionedWriter).
+
+        With several workers, the row groups are split into runs of consecutive row groups of about
+        equal rows, which worker processes aggregate and export concurrently (see _analyze_row_groups).
+        :param workers: Worker processes, 1 to read on a single thread
+        """
+        project_counter, file_counter, yearly_counter = self.aggregate(output_parquet, all_data, workers)
+
+        project_df = project_counter.to_pandas()
+        file_df = file_counter.to_pandas()
+        yearly_df = yearly_counter.to_pandas()
+        if project_counter.sum_columns:
+            logger.info("Bot classification counts merged into project-level data", extra={"projects_with_bot_data": len(project_df)})
+
+        # Persist results
+        self.persist_project_level_download_counts(project_df, project_level_download_counts)
+        self.persist_file_level_download_counts(file_df, file_level_download_counts)
+        self.persist_project_level_yearly_download_counts(yearly_df, project_level_yearly_download_counts)
+
+        # Top downloads derived from already-computed project counts (no extra parquet read)
+        top_df = project_df.sort_values("count", ascending=False).head(100)
+        top_df.to_json(project_level_top_download_counts, orient="records", lines=False)
+        logger.info("Top download counts saved", extra={"output_file": project_level_top_download_counts, "top_count": len(top_df)})
 
-        project_counts = []
-        file_counts = []
-        yearly_counts = []
-        bot_counts = []
+    def aggregate(self, output_parquet: str, all_data: str, workers: int = 1) -> List[GroupCounter]:
+        """
+        Single pass over output_parquet counting the downloads per project (with the bot classification
+        counts if the input has them), per file and per year, while exporting every row to all_data.
+        :return: Project, file and yearly counters (see analysis_counters)
+        """
+        dataset = ParquetReader.open_dataset(output_parquet)
 
         # Check if bot classification columns exist in the schema
-        schema_names = parquet_file.schema_arrow.names
+        schema_names = dataset.schema.names
         has_bot_columns = all(col in schema_names for col in ['is_bot', 'is_hub', 'is_organic'])
+        counters = self.analysis_counters(has_bot_columns)
 
         # Single pass: aggregate stats and write all_data JSON simultaneously
-        first_batch = True
-        all_data_record_count = 0
         with open(all_data, "w") as all_data_f:
             all_data_f.write("[")
-            for batch in parquet_file.iter_batches(batch_size=self.batch_size):
-                df = batch.to_pandas()
-
-                # Aggregate project-level counts
-                project_counts.append(df.groupby("accession").size().reset_index(name="count"))
-
-                # Aggregate file-level counts
-                file_counts.append(df.groupby(["accession", "filename"]).size().reset_index(name="count"))
-
-                # Aggregate yearly counts
-                yearly_counts.append(df.groupby(["accession", "year"]).size().reset_index(name="count"))
-
-                # Aggregate bot classification counts per project
-                if has_bot_columns:
-                    bot_batch = df.groupby("accession").agg(
-                        bot_count=("is_bot", "sum"),
-                        hub_count=("is_hub", "sum"),
-                        organic_count=("is_organic", "sum")
-                    ).reset_index()
-                    bot_counts.append(bot_batch)
-
-                # Write all_data JSON incrementally
-                json_str = df.to_json(orient="records")
-                json_str = json_str[1:-1]  # Strip outer [ ]
-                if json_str:
-                    if not first_batch:
-                        all_data_f.write(",")
-                    all_data_f.write(json_str)
-                    first_batch = False
-                all_data_record_count += len(df)
-
+            if workers > 1:
+                all_data_record_count = self._analyze_row_groups(dataset, has_bot_columns, counters, all_data_f, workers)
+            else:
+                all_data_record_count, _ = _aggregate_batches(
+                    ParquetReader.iter_batches(output_parquet, self.batch_size), counters, all_data_f)
             all_data_f.write("]")
         logger.info("All data saved", extra={"output_file": all_data, "record_count": all_data_record_count})
+        return counters
 
-        # Combine and re-aggregate across batches
-        project_df = pd.concat(project_counts, ignore_index=True).groupby("accession")["count"].sum().reset_index()
-        file_df = pd.concat(file_counts, ignore_index=True).groupby(["accession", "filename"])["count"].sum().reset_index()
-        yearly_df = pd.concat(yearly_counts, ignore_index=True).groupby(["accession", "year"])["count"].sum().reset_index()
-
-        # Merge bot classification counts into project-level data
-        if bot_counts:
-            bot_df = pd.concat(bot_counts, ignore_index=True).groupby("accession").agg(
-                bot_count=("bot_count", "sum"),
-                hub_count=("hub_count", "sum"),
-                organic_count=("organic_count", "sum")
-            ).reset_index()
-            bot_df["bot_count"] = bot_df["bot_count"].astype(int)
-            bot_df["hub_count"] = bot_df["hub_count"].astype(int)
-            bot_df["organic_count"] = bot_df["organic_count"].astype(int)
-            project_df = project_df.merge(bot_df, on="accession", how="left")
-            project_df[["bot_count", "hub_count", "organic_count"]] = project_df[["bot_count", "hub_count", "organic_count"]].fillna(0).astype(int)
-            logger.info("Bot classification counts merged into project-level data", extra={"projects_with_bot_data": len(bot_df)})
+    @classmethod
+    def analysis_counters(cls, has_bot_columns: bool) -> List[GroupCounter]:
+        """
+        Accumulators of the project (with the bot classification counts), file and yearly counts.
+        """
+        return [
+            GroupCounter(["accession"], cls.BOT_COUNT_COLUMNS if has_bot_columns else None),
+            GroupCounter(["accession", "filename"]),
+            GroupCounter(["accession", "year"])
+        ]
 
-        # Persist results
-        self.persist_project_level_download_counts(project_df, project_level_download_counts)
-        self.persist_file_level_download_counts(file_df, file_level_download_counts)
-        self.persist_project_level_yearly_download_counts(yearly_df, project_level_yearly_download_counts)
+    @staticmethod
+    def plan_row_groups(row_counts: List[int], task_count: int) -> List[List[int]]:
+        """
+        Split row groups into at most about task_count runs of consecutive row groups of about equal
+        rows, a row group larger than that making a run alone.
+        :param row_counts: Rows of each row group
+        :return: Indices of the row groups of each run
+        """
+        target = sum(row_counts) / max(1, task_count)
+        runs: List[List[int]] = []
+        rows = 0
+        for index, row_count in enumerate(row_counts):
+            if not runs or (rows and rows + row_count > target):
+                runs.append([])
+                rows = 0
+            runs[-1].append(index)
+            rows += row_count
+        return runs
 
-        # Top downloads derived from already-computed project counts (no extra parquet read)
-        top_df = project_df.sort_values("count", ascending=False).head(100)
-        top_df.to_json(project_level_top_download_counts, orient="records", lines=False)
-        logger.info("Top download counts saved", extra={"output_file": project_level_top_download_counts, "top_count": len(top_df)})
+    def _analyze_row_groups(
+        self,
+        dataset: ds.Dataset,
+        has_bot_columns: bool,
+        counters: List[GroupCounter],
+        all_data_f: TextIO,
+        workers: int
+    ) -> int:
+        """
+        Aggregate and export the row groups of a dataset from a process pool. Every worker counts a run
+        of row groups with its own accumulators and writes its rows to a temporary JSON fragment; the
+        partial counts are then combined into counters and the fragments appended to all_data_f, in
+        row-group order.
+        :return: Rows read
+        """
+        fragments = [piece for fragment in dataset.get_fragments() for piece in fragment.split_by_row_group()]
+        runs = self.plan_row_groups([sum(row_group.num_rows for row_group in fragment.row_groups)
+                                     for fragment in fragments], workers * self.TASKS_PER_WORKER)
+        fragment_dir = tempfile.mkdtemp(prefix=".analysis-", dir=os.path.dirname(os.path.abspath(all_data_f.name)))
+        columns = ParquetReader.column_order(dataset)
+        tasks = [
+            ([fragments[index] for index in run], dataset.schema, columns, self.batch_size,
+             has_bot_columns, os.path.join(fragment_dir, f"{task_index:05d}.json"))
+            for task_index, run in enumerate(runs)
+        ]
+        logger.info("Analyzing row groups", extra={"row_group_count": len(fragments), "task_count": len(tasks),
+                                                   "workers": workers})
+        record_count = 0
+        first_fragment = True
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+                results = executor.map(_analyze_row_groups_task, tasks)
+                for task, (partial_counts, task_record_count, written) in zip(tasks, results):
+                    for counter, partial in zip(counters, partial_counts):
+                        counter.combine(partial)
+                    record_count += task_record_count
+                    if written:
+                        if not first_fragment:
+                            all_data_f.write(",")
+                        with open(task[-1]) as fragment_f:
+                            shutil.copyfileobj(fragment_f, all_data_f)
+                        first_fragment = False
+                    os.remove(task[-1])
+        finally:
+            shutil.rmtree(fragment_dir, ignore_errors=True)
+        return record_count
 
     def persist_project_level_download_counts(self, df: pd.DataFrame, output_file: str) -> None:
         # Calculate percentiles
@@ -127,7 +198,7 @@ class ParquetAnalyzer(IParquetAnalyzer):
         # Nest yearly counts under each accession
         nested = (
             df
-            .groupby("accession")
+            .groupby("accession", observed=True)
             .apply(lambda x: {
                 "accession": x["accession"].iloc[0],
                 "yearlyDownloads": x[["year", "count"]].to_dict(orient="records")
@@ -139,17 +210,50 @@ class ParquetAnalyzer(IParquetAnalyzer):
         logger.info("Project level yearly download counts saved", extra={"output_file": output_file, "record_count": len(nested)})
 
     def get_all_parquet_files(self, file_list_path: str) -> List[str]:
-        """Reads file paths from a text file and validates them as Parquet files."""
-        with open(file_list_path, "r") as f:
-            file_paths = [line.strip() for line in f.readlines()]
+        """
+        Reads file paths from a text file and validates them as Parquet files or partitioned datasets.
+        file_list_path may also be a directory of parts, whose .parquet entries are taken in name order.
+        """
+        if os.path.isdir(file_list_path):
+            file_paths = [os.path.join(file_list_path, name) for name in sorted(os.listdir(file_list_path))]
+        else:
+            with open(file_list_path, "r") as f:
+                file_paths = [line.strip() for line in f.readlines()]
 
-        all_parquet_files = [p for p in file_paths if os.path.isfile(p) and p.endswith(".parquet")]
+        all_parquet_files = [p for p in file_paths if os.path.exists(p) and p.endswith(".parquet")]
         if not all_parquet_files:
             logger.warning("No valid Parquet files found", extra={"file_list_path": file_list_path})
         return all_parquet_files
 
-    def merge_parquet_files(self, input_files: str, output_parquet: str) -> None:
-        """Merges Parquet files in batches with schema consistency."""
+    def merge_parquet_files(
+        self,
+        input_files: str,
+        output_parquet: str,
+        writer_profile: Optional[ParquetWriterProfile] = None,
+        partitioned: bool = False,
+        sort_by: Optional[List[str]] = None,
+        workers: int = 1,
+        part_bytes: Optional[int] = None,
+        dataset_output: bool = False
+    ) -> None:
+        """
+        Merges Parquet files in batches with schema consistency, streaming Arrow record batches from the
+        inputs to the output. The merged file is encoded with writer_profile (see ParquetWriterProfile),
+        the default profile if None.
+        Inputs may be partitioned datasets; with partitioned, output_parquet is written as a dataset
+        partitioned by year and month (see PartitionedWriter).
+        With sort_by, the merged rows are sorted by these columns (see ParquetSorter) instead of being
+        kept in input order.
+
+        With several workers or dataset_output, the merge runs as a tree: consecutive inputs are grouped
+        into parts of about part_bytes, which worker processes merge concurrently, and a final pass
+        concatenates the parts into output_parquet. With dataset_output the parts are the output: a
+        directory of part-NNNNN.parquet files with a _metadata summary file.
+        :param input_files: File list of the Parquet files to merge, or a directory of parts
+        :param workers: Worker processes merging the parts
+        :param part_bytes: Input bytes merged into one part, DEFAULT_PART_BYTES if None
+        :param dataset_output: Write a multi-file dataset instead of a single file
+        """
         try:
             all_files = self.get_all_parquet_files(input_files)
             if not all_files:
@@ -157,24 +261,35 @@ class ParquetAnalyzer(IParquetAnalyzer):
                     "No valid Parquet files found to merge",
                     input_files=input_files
                 )
+            if dataset_output and (partitioned or sort_by):
+                raise ValidationError("A multi-file dataset output cannot be partitioned or sorted",
+                                      field="dataset_output", value=dataset_output)
 
-            writer = None
-            first_schema = None
+            if sort_by:
+                ParquetSorter(self.batch_size).sort(all_files, output_parquet, sort_by, writer_profile, partitioned)
+                logger.info("Merged Parquet dataset saved", extra={"output_file": output_parquet, "input_file_count": len(all_files)})
+                return
 
-            for file in all_files:
-                file_iter = pq.ParquetFile(file).iter_batches(batch_size=self.batch_size)
-                for batch in file_iter:
-                    df = batch.to_pandas()
-
-                    if writer is None:
-                        first_schema = pa.Table.from_pandas(df).schema  # Capture schema from first batch
-                        writer = pq.ParquetWriter(output_parquet, first_schema)
-
-                    table = pa.Table.from_pandas(df, schema=first_schema)  # Ensure schema consistency
-                    writer.write_table(table)
+            # Batches go straight from the inputs to the writer, with the types of the ParquetWriter
+            # schema (see ParquetWriter.canonical_schema) rather than types inferred through pandas
+            dataset = ParquetReader.open_dataset(all_files[0])
+            schema = ParquetWriter.canonical_schema(
+                pa.schema([dataset.schema.field(name) for name in ParquetReader.column_order(dataset)])
+            )
 
-            if writer:
-                writer.close()
+            if dataset_output:
+                self._merge_parts(all_files, output_parquet, schema, writer_profile, workers, part_bytes)
+                self._write_dataset_metadata(output_parquet, schema)
+            elif workers > 1 and len(all_files) > 1:
+                part_dir = tempfile.mkdtemp(prefix=".merge-", dir=os.path.dirname(os.path.abspath(output_parquet)))
+                try:
+                    part_files = self._merge_parts(all_files, part_dir, schema, ParquetWriterProfile(compression="lz4"),
+                                                   workers, part_bytes)
+                    self.write_merged(part_files, output_parquet, schema, writer_profile, partitioned)
+                finally:
+                    shutil.rmtree(part_dir, ignore_errors=True)
+            else:
+                self.write_merged(all_files, output_parquet, schema, writer_profile, partitioned)
             logger.info("Merged Parquet dataset saved", extra={"output_file": output_parquet, "input_file_count": len(all_files)})
         except (IOError, OSError, pa.ArrowInvalid) as e:
             error = ParquetMergeError(
@@ -184,6 +299,8 @@ class ParquetAnalyzer(IParquetAnalyzer):
             )
             logger.error("Error merging Parquet files", extra={"input_files": input_files, "error": str(e)}, exc_info=True)
             raise error
+        except ValidationError:
+            raise
         except Exception as e:
             error = ParquetMergeError(
                 f"Unexpected error merging Parquet files: {str(e)}",
@@ -192,3 +309,140 @@ class ParquetAnalyzer(IParquetAnalyzer):
             )
             logger.error("Unexpected error merging Parquet files", extra={"input_files": input_files, "error": str(e)}, exc_info=True)
             raise error
+
+    def write_merged(
+        self,
+        input_paths: List[str],
+        output_parquet: str,
+        schema: pa.Schema,
+        writer_profile: Optional[ParquetWriterProfile] = None,
+        partitioned: bool = False
+    ) -> bool:
+        """
+        Concatenate Parquet files or datasets into one output with a schema.
+        :return: Whether any row was written
+        """
+        writer = None
+        writer_class = PartitionedWriter if partitioned else RowGroupWriter
+        for input_path in input_paths:
+            for batch in ParquetReader.iter_batches(input_path, self.batch_size, columns=schema.names):
+                if writer is None:
+                    writer = writer_class(output_parquet, schema, writer_profile)
+                writer.write_batch(ParquetWriter.conform_batch(batch, schema))
+        if writer:
+            writer.close()
+        return writer is not None
+
+    @staticmethod
+    def plan_parts(input_paths: List[str], part_bytes: int) -> List[List[str]]:
+        """
+        Group consecutive inputs into parts of about part_bytes, an input larger than that making a part alone.
+        """
+        parts: List[List[str]] = []
+        size = 0
+        for input_path in input_paths:
+            if os.path.isdir(input_path):
+                input_size = sum(os.path.getsize(os.path.join(directory, name))
+                                 for directory, _, names in os.walk(input_path) for name in names)
+            else:
+                input_size = os.path.getsize(input_path)
+            if not parts or size + input_size > part_bytes:
+                parts.append([])
+                size = 0
+            parts[-1].append(input_path)
+            size += input_size
+        return parts
+
+    def _merge_parts(
+        self,
+        input_paths: List[str],
+        part_dir: str,
+        schema: pa.Schema,
+        writer_profile: Optional[ParquetWriterProfile],
+        workers: int,
+        part_bytes: Optional[int]
+    ) -> List[str]:
+        """
+        Merge groups of inputs into part files of part_dir, from a process pool with several workers.
+        :return: Part files written, in input order
+        """
+        os.makedirs(part_dir, exist_ok=True)
+        for name in os.listdir(part_dir):
+            if name.startswith(self.PART_PREFIX) or name == self.METADATA_FILE:
+                os.remove(os.path.join(part_dir, name))
+        groups = self.plan_parts(input_paths, part_bytes or self.DEFAULT_PART_BYTES)
+        tasks = [
+            (self.batch_size, group, os.path.join(part_dir, f"{self.PART_PREFIX}{index:05d}.parquet"), schema, writer_profile)
+            for index, group in enumerate(groups)
+        ]
+        logger.info("Merging Parquet parts", extra={"input_file_count": len(input_paths), "part_count": len(tasks),
+                                                    "workers": workers})
+        if workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                written = list(executor.map(_merge_part_task, tasks))
+        else:
+            written = [_merge_part_task(task) for task in tasks]
+        return [task[2] for task, part_written in zip(tasks, written) if part_written]
+
+    def _write_dataset_metadata(self, dataset_dir: str, schema: pa.Schema) -> None:
+        """
+        Write the _metadata summary of the parts of a dataset: their schema and row-group metadata,
+        so that a reader plans a scan without opening every footer.
+        """
+        collected = []
+        for name in sorted(os.listdir(dataset_dir)):
+            if name.startswith(self.PART_PREFIX):
+                metadata = pq.read_metadata(os.path.join(dataset_dir, name))
+                metadata.set_file_path(name)
+                collected.append(metadata)
+        pq.write_metadata(schema, os.path.join(dataset_dir, self.METADATA_FILE), metadata_collector=collected)
+
+
+def _merge_part_task(task: Tuple[int, List[str], str, pa.Schema, Optional[ParquetWriterProfile]]) -> bool:
+    """
+    Merge a group of inputs into one part file. Runs in a worker process of ParquetAnalyzer.merge_parquet_files.
+    """
+    batch_size, input_paths, part_path, schema, writer_profile = task
+    return ParquetAnalyzer(batch_size).write_merged(input_paths, part_path, schema, writer_profile)
+
+
+def _aggregate_batches(batches: Iterable[pa.RecordBatch], counters: List[GroupCounter], json_f: TextIO) -> Tuple[int, bool]:
+    """
+    Add record batches to the counters and write their rows to json_f as comma-separated JSON records,
+    without the enclosing brackets.
+    :return: Rows read, and whether any record was written
+    """
+    first_batch = True
+    record_count = 0
+    for batch in batches:
+        for counter in counters:
+            counter.update(batch)
+
+        # Write all_data JSON incrementally
+        df = ParquetWriter.readable_batch(batch).to_pandas()
+        json_str = df.to_json(orient="records")
+        json_str = json_str[1:-1]  # Strip outer [ ]
+        if json_str:
+            if not first_batch:
+                json_f.write(",")
+            json_f.write(json_str)
+            first_batch = False
+        record_count += len(df)
+    return record_count, not first_batch
+
+
+def _analyze_row_groups_task(
+    task: Tuple[List[ds.Fragment], pa.Schema, List[str], int, bool, str]
+) -> Tuple[List[pa.Table], int, bool]:
+    """
+    Count a run of row groups and write its rows to a JSON fragment. Runs in a worker process of
+    ParquetAnalyzer.analyze_parquet_files.
+    :return: Partial counts (see ParquetAnalyzer.analysis_counters), rows read and whether any record was written
+    """
+    fragments, schema, columns, batch_size, has_bot_columns, fragment_path = task
+    counters = ParquetAnalyzer.analysis_counters(has_bot_columns)
+    batches = (batch for fragment in fragments
+               for batch in fragment.to_batches(schema=schema, columns=columns, batch_size=batch_size) if batch.num_rows)
+    with open(fragment_path, "w") as fragment_f:
+        record_count, written = _aggregate_batches(batches, counters, fragment_f)
+    return [counter.to_table() for counter in counters], record_count, written
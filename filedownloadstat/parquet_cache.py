@@ -0,0 +1,163 @@
+import os
+import shutil
+import hashlib
+import logging
+from typing import List, Optional, Dict, Any, Tuple
+
+from log_file_parser import LogFileParser
+
+logger = logging.getLogger(__name__)
+
+
+class ParquetCache:
+    """
+    Content-addressed store of the Parquet outputs of parsed log files.
+
+    Outputs are keyed by a BLAKE2b digest of the gzipped log file together with the parser version and
+    configuration, so a retry or a rerun on the same input becomes a cache hit whatever the path or the
+    modification time of the file. A log file without relevant rows is stored as an empty marker.
+    Each hit refreshes the modification time of the object, which prune uses to evict the least
+    recently used objects once the store exceeds its size bound.
+    """
+
+    OBJECTS_DIR = "objects"
+    PARQUET_SUFFIX = ".parquet"
+    EMPTY_SUFFIX = ".empty"
+    READ_SIZE = 4 * 1024 * 1024  # Bytes hashed at a time
+
+    def __init__(self, cache_dir: str, max_bytes: Optional[int] = None) -> None:
+        """
+        :param cache_dir: Directory of the store
+        :param max_bytes: Size bound of the store, enforced after every store; unbounded if None
+        """
+        self.cache_dir = cache_dir
+        self.objects_dir = os.path.join(cache_dir, self.OBJECTS_DIR)
+        self.max_bytes = max_bytes
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+    def content_key(self, file_path: str, config_hash: str) -> str:
+        """
+        Key of the output of parsing a log file with a parser configuration.
+        :param file_path: Gzipped log file
+        :param config_hash: Hash of the parser configuration (IngestManifest.config_hash)
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(f"{LogFileParser.PARSER_VERSION}\0{config_hash}\0".encode())
+        with open(file_path, "rb") as f:
+            while True:
+                data = f.read(self.READ_SIZE)
+                if not data:
+                    break
+                digest.update(data)
+        return digest.hexdigest()
+
+    def _object_path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.objects_dir, key[:2], f"{key}{suffix}")
+
+    def lookup(self, key: str) -> Optional[str]:
+        """
+        Find the object stored under a key and mark it as recently used.
+        :return: Path of the Parquet object or empty marker, None on a cache miss
+        """
+        for suffix in (self.PARQUET_SUFFIX, self.EMPTY_SUFFIX):
+            object_path = self._object_path(key, suffix)
+            try:
+                os.utime(object_path)
+            except FileNotFoundError:
+                continue
+            return object_path
+        return None
+
+    def restore(self, object_path: str, parquet_output_file: str) -> bool:
+        """
+        Put a cached object at parquet_output_file.
+        :return: Whether the object holds rows (no file is created for an empty marker)
+        """
+        if object_path.endswith(self.EMPTY_SUFFIX):
+            return False
+        place_file(object_path, parquet_output_file)
+        return True
+
+    def store(self, key: str, parquet_file: Optional[str]) -> str:
+        """
+        Store the output of a parse under a key, then evict objects beyond the size bound.
+        :param key: Content key of the parsed log file
+        :param parquet_file: Parquet output, None if the log file had no relevant rows
+        :return: Path of the stored object
+        """
+        if parquet_file:
+            object_path = self._object_path(key, self.PARQUET_SUFFIX)
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            place_file(parquet_file, object_path)
+        else:
+            object_path = self._object_path(key, self.EMPTY_SUFFIX)
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            open(object_path, "w").close()
+        if self.max_bytes is not None:
+            self.prune(self.max_bytes)
+        return object_path
+
+    def _list_objects(self) -> List[Tuple[float, int, str]]:
+        """
+        (last use, size, path) of every object, least recently used first.
+        """
+        objects = []
+        for prefix in os.scandir(self.objects_dir):
+            if not prefix.is_dir():
+                continue
+            for entry in os.scandir(prefix.path):
+                if entry.name.endswith((self.PARQUET_SUFFIX, self.EMPTY_SUFFIX)):
+                    stat = entry.stat()
+                    objects.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(objects)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Number of objects and bytes held by the store.
+        """
+        objects = self._list_objects()
+        return {
+            "cache_dir": self.cache_dir,
+            "objects": sum(1 for _, _, path in objects if path.endswith(self.PARQUET_SUFFIX)),
+            "empty_objects": sum(1 for _, _, path in objects if path.endswith(self.EMPTY_SUFFIX)),
+            "bytes": sum(size for _, size, _ in objects),
+            "max_bytes": self.max_bytes,
+        }
+
+    def prune(self, max_bytes: int) -> Dict[str, int]:
+        """
+        Evict the least recently used objects until the store holds at most max_bytes.
+        :return: Number of objects and bytes removed
+        """
+        objects = self._list_objects()
+        total = sum(size for _, size, _ in objects)
+        removed_objects = removed_bytes = 0
+        for _, size, object_path in objects:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(object_path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed_objects += 1
+            removed_bytes += size
+        if removed_objects:
+            logger.info("Parquet cache pruned", extra={"cache_dir": self.cache_dir, "removed_objects": removed_objects,
+                                                       "removed_bytes": removed_bytes, "bytes": total})
+        return {"removed_objects": removed_objects, "removed_bytes": removed_bytes}
+
+
+def place_file(source: str, destination: str) -> None:
+    """
+    Copy source to a temporary file next to destination, then rename it into place. The copy never
+    shares an inode with source, so a later parse written to destination cannot alter a cached object.
+    """
+    temp_path = f"{destination}.{os.getpid()}.tmp"
+    try:
+        shutil.copyfile(source, temp_path)
+        os.replace(temp_path, destination)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
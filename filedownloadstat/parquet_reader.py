@@ -1,6 +1,8 @@
+import os
 import logging
-from typing import Optional
+from typing import Any, Iterator, List, Optional, Tuple
 import pyarrow.parquet as pq
+import pyarrow.dataset as ds
 import pyarrow as pa
 
 from exceptions import (
@@ -8,30 +10,134 @@ from exceptions import (
     ValidationError
 )
 from interfaces import IParquetReader
+from parquet_writer import ParquetWriter, PartitionedWriter
+
+# Filters in disjunctive normal form, as taken by pyarrow and dask: [[(column, op, value), ...], ...]
+Filters = List[List[Tuple[str, str, Any]]]
 
 logger = logging.getLogger(__name__)
 
 
 class ParquetReader(IParquetReader):
     """
-    Read parquet file
+    Read parquet file, a dataset partitioned by year and month (see PartitionedWriter), or the
+    per-file Parquet outputs of the parse steps as one dataset (see resolve_paths)
     """
 
     def __init__(self, parquet_path: Optional[str] = None) -> None:
         self.parquet_path: Optional[str] = parquet_path
 
-    def read(self, parquet_path: str) -> pa.Table:
+    @staticmethod
+    def is_parquet_file(path: str) -> bool:
+        """
+        Whether a path is a Parquet file, from its magic number.
+        """
+        try:
+            with open(path, "rb") as f:
+                return f.read(4) == b"PAR1"
+        except (IsADirectoryError, FileNotFoundError):
+            return False
+
+    @classmethod
+    def resolve_paths(cls, source: str) -> List[str]:
+        """
+        Parquet files and datasets making up a source, which is one of:
+        a Parquet file; a directory with a _metadata summary file, kept as is; a directory of Parquet
+        files, partitioned or not, walked for its .parquet files (names starting with _ or . skipped);
+        a text file listing such sources one per line, such as the file list given to merge_parquet_files
+        or the manifest of process_log_files, whose successful outputs are taken.
+        """
+        if os.path.isdir(source):
+            if os.path.isfile(os.path.join(source, "_metadata")):
+                return [source]
+            paths = []
+            for directory, subdirectories, names in os.walk(source):
+                subdirectories[:] = sorted(name for name in subdirectories if not name.startswith(("_", ".")))
+                paths.extend(os.path.join(directory, name) for name in sorted(names)
+                             if name.endswith(".parquet") and not name.startswith(("_", ".")))
+            return paths
+        if cls.is_parquet_file(source):
+            return [source]
+
+        with open(source) as f:
+            rows = [line.rstrip("\n").split("\t") for line in f if line.strip()]
+        if rows and rows[0][:3] == ["path", "output", "status"]:
+            entries = [row[1] for row in rows[1:] if len(row) > 2 and row[2] == "success"]
+        else:
+            entries = [row[0].strip() for row in rows]
+        paths = []
+        for entry in entries:
+            if os.path.exists(entry):
+                paths.extend(cls.resolve_paths(entry))
+        return paths
+
+    @classmethod
+    def open_dataset(cls, parquet_path: str) -> ds.Dataset:
+        """
+        Open a source of Parquet files (see resolve_paths) as one dataset, with the year and month
+        partitions of a partitioned dataset as columns. The files of a directory with a _metadata
+        summary file are planned from it, without opening their footers. Scans read the files
+        concurrently.
+        """
+        if os.path.isdir(parquet_path) and os.path.isfile(os.path.join(parquet_path, "_metadata")):
+            return ds.parquet_dataset(os.path.join(parquet_path, "_metadata"), partitioning=PartitionedWriter.PARTITIONING)
+        if os.path.isfile(parquet_path) and cls.is_parquet_file(parquet_path):
+            return ds.dataset(parquet_path, format="parquet", partitioning=PartitionedWriter.PARTITIONING)
+
+        paths = cls.resolve_paths(parquet_path)
+        if not paths:
+            raise ValidationError(f"No Parquet files found in {parquet_path}", field="parquet_path", value=parquet_path)
+        if any(os.path.isdir(path) for path in paths):
+            return ds.dataset([cls.open_dataset(path) for path in paths])
+        return ds.dataset(paths, format="parquet", partitioning=PartitionedWriter.PARTITIONING,
+                          partition_base_dir=parquet_path if os.path.isdir(parquet_path) else None)
+
+    @staticmethod
+    def column_order(dataset: ds.Dataset) -> List[str]:
+        """
+        Columns of a dataset in the order of ParquetWriter.schema, the other columns last: the partition
+        columns are put back where a single file has them.
+        """
+        order = {name: index for index, name in enumerate(ParquetWriter.schema.names)}
+        names = dataset.schema.names
+        return sorted(names, key=lambda name: (order.get(name, len(order)), names.index(name)))
+
+    @classmethod
+    def iter_batches(
+        cls,
+        parquet_path: str,
+        batch_size: int,
+        filters: Optional[Filters] = None,
+        columns: Optional[List[str]] = None
+    ) -> Iterator[pa.RecordBatch]:
+        """
+        Record batches of a Parquet file or partitioned dataset, without the partitions excluded by filters.
+        :param parquet_path: Path to the Parquet file or dataset
+        :param batch_size: Maximum rows of a batch
+        :param filters: Rows to read, all if None; files and row groups excluded by them are not read
+        :param columns: Columns to read, all (see column_order) if None
+        """
+        dataset = cls.open_dataset(parquet_path)
+        for batch in dataset.to_batches(columns=columns or cls.column_order(dataset), batch_size=batch_size,
+                                        filter=pq.filters_to_expression(filters) if filters else None):
+            if batch.num_rows:
+                yield batch
+
+    def read(self, parquet_path: str, filters: Optional[Filters] = None) -> pa.Table:
         """
         Read parquet file or dataset
         :param parquet_path: Path to the Parquet file or dataset
+        :param filters: Rows to read, all if None (see DateWindow.partition_filters)
         :return: DataFrame or Table
         """
         if parquet_path is None:
             raise ValidationError("parquet_path is required", field="parquet_path")
 
         try:
-            # Read the dataset (directory of Parquet files)
-            read_table = pq.read_table(parquet_path)
+            # Read the file or dataset, skipping the partitions excluded by the filters
+            dataset = self.open_dataset(parquet_path)
+            read_table = dataset.to_table(columns=self.column_order(dataset),
+                                          filter=pq.filters_to_expression(filters) if filters else None)
         except (IOError, OSError, FileNotFoundError) as e:
             error = ParquetReadError(
                 f"Failed to read Parquet file: {parquet_path}",
@@ -0,0 +1,207 @@
+import os
+import shutil
+import logging
+import tempfile
+from typing import List, Dict, Any, Iterator, Optional, Union
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from exceptions import (
+    ParquetMergeError,
+    ValidationError
+)
+from parquet_reader import ParquetReader
+from parquet_writer import ParquetWriterProfile, PartitionedWriter, RowGroupWriter
+
+logger = logging.getLogger(__name__)
+
+
+class ParquetSorter:
+    """
+    Rewrite Parquet files or partitioned datasets as one output sorted by some columns, by default
+    accession then date, so that the downloads of a project are stored together: its rows fall in a
+    few row groups that readers find from the min/max statistics, and the sorted columns compress
+    into long runs.
+
+    Inputs of up to max_rows_in_memory rows are sorted in memory. Larger ones are range-partitioned
+    on the first sort column: a first pass counts the rows of each of its values and splits the
+    sorted values into runs of about max_rows_in_memory rows, a second pass writes the rows of every
+    run to a temporary file, and each run is then sorted in memory and appended to the output in
+    order. A single value with more rows than max_rows_in_memory still makes one run.
+    """
+
+    DEFAULT_SORT_BY = ("accession", "date")
+    DEFAULT_MAX_ROWS_IN_MEMORY = 5_000_000
+    # Row-group size of the sorted output when the writer profile has no row-group target
+    SORTED_ROW_GROUP_ROWS = 128 * 1024
+
+    def __init__(self, batch_size: int = 100000, max_rows_in_memory: int = DEFAULT_MAX_ROWS_IN_MEMORY) -> None:
+        """
+        :param batch_size: Rows read at a time
+        :param max_rows_in_memory: Rows sorted at a time
+        """
+        if max_rows_in_memory <= 0:
+            raise ValidationError("max_rows_in_memory must be positive", field="max_rows_in_memory",
+                                  value=max_rows_in_memory)
+        self.batch_size = int(batch_size)
+        self.max_rows_in_memory = int(max_rows_in_memory)
+
+    @staticmethod
+    def parse_sort_by(sort_by: Union[None, str, List[str]]) -> List[str]:
+        """
+        Sort columns given as a list or a comma-separated string, DEFAULT_SORT_BY if empty.
+        """
+        if isinstance(sort_by, str):
+            sort_by = sort_by.split(",")
+        columns = [column.strip() for column in sort_by or () if column.strip()]
+        return columns or list(ParquetSorter.DEFAULT_SORT_BY)
+
+    def sort(
+        self,
+        input_paths: List[str],
+        output_parquet: str,
+        sort_by: Union[None, str, List[str]] = None,
+        writer_profile: Optional[ParquetWriterProfile] = None,
+        partitioned: bool = False
+    ) -> int:
+        """
+        Write the rows of the inputs to output_parquet, sorted by the sort columns.
+
+        :param input_paths: Parquet files or partitioned datasets with the columns of the first one
+        :param output_parquet: Path of the output file, or of the output dataset if partitioned
+        :param sort_by: Sort columns, ascending with nulls last (see parse_sort_by)
+        :param writer_profile: Encoding settings of the output; SORTED_ROW_GROUP_ROWS rows per row group
+            without a row-group target
+        :param partitioned: Write a dataset partitioned by year and month (see PartitionedWriter), each
+            file of which is sorted
+        :return: Number of rows written
+        """
+        sort_by = self.parse_sort_by(sort_by)
+        profile = writer_profile or ParquetWriterProfile()
+        if not (profile.row_group_rows or profile.row_group_bytes):
+            profile = ParquetWriterProfile(**dict(profile.to_dict(), row_group_rows=self.SORTED_ROW_GROUP_ROWS))
+
+        schema = ParquetReader.open_dataset(input_paths[0]).schema
+        missing = [column for column in sort_by if column not in schema.names]
+        if missing:
+            raise ValidationError(f"Unknown sort columns: {', '.join(missing)}", field="sort_by", value=sort_by)
+
+        counts = self._count_values(input_paths, sort_by[0])
+        total_rows = sum(counts.values())
+        writer_class = PartitionedWriter if partitioned else RowGroupWriter
+        writer = None
+        if total_rows <= self.max_rows_in_memory:
+            table = self._read_table(input_paths)
+            if table.num_rows:
+                writer = writer_class(output_parquet, table.schema, profile, sort_by)
+                writer.write_table(self._sorted(table, sort_by))
+            run_count = 1
+        else:
+            run_dir = tempfile.mkdtemp(prefix=".sort-", dir=os.path.dirname(os.path.abspath(output_parquet)))
+            try:
+                run_paths = self._write_runs(input_paths, sort_by[0], counts, run_dir)
+                for run_path in run_paths:
+                    table = pq.read_table(run_path)
+                    if writer is None:
+                        writer = writer_class(output_parquet, table.schema, profile, sort_by)
+                    writer.write_table(self._sorted(table, sort_by))
+                    os.remove(run_path)
+                run_count = len(run_paths)
+            finally:
+                shutil.rmtree(run_dir, ignore_errors=True)
+        if writer:
+            writer.close()
+
+        logger.info("Sorted Parquet dataset saved", extra={"output_file": output_parquet, "sort_by": sort_by,
+                                                           "row_count": total_rows, "run_count": run_count})
+        return total_rows
+
+    def _iter_batches(self, input_paths: List[str], columns: Optional[List[str]] = None) -> Iterator[pa.RecordBatch]:
+        """
+        Record batches of the inputs, cast to the schema of the first one.
+        """
+        first_schema = None
+        for input_path in input_paths:
+            for batch in ParquetReader.iter_batches(input_path, self.batch_size, columns=columns):
+                if first_schema is None:
+                    first_schema = batch.schema
+                elif not batch.schema.equals(first_schema, check_metadata=False):
+                    try:
+                        table = pa.Table.from_batches([batch]).select(first_schema.names).cast(first_schema)
+                        batch = table.combine_chunks().to_batches()[0]
+                    except (KeyError, pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+                        raise ParquetMergeError(f"Schema of {input_path} does not match the first input",
+                                                input_files=input_paths, original_error=str(e))
+                yield batch
+
+    def _read_table(self, input_paths: List[str]) -> pa.Table:
+        batches = list(self._iter_batches(input_paths))
+        return pa.Table.from_batches(batches) if batches else pa.table({})
+
+    @staticmethod
+    def _key(values: Union[pa.Array, pa.ChunkedArray]) -> Union[pa.Array, pa.ChunkedArray]:
+        """
+        Values of a sort column in a sortable type: dictionary-encoded columns are decoded.
+        """
+        if pa.types.is_dictionary(values.type):
+            return values.cast(values.type.value_type)
+        return values
+
+    @classmethod
+    def _sorted(cls, table: pa.Table, sort_by: List[str]) -> pa.Table:
+        keys = pa.table({column: cls._key(table.column(column)) for column in sort_by})
+        indices = pc.sort_indices(keys, sort_keys=[(column, "ascending") for column in sort_by])
+        return table.take(indices)
+
+    def _count_values(self, input_paths: List[str], column: str) -> Dict[Any, int]:
+        """
+        Rows of each value of a column, None counting the nulls.
+        """
+        counts: Dict[Any, int] = {}
+        for batch in self._iter_batches(input_paths, columns=[column]):
+            values = self._key(batch.column(0))
+            for entry in pc.value_counts(values).to_pylist():
+                counts[entry["values"]] = counts.get(entry["values"], 0) + entry["counts"]
+        return counts
+
+    def _write_runs(self, input_paths: List[str], column: str, counts: Dict[Any, int], run_dir: str) -> List[str]:
+        """
+        Write the rows to run files holding consecutive ranges of values of a column, of about
+        max_rows_in_memory rows each.
+        :return: Run files in the order of their values
+        """
+        field_type = ParquetReader.open_dataset(input_paths[0]).schema.field(column).type
+        value_type = field_type.value_type if pa.types.is_dictionary(field_type) else field_type
+        values = pa.array([value for value in counts if value is not None], type=value_type)
+        values = values.take(pc.sort_indices(values))
+        # Run of each sorted value, nulls going to the last run
+        runs = np.empty(len(values) + 1, dtype=np.int32)
+        run, run_rows = 0, 0
+        for position, value in enumerate(values.to_pylist()):
+            if run_rows and run_rows + counts[value] > self.max_rows_in_memory:
+                run, run_rows = run + 1, 0
+            runs[position] = run
+            run_rows += counts[value]
+        runs[-1] = run
+        run_paths = [os.path.join(run_dir, f"run-{index:05d}.parquet") for index in range(run + 1)]
+        run_profile = ParquetWriterProfile(compression="lz4")
+        writers: Dict[int, RowGroupWriter] = {}
+        try:
+            for batch in self._iter_batches(input_paths):
+                positions = pc.index_in(self._key(batch.column(column)), value_set=values)
+                batch_runs = runs[positions.fill_null(len(values)).to_numpy(zero_copy_only=False)]
+                order = np.argsort(batch_runs, kind="stable")
+                batch = batch.take(pa.array(order))
+                batch_runs = batch_runs[order]
+                starts = np.flatnonzero(np.diff(batch_runs, prepend=-1))
+                for start, end in zip(starts, list(starts[1:]) + [len(batch_runs)]):
+                    index = int(batch_runs[start])
+                    if index not in writers:
+                        writers[index] = RowGroupWriter(run_paths[index], batch.schema, run_profile)
+                    writers[index].write_batch(batch.slice(start, end - start))
+        finally:
+            for writer in writers.values():
+                writer.close()
+        return [run_paths[index] for index in sorted(writers)]
@@ -1,7 +1,16 @@
+import os
+import re
+import json
+import inspect
+import shutil
+import hashlib
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Union
+import numpy as np
 import pyarrow.parquet as pq
 import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
 
 from exceptions import (
     ParquetWriteError,
@@ -12,6 +21,297 @@ from interfaces import IParquetWriter
 logger = logging.getLogger(__name__)
 
 
+class ParquetWriterProfile:
+    """
+    Encoding settings of the Parquet files written by the pipeline: codec and level, target row-group
+    size, dictionary encoding, statistics and Bloom filters.
+
+    Without a row-group target every written batch becomes a row group of its own, so per-file outputs
+    parsed with a small batch size end up with many tiny row groups. With row_group_rows and/or
+    row_group_bytes, batches are buffered and written as row groups of that size (the smaller bound
+    wins), the last one holding what is left.
+    """
+
+    COMPRESSIONS = ("none", "snappy", "gzip", "brotli", "lz4", "zstd")
+    # Named profiles selectable from the command line and the workflow parameters
+    PROFILES: Dict[str, Dict[str, Any]] = {
+        "default": {},
+        "zstd": {"compression": "zstd", "compression_level": 3, "row_group_rows": 1_000_000},
+        "indexed": {
+            "compression": "zstd",
+            "compression_level": 3,
+            "row_group_rows": 1_000_000,
+            "page_index": True,
+            "bloom_filter_columns": ["accession", "user"],
+        },
+    }
+    # Older pyarrow releases cannot write Bloom filters
+    BLOOM_FILTERS_SUPPORTED = "bloom_filter_options" in inspect.signature(pq.ParquetWriter.__init__).parameters
+
+    def __init__(
+        self,
+        compression: str = "snappy",
+        compression_level: Optional[int] = None,
+        row_group_rows: Optional[int] = None,
+        row_group_bytes: Optional[int] = None,
+        dictionary: Union[bool, List[str]] = True,
+        statistics: Union[bool, List[str]] = True,
+        page_index: bool = False,
+        bloom_filter_columns: Optional[List[str]] = None,
+        bloom_filter_fpp: float = 0.05,
+        bloom_filter_ndv: int = 100_000
+    ) -> None:
+        """
+        :param compression: Codec, one of COMPRESSIONS
+        :param compression_level: Level of the codec, its default if None
+        :param row_group_rows: Rows per row group, one row group per written batch if None
+        :param row_group_bytes: Uncompressed Arrow bytes per row group, unbounded if None
+        :param dictionary: Dictionary-encode all columns, none, or the listed ones
+        :param statistics: Write min/max statistics for all columns, none, or the listed ones
+        :param page_index: Also write the statistics to a page index (column and offset indexes), so
+            readers can skip pages and not only row groups
+        :param bloom_filter_columns: Columns with a Bloom filter per row group
+        :param bloom_filter_fpp: False positive probability of the Bloom filters
+        :param bloom_filter_ndv: Distinct values per row group the Bloom filters are sized for; their size
+            does not depend on the rows actually written, so keep it near the distinct users of a row group
+        """
+        compression = str(compression).lower()
+        if compression not in self.COMPRESSIONS:
+            raise ValidationError(
+                f"Unknown Parquet compression: {compression}. Expected one of {', '.join(self.COMPRESSIONS)}",
+                field="compression",
+                value=compression
+            )
+        for field, value in (("row_group_rows", row_group_rows), ("row_group_bytes", row_group_bytes)):
+            if value is not None and value <= 0:
+                raise ValidationError(f"{field} must be positive", field=field, value=value)
+        if bloom_filter_ndv <= 0:
+            raise ValidationError("bloom_filter_ndv must be positive", field="bloom_filter_ndv", value=bloom_filter_ndv)
+        if not 0 < bloom_filter_fpp < 1:
+            raise ValidationError("bloom_filter_fpp must be between 0 and 1", field="bloom_filter_fpp",
+                                  value=bloom_filter_fpp)
+        self.compression = compression
+        self.compression_level = compression_level
+        self.row_group_rows = row_group_rows
+        self.row_group_bytes = row_group_bytes
+        self.dictionary = dictionary
+        self.statistics = statistics
+        self.page_index = page_index
+        self.bloom_filter_columns = list(bloom_filter_columns or [])
+        self.bloom_filter_fpp = bloom_filter_fpp
+        self.bloom_filter_ndv = bloom_filter_ndv
+
+    @classmethod
+    def load(cls, profile: Union[None, str, Dict[str, Any], "ParquetWriterProfile"]) -> "ParquetWriterProfile":
+        """
+        Profile from a name of PROFILES, a JSON object of settings or a dictionary of settings.
+        A dictionary may name a base profile under 'profile' and override some of its settings.
+        """
+        if isinstance(profile, cls):
+            return profile
+        if not profile:
+            return cls()
+        if isinstance(profile, str):
+            if profile.lstrip().startswith("{"):
+                try:
+                    profile = json.loads(profile)
+                except ValueError as e:
+                    raise ValidationError(f"Invalid writer profile: {e}", field="writer_profile", value=profile)
+            else:
+                profile = {"profile": profile}
+        settings = dict(profile)
+        name = settings.pop("profile", "default")
+        if name not in cls.PROFILES:
+            raise ValidationError(
+                f"Unknown writer profile: {name}. Expected one of {', '.join(cls.PROFILES)}",
+                field="writer_profile",
+                value=name
+            )
+        unknown = sorted(set(settings).difference(inspect.signature(cls.__init__).parameters))
+        if unknown:
+            raise ValidationError(f"Unknown writer profile settings: {', '.join(unknown)}",
+                                  field="writer_profile", value=profile)
+        return cls(**{**cls.PROFILES[name], **settings})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in inspect.signature(type(self).__init__).parameters if name != "self"}
+
+    def is_default(self) -> bool:
+        return self.to_dict() == type(self)().to_dict()
+
+    def writer_options(self, schema: pa.Schema) -> Dict[str, Any]:
+        """
+        Keyword arguments of pyarrow.parquet.ParquetWriter for a file of this schema.
+        """
+        options: Dict[str, Any] = {
+            "compression": self.compression,
+            "use_dictionary": self.dictionary,
+            "write_statistics": self.statistics,
+        }
+        if self.compression_level is not None:
+            options["compression_level"] = self.compression_level
+        if self.page_index:
+            options["write_page_index"] = True
+        bloom_filter_columns = [column for column in self.bloom_filter_columns if column in schema.names]
+        if bloom_filter_columns:
+            if self.BLOOM_FILTERS_SUPPORTED:
+                options["bloom_filter_options"] = {
+                    column: {"ndv": self.bloom_filter_ndv, "fpp": self.bloom_filter_fpp} for column in bloom_filter_columns
+                }
+            else:
+                logger.warning("Bloom filters need a newer pyarrow, writing without them",
+                               extra={"pyarrow_version": pa.__version__, "columns": bloom_filter_columns})
+        return options
+
+
+class RowGroupWriter:
+    """
+    pyarrow ParquetWriter configured by a ParquetWriterProfile, writing row groups of its target size.
+    """
+
+    # Older pyarrow releases cannot record the sort order of the row groups
+    SORTING_COLUMNS_SUPPORTED = "sorting_columns" in inspect.signature(pq.ParquetWriter.__init__).parameters
+
+    def __init__(
+        self,
+        path: str,
+        schema: pa.Schema,
+        profile: Optional[ParquetWriterProfile] = None,
+        sorting_columns: Optional[List[str]] = None
+    ) -> None:
+        """
+        :param path: Path of the Parquet file
+        :param schema: Schema of the written batches
+        :param profile: Encoding settings, the default profile if None
+        :param sorting_columns: Columns the written rows are sorted by (ascending), recorded in the row-group
+            metadata; their leading columns missing from the schema are ignored
+        """
+        self.profile = profile or ParquetWriterProfile()
+        self.schema = schema
+        options = self.profile.writer_options(schema)
+        sort_order = []
+        for column in sorting_columns or ():
+            if column not in schema.names:
+                break
+            sort_order.append((column, "ascending"))
+        if sort_order and self.SORTING_COLUMNS_SUPPORTED:
+            options["sorting_columns"] = pq.SortingColumn.from_ordering(schema, sort_order)
+        self.writer = pq.ParquetWriter(path, schema=schema, **options)
+        self._pending: List[pa.RecordBatch] = []
+        self._pending_rows = 0
+        self._pending_bytes = 0
+
+    def write_batch(self, batch: pa.RecordBatch) -> None:
+        if not (self.profile.row_group_rows or self.profile.row_group_bytes):
+            self.writer.write_batch(batch)
+            return
+        self._pending.append(batch)
+        self._pending_rows += batch.num_rows
+        self._pending_bytes += batch.nbytes
+        while ((self.profile.row_group_rows and self._pending_rows >= self.profile.row_group_rows)
+               or (self.profile.row_group_bytes and self._pending_bytes >= self.profile.row_group_bytes)):
+            self._flush(self._row_group_rows())
+
+    def write_table(self, table: pa.Table) -> None:
+        for batch in table.to_batches():
+            self.write_batch(batch)
+
+    def _row_group_rows(self) -> int:
+        """
+        Rows of the next row group, from the row target and the average row size of the buffered batches.
+        """
+        rows = self.profile.row_group_rows or self._pending_rows
+        if self.profile.row_group_bytes and self._pending_bytes:
+            rows = min(rows, max(1, self.profile.row_group_bytes * self._pending_rows // self._pending_bytes))
+        return rows
+
+    def _flush(self, rows: int) -> None:
+        table = pa.Table.from_batches(self._pending, schema=self.schema)
+        self.writer.write_table(table.slice(0, rows), row_group_size=rows)
+        self._pending = table.slice(rows).to_batches()
+        self._pending_rows = table.num_rows - rows
+        self._pending_bytes = sum(batch.nbytes for batch in self._pending)
+
+    def close(self) -> None:
+        if self._pending_rows:
+            self._flush(self._pending_rows)
+        self.writer.close()
+
+
+class PartitionedWriter:
+    """
+    Hive-partitioned dataset with one file per year and month (root/year=2023/month=1/part-0.parquet),
+    each written by a RowGroupWriter. Same interface as RowGroupWriter.
+
+    The year and month columns are only kept in the directory names: readers opening the dataset with
+    PARTITIONING get them back, and skip the months excluded by a filter on them without opening
+    their files.
+    """
+
+    PARTITION_COLUMNS = ("year", "month")
+    PARTITIONING = ds.partitioning(pa.schema([("year", pa.int16()), ("month", pa.int8())]), flavor="hive")
+    FILE_NAME = "part-0.parquet"
+
+    def __init__(
+        self,
+        root: str,
+        schema: pa.Schema,
+        profile: Optional[ParquetWriterProfile] = None,
+        sorting_columns: Optional[List[str]] = None
+    ) -> None:
+        """
+        :param root: Directory of the dataset; partitions left by a previous write are removed
+        :param schema: Schema of the written batches, with the year and month columns
+        :param profile: Encoding settings of every file
+        :param sorting_columns: Columns the rows of every file are sorted by (see RowGroupWriter)
+        """
+        missing = [column for column in self.PARTITION_COLUMNS if column not in schema.names]
+        if missing:
+            raise ValidationError(f"Partitioned output needs the columns {', '.join(missing)}",
+                                  field="columns", value=schema.names)
+        self.root = root
+        self.schema = schema
+        self.profile = profile
+        self.sorting_columns = [column for column in sorting_columns or () if column not in self.PARTITION_COLUMNS]
+        self.file_schema = pa.schema([field for field in schema if field.name not in self.PARTITION_COLUMNS],
+                                     metadata=schema.metadata)
+        self._writers: Dict[Tuple[int, int], RowGroupWriter] = {}
+        if os.path.isdir(root):
+            for name in os.listdir(root):
+                if name.startswith("year="):
+                    shutil.rmtree(os.path.join(root, name))
+
+    def write_batch(self, batch: pa.RecordBatch) -> None:
+        if batch.num_rows == 0:
+            return
+        if batch.column("year").null_count or batch.column("month").null_count:
+            raise ValidationError("Partitioned output needs a year and month on every row", field="year")
+        keys = pc.add(pc.multiply(batch.column("year").cast(pa.int32()), 100), batch.column("month").cast(pa.int32()))
+        data = batch.select(self.file_schema.names)
+        months = pc.unique(keys).to_pylist()
+        for key in months:
+            part = data if len(months) == 1 else data.filter(pc.equal(keys, key))
+            self._writer(key // 100, key % 100).write_batch(part)
+
+    def write_table(self, table: pa.Table) -> None:
+        for batch in table.to_batches():
+            self.write_batch(batch)
+
+    def _writer(self, year: int, month: int) -> RowGroupWriter:
+        writer = self._writers.get((year, month))
+        if writer is None:
+            directory = os.path.join(self.root, f"year={year}", f"month={month}")
+            os.makedirs(directory, exist_ok=True)
+            writer = RowGroupWriter(os.path.join(directory, self.FILE_NAME), self.file_schema, self.profile,
+                                    self.sorting_columns)
+            self._writers[(year, month)] = writer
+        return writer
+
+    def close(self) -> None:
+        for writer in self._writers.values():
+            writer.close()
+
+
 class ParquetWriter(IParquetWriter):
     """
     Write parquet file
@@ -33,24 +333,192 @@ class ParquetWriter(IParquetWriter):
         pa.field('geo_location', pa.string(), metadata={'description': 'Geographic location coordinates (latitude,longitude)'}),
     ])
 
-    COMPRESSION = 'snappy'
+    # Same columns with compact physical types: 4-byte days, a real timestamp, the user hash as its
+    # 20 bytes and dictionary-encoded low-cardinality strings. Written with compact=True.
+    COMPACT_SCHEMA = pa.schema([
+        pa.field('date', pa.date32(), metadata={'description': 'Date that the dataset was downloaded'}),
+        pa.field('year', pa.int16(), metadata={'description': 'Year that the dataset was downloaded'}),
+        pa.field('month', pa.int8(), metadata={'description': 'Month that the dataset was downloaded'}),
+        pa.field('user', pa.binary(20), metadata={'description': 'SHA-1 digest of the user hash'}),
+        pa.field('accession', pa.dictionary(pa.int32(), pa.string()), metadata={'description': 'PRIDE accession started with PXD'}),
+        pa.field('filename', pa.string(), metadata={'description': 'Filename of the file downloaded'}),
+        pa.field('completed', pa.dictionary(pa.int32(), pa.string()), metadata={'description': 'Check if the file download was completed'}),
+        pa.field('country', pa.dictionary(pa.int32(), pa.string()), metadata={'description': 'Country of the file downloaded'}),
+        pa.field('method', pa.dictionary(pa.int32(), pa.string()), metadata={'description': 'Download method such as FTP/Aspera/Globus'}),
+        pa.field('timestamp', pa.timestamp('us', tz='UTC'), metadata={'description': 'Download time (UTC)'}),
+        pa.field('geoip_region_name', pa.string(), metadata={'description': 'GeoIP region name (e.g., state, province)'}),
+        pa.field('geoip_city_name', pa.string(), metadata={'description': 'GeoIP city name'}),
+        pa.field('geo_location', pa.string(), metadata={'description': 'Geographic location coordinates (latitude,longitude)'}),
+    ])
+
+    # Codec of the default writer profile, kept for callers of the former class constant
+    COMPRESSION = ParquetWriterProfile.load("default").compression
+    USER_HASH = re.compile(r"[0-9a-fA-F]{40}")
 
-    def __init__(self, parquet_path: str, write_strategy: str = 'all', batch_size: int = 10000) -> None:
+    def __init__(
+        self,
+        parquet_path: str,
+        write_strategy: str = 'all',
+        batch_size: int = 10000,
+        columns: Optional[List[str]] = None,
+        compact: bool = False,
+        profile: Optional[ParquetWriterProfile] = None,
+        partitioned: bool = False
+    ) -> None:
         """
         Initialize ParquetWriter.
 
         :param parquet_path: Path to the Parquet file/directory.
         :param write_strategy: Writing strategy ('all' or 'batch').
         :param batch_size: Batch size for batch-wise writing.
+        :param columns: Columns of the schema to write (see project_schema), all if None.
+        :param compact: Write the compact physical types of COMPACT_SCHEMA. Records and batches are still
+            given with the types of the standard schema and converted (see compact_column).
+        :param profile: Encoding settings, the default profile if None.
+        :param partitioned: Write a dataset partitioned by year and month at parquet_path (see PartitionedWriter)
+            instead of a single file. The columns must include year and month.
         """
         if not parquet_path:
             raise ValidationError("parquet_path is required", field="parquet_path")
 
+        self.compact: bool = compact
+        self.record_schema: pa.Schema = self.project_schema(columns)
+        self.schema: pa.Schema = self.project_schema(columns, compact)
         self.parquet_path: str = parquet_path
         self.write_strategy: str = write_strategy.lower()
         self.batch_size: int = batch_size
-        self.parquet_writer: Optional[pq.ParquetWriter] = None
+        self.profile: ParquetWriterProfile = profile or ParquetWriterProfile()
+        self.partitioned: bool = partitioned
+        if partitioned and not set(PartitionedWriter.PARTITION_COLUMNS) <= set(self.schema.names):
+            raise ValidationError("Partitioned output needs the year and month columns", field="columns", value=columns)
+        self.parquet_writer: Union[RowGroupWriter, PartitionedWriter, None] = None
+        # Rows given to write_batch; the rows before batch_offset are already written
         self.batch_data: List[Dict[str, Any]] = []
+        self.batch_offset: int = 0
+
+    @classmethod
+    def project_schema(cls, columns: Optional[List[str]] = None, compact: bool = False) -> pa.Schema:
+        """
+        Schema restricted to some of its columns, kept in schema order.
+
+        :param columns: Names of the columns to keep, all if None or empty.
+        :param compact: Project COMPACT_SCHEMA instead of the standard schema.
+        :return: The projected schema
+        """
+        schema = cls.COMPACT_SCHEMA if compact else cls.schema
+        requested = {column.strip() for column in columns or () if column.strip()}
+        if not requested:
+            return schema
+        unknown = sorted(requested.difference(schema.names))
+        if unknown:
+            raise ValidationError(
+                f"Unknown output columns: {', '.join(unknown)}. Expected some of {', '.join(schema.names)}",
+                field="columns",
+                value=columns
+            )
+        return pa.schema([field for field in schema if field.name in requested])
+
+    @classmethod
+    def is_compact(cls, schema: pa.Schema) -> bool:
+        """
+        Whether a schema has any column with a type of COMPACT_SCHEMA that differs from the standard schema.
+        The date column is not considered: Parquet stores date64 as days, read back as date32.
+        """
+        return any(
+            field.name in cls.COMPACT_SCHEMA.names and field.name != 'date'
+            and field.type == cls.COMPACT_SCHEMA.field(field.name).type != cls.schema.field(field.name).type
+            for field in schema
+        )
+
+    @classmethod
+    def canonical_schema(cls, schema: pa.Schema) -> pa.Schema:
+        """
+        Schema of a file written by a ParquetWriter with these columns: the columns of the standard (or,
+        for a compact schema, the compact) schema get its types and metadata, other columns are kept.
+        """
+        reference = cls.COMPACT_SCHEMA if cls.is_compact(schema) else cls.schema
+        return pa.schema([reference.field(field.name) if field.name in reference.names else field for field in schema])
+
+    @classmethod
+    def conform_batch(cls, batch: pa.RecordBatch, schema: pa.Schema) -> pa.RecordBatch:
+        """
+        Batch with the columns and types of a schema, converting columns of the standard schema to
+        compact types (see compact_column).
+        """
+        if batch.schema.equals(schema, check_metadata=False):
+            return batch
+        return pa.RecordBatch.from_arrays(
+            [cls.compact_column(batch.column(field.name), field) for field in schema],
+            schema=schema
+        )
+
+    @classmethod
+    def compact_column(cls, values: pa.Array, field: pa.Field) -> pa.Array:
+        """
+        Convert a column of the standard schema to its type in COMPACT_SCHEMA.
+        User hashes are the hex digest of a SHA-1 and are stored as its 20 bytes; a user id that is not
+        40 hex digits is stored as the SHA-1 digest of its text. Timestamps are read the way
+        LogFileParser.clean_timestamp does, to the microsecond, as UTC.
+        """
+        if values.type == field.type:
+            return values
+        if pa.types.is_fixed_size_binary(field.type):
+            return cls._user_digests(values.cast(pa.string()))
+        if pa.types.is_timestamp(field.type) and not pa.types.is_timestamp(values.type):
+            cleaned = pc.utf8_rtrim(pc.utf8_slice_codeunits(pc.utf8_trim_whitespace(values), 0, 26), characters="Z")
+            return cleaned.cast(pa.timestamp(field.type.unit)).cast(field.type)
+        if pa.types.is_dictionary(field.type) and not pa.types.is_dictionary(values.type):
+            return pc.dictionary_encode(values.cast(field.type.value_type)).cast(field.type)
+        return values.cast(field.type)
+
+    @classmethod
+    def _user_digests(cls, values: pa.StringArray) -> pa.Array:
+        digest_type = cls.COMPACT_SCHEMA.field('user').type
+        if len(values) == 0:
+            return pa.array([], type=digest_type)
+        if values.null_count == 0 and pc.all(pc.match_substring_regex(values, f"^{cls.USER_HASH.pattern}$")).as_py():
+            # Every value is 40 hex digits, so the values are contiguous in the data buffer
+            start = int(np.frombuffer(values.buffers()[1], dtype=np.int32)[values.offset])
+            hex_digits = values.buffers()[2][start:start + 40 * len(values)].to_pybytes().decode("ascii")
+            return pa.FixedSizeBinaryArray.from_buffers(digest_type, len(values), [None, pa.py_buffer(bytes.fromhex(hex_digits))])
+        return pa.array([
+            None if value is None
+            else bytes.fromhex(value) if cls.USER_HASH.fullmatch(value)
+            else hashlib.sha1(value.encode()).digest()
+            for value in values.to_pylist()
+        ], type=digest_type)
+
+    @classmethod
+    def readable_batch(cls, batch: pa.RecordBatch) -> pa.RecordBatch:
+        """
+        Batch whose compact user digests and timestamps are turned back into strings, as in the standard
+        schema. Timestamps are written with milliseconds, as in the logs, unless they have microseconds:
+        the nanoseconds of some log producers are cut to the microsecond. Dictionary-encoded columns are
+        kept as they are.
+        """
+        if not cls.is_compact(batch.schema):
+            return batch
+        columns = []
+        for field, values in zip(batch.schema, batch.columns):
+            if field.name == 'user' and pa.types.is_fixed_size_binary(field.type):
+                digests = values.buffers()[1][values.offset * 20:(values.offset + len(values)) * 20]
+                offsets = np.arange(0, 40 * len(values) + 1, 40, dtype=np.int32)
+                values = pa.StringArray.from_buffers(len(values), pa.py_buffer(offsets), pa.py_buffer(digests.hex().lower()))
+                if batch.column(field.name).null_count:
+                    values = pc.if_else(batch.column(field.name).is_valid(), values, pa.scalar(None, pa.string()))
+            elif field.name == 'timestamp' and pa.types.is_timestamp(field.type):
+                microseconds = pc.strftime(values, format="%Y-%m-%dT%H:%M:%S")  # Seconds to 6 decimals
+                milliseconds = pc.utf8_slice_codeunits(microseconds, 0, 23)
+                values = pc.binary_join_element_wise(
+                    pc.if_else(pc.equal(pc.microsecond(values), 0), milliseconds, microseconds), "Z", "")
+            columns.append(values)
+        return pa.RecordBatch.from_arrays(columns, names=batch.schema.names)
+
+    def _to_schema(self, batch: pa.RecordBatch) -> pa.RecordBatch:
+        """
+        Batch with the columns and types of the written schema.
+        """
+        return self.conform_batch(batch, self.schema)
 
     # METHOD 1
     def write_all(self, data: List[Dict[str, Any]]) -> bool:
@@ -61,13 +529,18 @@ class ParquetWriter(IParquetWriter):
         """
         try:
             # Convert data to PyArrow Table
-            table = pa.Table.from_pylist(data, schema=self.schema)
+            table = pa.Table.from_pylist(data, schema=self.record_schema)
+            if self.compact:
+                table = pa.Table.from_batches([self._to_schema(batch) for batch in table.to_batches()], schema=self.schema)
             if len(table) > 0:
                 # Write to Parquet
                 pq.write_to_dataset(
                     table,
                     root_path=self.parquet_path,
-                    compression=self.COMPRESSION
+                    compression=self.profile.compression,
+                    partitioning=PartitionedWriter.PARTITIONING if self.partitioned else None,
+                    **({"compression_level": self.profile.compression_level}
+                       if self.profile.compression_level is not None else {})
                 )
                 return True
             return False
@@ -102,7 +575,7 @@ class ParquetWriter(IParquetWriter):
             data_written = False
 
             # If batch size is reached, write the batch
-            while len(self.batch_data) >= self.batch_size:
+            while self._pending_row_count() >= self.batch_size:
                 self._write_current_batch()
                 data_written = True
             return data_written
@@ -124,33 +597,83 @@ class ParquetWriter(IParquetWriter):
             logger.error("Error during write_batch", extra={"parquet_path": self.parquet_path, "error": str(e)}, exc_info=True)
             raise error
 
+    def write_record_batch(self, batch: pa.RecordBatch) -> bool:
+        """
+        Write a columnar RecordBatch to the Parquet file without converting it to rows.
+
+        :param batch: RecordBatch with the columns of the schema.
+        """
+        try:
+            if batch.num_rows == 0:
+                return False
+
+            # Keep row order with data buffered through write_batch
+            while self._pending_row_count():
+                self._write_current_batch()
+
+            self._get_writer().write_batch(self._to_schema(batch))
+            return True
+
+        except (pa.ArrowInvalid, KeyError, IOError, OSError) as e:
+            error = ParquetWriteError(
+                f"Failed to write record batch to Parquet file: {self.parquet_path}",
+                parquet_path=self.parquet_path,
+                batch_size=batch.num_rows,
+                original_error=str(e)
+            )
+            logger.error("Error during write_record_batch", extra={"parquet_path": self.parquet_path, "batch_size": batch.num_rows, "error": str(e)}, exc_info=True)
+            raise error
+        except ParquetWriteError:
+            raise
+        except Exception as e:
+            error = ParquetWriteError(
+                f"Unexpected error writing record batch: {self.parquet_path}",
+                parquet_path=self.parquet_path,
+                original_error=str(e)
+            )
+            logger.error("Error during write_record_batch", extra={"parquet_path": self.parquet_path, "error": str(e)}, exc_info=True)
+            raise error
+
+    def _get_writer(self) -> Union[RowGroupWriter, PartitionedWriter]:
+        """
+        Initialize the writer lazily.
+        """
+        if self.parquet_writer is None:
+            writer_class = PartitionedWriter if self.partitioned else RowGroupWriter
+            self.parquet_writer = writer_class(self.parquet_path, self.schema, self.profile)
+        return self.parquet_writer
+
+    def _pending_row_count(self) -> int:
+        return len(self.batch_data) - self.batch_offset
+
     def _write_current_batch(self) -> None:
         """
-        Write the current batch to the Parquet file.
+        Write the next batch of buffered rows to the Parquet file.
+        Written rows are skipped with an offset and only dropped from the buffer once they are at least
+        half of it, so flushing a large backlog is linear in its rows.
         """
+        rows = self.batch_data[self.batch_offset:self.batch_offset + self.batch_size]
         try:
             # Create a RecordBatch from the current batch data
-            batch = pa.RecordBatch.from_pylist(self.batch_data[:self.batch_size], schema=self.schema)
-
-            # Initialize the writer lazily
-            if self.parquet_writer is None:
-                self.parquet_writer = pq.ParquetWriter(self.parquet_path, schema=self.schema,
-                                                       compression=self.COMPRESSION)
+            batch = pa.RecordBatch.from_pylist(rows, schema=self.record_schema)
 
             # Write the batch
-            self.parquet_writer.write_batch(batch)
+            self._get_writer().write_batch(self._to_schema(batch))
 
-            # Remove written data from the batch
-            self.batch_data = self.batch_data[self.batch_size:]
+            # Skip the written rows, dropping them once they make up half of the buffer
+            self.batch_offset += len(rows)
+            if self.batch_offset * 2 >= len(self.batch_data):
+                del self.batch_data[:self.batch_offset]
+                self.batch_offset = 0
 
         except (pa.ArrowInvalid, IOError, OSError) as e:
             error = ParquetWriteError(
                 f"Failed to write current batch: {self.parquet_path}",
                 parquet_path=self.parquet_path,
-                batch_size=len(self.batch_data[:self.batch_size]),
+                batch_size=len(rows),
                 original_error=str(e)
             )
-            logger.error("Error during _write_current_batch", extra={"parquet_path": self.parquet_path, "batch_size": len(self.batch_data[:self.batch_size]), "error": str(e)}, exc_info=True)
+            logger.error("Error during _write_current_batch", extra={"parquet_path": self.parquet_path, "batch_size": len(rows), "error": str(e)}, exc_info=True)
             raise error
         except Exception as e:
             error = ParquetWriteError(
@@ -158,7 +681,7 @@ class ParquetWriter(IParquetWriter):
                 parquet_path=self.parquet_path,
                 original_error=str(e)
             )
-            logger.error("Error during _write_current_batch", extra={"parquet_path": self.parquet_path, "batch_size": len(self.batch_data[:self.batch_size]), "error": str(e)}, exc_info=True)
+            logger.error("Error during _write_current_batch", extra={"parquet_path": self.parquet_path, "batch_size": len(rows), "error": str(e)}, exc_info=True)
             raise error
 
     def finalize(self) -> bool:
@@ -169,7 +692,7 @@ class ParquetWriter(IParquetWriter):
         data_written = False
         try:
             # Write remaining data if any
-            if self.batch_data and self.write_strategy == 'batch':
+            if self._pending_row_count() and self.write_strategy == 'batch':
                 self._write_current_batch()
                 data_written = True
 
@@ -0,0 +1,38 @@
+from typing import List, Any, Sequence
+
+import pyarrow as pa
+
+
+class RecordBatchBuilder:
+    """
+    Accumulate parsed rows column by column and hand them over as Arrow RecordBatches.
+    Each field is appended straight into the buffer of its column, so no per-row dict is created
+    and the writer does not have to convert rows back into columns.
+    """
+
+    def __init__(self, schema: pa.Schema) -> None:
+        """
+        :param schema: Schema of the batches to build, values are appended in schema field order.
+        """
+        self.schema: pa.Schema = schema
+        self._columns: List[List[Any]] = [[] for _ in schema]
+
+    def __len__(self) -> int:
+        return len(self._columns[0]) if self._columns else 0
+
+    def append(self, values: Sequence[Any]) -> None:
+        """
+        Append one row.
+        :param values: Field values in schema field order
+        """
+        for column, value in zip(self._columns, values):
+            column.append(value)
+
+    def build(self) -> pa.RecordBatch:
+        """
+        Build a RecordBatch from the buffered rows and reset the buffers.
+        :return: RecordBatch matching the builder schema
+        """
+        arrays = [pa.array(column, type=field.type) for column, field in zip(self._columns, self.schema)]
+        self._columns = [[] for _ in self.schema]
+        return pa.RecordBatch.from_arrays(arrays, schema=self.schema)
@@ -4,6 +4,10 @@ from typing import List, Optional
 
 from stat_types import ProjectStat, RegionalStat, TrendsStat, UserStat, BotStat
 from report_util import Report
+from date_window import DateWindow
+from parquet_reader import ParquetReader
+from parquet_writer import PartitionedWriter
+from exceptions import ValidationError
 import pandas as pd
 import dask.dataframe as dd
 
@@ -11,12 +15,23 @@ logger = logging.getLogger(__name__)
 
 class ReportStat:
 
+    @staticmethod
+    def _compute(frame: dd.DataFrame) -> pd.DataFrame:
+        """
+        Compute an aggregate. Dictionary-encoded columns of compact Parquet files are read as categoricals;
+        they are turned back into plain values so that the charts only see the observed ones.
+        """
+        result = frame.compute()
+        categorical = {column: result[column].cat.categories.dtype
+                       for column in result.columns if isinstance(result[column].dtype, pd.CategoricalDtype)}
+        return result.astype(categorical) if categorical else result
+
     @staticmethod
     def project_stat(df: dd.DataFrame, baseurl: str) -> None:
         # --------------- 1. yearly_downloads ---------------
-        yearly_downloads = df.groupby(["year", "method"]).size().reset_index()
+        yearly_downloads = df.groupby(["year", "method"], observed=True).size().reset_index()
         yearly_downloads.columns = ["year", "method", "count"]
-        yearly_downloads = yearly_downloads.compute()
+        yearly_downloads = ReportStat._compute(yearly_downloads)
 
         yearly_totals = yearly_downloads.groupby("year", as_index=False)["count"].sum()
         yearly_totals["method"] = "Total"
@@ -34,9 +49,9 @@ class ReportStat:
         total_downloads = total_downloads.compute()
         total_downloads['method'] = 'Total'
 
-        downloads_by_method = df_with_my.groupby(['month_year', 'method']).size().reset_index()
+        downloads_by_method = df_with_my.groupby(['month_year', 'method'], observed=True).size().reset_index()
         downloads_by_method.columns = ['month_year', 'method', 'count']
-        downloads_by_method = downloads_by_method.compute()
+        downloads_by_method = ReportStat._compute(downloads_by_method)
 
         unique_month_years = sorted(set(total_downloads['month_year'].unique()) |
                                      set(downloads_by_method['month_year'].unique()))
@@ -52,9 +67,9 @@ class ReportStat:
         ProjectStat.cumulative_download(monthly_downloads)
 
         # --------------- 4.1 download count histogram ---------------
-        download_counts = df.groupby("accession").size().reset_index()
+        download_counts = df.groupby("accession", observed=True).size().reset_index()
         download_counts.columns = ["accession", "download_count"]
-        download_counts = download_counts.compute()
+        download_counts = ReportStat._compute(download_counts)
 
         filtered_download_counts = download_counts[download_counts["download_count"] <= 10000]
         download_distribution = filtered_download_counts.groupby("download_count").size().reset_index(
@@ -67,17 +82,17 @@ class ReportStat:
 
     @staticmethod
     def trends_stat(df: dd.DataFrame) -> None:
-        daily_data = df.groupby(['date', 'method']).size().reset_index()
+        daily_data = df.groupby(['date', 'method'], observed=True).size().reset_index()
         daily_data.columns = ['date', 'method', 'count']
-        daily_data = daily_data.compute()
+        daily_data = ReportStat._compute(daily_data)
         daily_data['date'] = pd.to_datetime(daily_data['date'])
         TrendsStat.download_over_trends(daily_data)
 
     @staticmethod
     def regional_stats(df: dd.DataFrame) -> None:
-        choropleth_data = df.groupby(['country', 'year']).size().reset_index()
+        choropleth_data = df.groupby(['country', 'year'], observed=True).size().reset_index()
         choropleth_data.columns = ['country', 'year', 'count']
-        choropleth_data = choropleth_data.compute()
+        choropleth_data = ReportStat._compute(choropleth_data)
         choropleth_data = choropleth_data.sort_values(by='year')
         RegionalStat.download_by_country(choropleth_data)
 
@@ -88,8 +103,8 @@ class ReportStat:
         user_data['date'] = pd.to_datetime(user_data['date'])
         UserStat.unique_users_over_time(user_data)
 
-        country_user_data = df.groupby(['country', 'year'])['user'].nunique().reset_index()
-        country_user_data = country_user_data.compute()
+        country_user_data = df.groupby(['country', 'year'], observed=True)['user'].nunique().reset_index()
+        country_user_data = ReportStat._compute(country_user_data)
         country_user_data = country_user_data.sort_values(by='year')
         UserStat.users_by_country(country_user_data)
 
@@ -120,9 +135,9 @@ class ReportStat:
 
         # 3. Organic downloads by country
         organic_df = df_classified[df_classified['classification'] == 'organic']
-        country_organic = organic_df.groupby('country').size().reset_index()
+        country_organic = organic_df.groupby('country', observed=True).size().reset_index()
         country_organic.columns = ['country', 'count']
-        country_organic = country_organic.compute()
+        country_organic = ReportStat._compute(country_organic)
         country_organic = country_organic.sort_values('count', ascending=False)
         BotStat.organic_downloads_by_country(country_organic)
 
@@ -138,6 +153,9 @@ class ReportStat:
     ) -> None:
         """
         Run the log file statistics generation and save the visualizations in an HTML output file.
+        file may be a dataset partitioned by year and month (see PartitionedWriter), whose skipped years
+        are not read, or the per-file Parquet outputs of the parse steps given as a directory or a list
+        (see ParquetReader.resolve_paths), read without merging them first.
         """
         logger.info("Loading data from Parquet", extra={"file": file})
 
@@ -147,7 +165,12 @@ class ReportStat:
         if enable_bot_classification:
             report_columns += ['is_bot', 'is_hub', 'is_organic']
 
-        df = dd.read_parquet(file, columns=report_columns)
+        paths = ParquetReader.resolve_paths(file)
+        if not paths:
+            raise ValidationError(f"No Parquet files found in {file}", field="file", value=file)
+        df = dd.read_parquet(paths[0] if len(paths) == 1 else paths, columns=report_columns,
+                             filters=DateWindow(skipped_years=skipped_years_list).partition_filters(),
+                             dataset={"partitioning": PartitionedWriter.PARTITIONING})
 
         # Filter out rows where 'year' is in skipped_years_list
         if skipped_years_list:
@@ -15,6 +15,28 @@ params.output_file='parsed_data.parquet'
 params.log_file=''
 params.api_endpoint_file_download_per_project=''
 params.protocols=''
+params.parser_engine='python'
+params.parser_workers=1
+params.files_per_task=0
+params.work_unit_bytes=0
+params.shard_threshold_bytes=0
+params.cache_dir=''
+params.cache_max_bytes=0
+params.listing_cache=''
+params.log_from=''
+params.log_to=''
+params.prune_skipped_years=false
+params.output_columns=[]
+params.compact_schema=false
+params.writer_profile='default'
+params.write_queue=0
+params.partitioned_output=false
+params.sort_output=''
+params.merge_workers=1
+params.merge_part_bytes=0
+params.merge_dataset_output=false
+params.skip_merge=false
+params.analysis_workers=1
 params.enable_bot_classification=true
 params.bot_classification_method='rules'
 params.bot_contamination=0.15
@@ -53,6 +75,27 @@ Completeness        : ${params.completeness}
 Public/Private      : ${params.public_private}
 Report Template     : ${params.report_template}
 Batch Size          : ${params.log_file_batch_size}
+Parser Engine       : ${params.parser_engine}
+Parser Workers      : ${params.parser_workers}
+Files per Task      : ${params.files_per_task}
+Work Unit Bytes     : ${params.work_unit_bytes}
+Shard Threshold     : ${params.shard_threshold_bytes}
+Ingestion Cache     : ${params.cache_dir}
+Cache Max Bytes     : ${params.cache_max_bytes}
+Listing Cache       : ${params.listing_cache}
+Log Date Window     : ${params.log_from ?: '-'} to ${params.log_to ?: '-'}
+Prune Skipped Years : ${params.prune_skipped_years}
+Output Columns      : ${params.output_columns ?: 'all'}
+Compact Schema      : ${params.compact_schema}
+Writer Profile      : ${params.writer_profile}
+Write Queue         : ${params.write_queue}
+Partitioned Output  : ${params.partitioned_output}
+Sort Output By      : ${params.sort_output ?: '-'}
+Merge Workers       : ${params.merge_workers}
+Merge Part Bytes    : ${params.merge_part_bytes}
+Merge Dataset Output: ${params.merge_dataset_output}
+Skip Merge          : ${params.skip_merge}
+Analysis Workers    : ${params.analysis_workers}
 Resource Base URL   : ${params.resource_base_url}
 Report copy location: ${params.report_copy_filepath}
 Skipped Years       : ${params.skipped_years}
@@ -84,7 +127,34 @@ process get_log_files {
         --root_dir $root_dir \
         --output "file_list.txt" \
         --protocols "${params.protocols.join(',')}" \
-        --public "${params.public_private.join(',')}"
+        --public "${params.public_private.join(',')}" \
+        ${params.cache_dir ? "--cache_dir ${params.cache_dir}" : ""} \
+        ${params.listing_cache ? "--listing_cache ${params.listing_cache}" : ""} \
+        ${params.log_from ? "--from ${params.log_from}" : ""} \
+        ${params.log_to ? "--to ${params.log_to}" : ""} \
+        ${params.prune_skipped_years && params.skipped_years ? "--skipped_years ${params.skipped_years.join(',')}" : ""}
+    """
+}
+
+process pack_work_units {
+
+    label 'process_very_low'
+
+    input:
+    path file_list  // file_list.txt generated by get_log_files
+
+    output:
+    path "work_units/unit-*.txt", emit: unit_lists
+    path "work_units/work_units.tsv", emit: manifest
+
+    script:
+    def shard_threshold = params.shard_threshold_bytes > 0 ? "--shard_threshold_bytes ${params.shard_threshold_bytes}" : ""
+    """
+    python3 ${workflow.projectDir}/filedownloadstat/file_download_stat.py  pack_work_units \
+        --file_list ${file_list} \
+        --output_dir work_units \
+        --target_bytes ${params.work_unit_bytes} \
+        ${shard_threshold}
     """
 }
 
@@ -129,10 +199,51 @@ process process_log_file {
         -c "${params.completeness.join(",")}" \
         -b ${params.log_file_batch_size} \
         -a ${params.accession_pattern.join(",")} \
+        -e ${params.parser_engine} \
+        -w ${params.parser_workers} \
+        ${params.cache_dir ? "--cache_dir ${params.cache_dir}" : ""} \
+        ${params.cache_dir && params.cache_max_bytes > 0 ? "--cache_max_bytes ${params.cache_max_bytes}" : ""} \
+        ${params.output_columns ? "--columns ${params.output_columns.join(',')}" : ""} \
+        ${params.compact_schema ? "--compact_schema" : ""} \
+        --writer_profile '${params.writer_profile instanceof Map ? groovy.json.JsonOutput.toJson(params.writer_profile) : params.writer_profile}' \
+        --write_queue ${params.write_queue} \
         > process_log_file.log 2>&1
     """
 }
 
+process process_log_files {
+
+    label 'process_low'
+    label 'error_retry_medium'
+
+    input:
+    path file_list  // A chunk of file_list.txt
+
+    output:
+    path "parquet/*.parquet", optional: true, emit: parquet_files
+    path "parquet/manifest.tsv", emit: manifest
+
+    script:
+    """
+    python3 ${workflow.projectDir}/filedownloadstat/file_download_stat.py  process_log_files \
+        -l ${file_list} \
+        -o parquet \
+        -r "${params.resource_identifiers.join(",")}" \
+        -c "${params.completeness.join(",")}" \
+        -b ${params.log_file_batch_size} \
+        -a ${params.accession_pattern.join(",")} \
+        -e ${params.parser_engine} \
+        -w ${task.cpus} \
+        ${params.cache_dir ? "--cache_dir ${params.cache_dir}" : ""} \
+        ${params.cache_dir && params.cache_max_bytes > 0 ? "--cache_max_bytes ${params.cache_max_bytes}" : ""} \
+        ${params.output_columns ? "--columns ${params.output_columns.join(',')}" : ""} \
+        ${params.compact_schema ? "--compact_schema" : ""} \
+        --writer_profile '${params.writer_profile instanceof Map ? groovy.json.JsonOutput.toJson(params.writer_profile) : params.writer_profile}' \
+        --write_queue ${params.write_queue} \
+        > process_log_files.log 2>&1
+    """
+}
+
 process merge_parquet_files {
 
     label 'process_low'
@@ -145,6 +256,10 @@ process merge_parquet_files {
     path("output_parquet"), emit: output_parquet
 
     script:
+    // The bot classifier reads a single Parquet file
+    def partitionFlag = params.partitioned_output && !params.enable_bot_classification ? "--partitioned" : ""
+    def datasetFlag = params.merge_dataset_output && !params.enable_bot_classification ? "--dataset_output" : ""
+    def sortFlag = params.sort_output ? "--sort_by '${params.sort_output instanceof List ? params.sort_output.join(',') : params.sort_output}'" : ""
     """
     # Write the file paths to a temporary file, because otherwise Argument list(file list) will be too long
     echo "${all_parquet_files.join('\n')}" > all_parquet_files_list.txt
@@ -152,7 +267,13 @@ process merge_parquet_files {
     python3 ${workflow.projectDir}/filedownloadstat/file_download_stat.py  merge_parquet_files \
         --input_dir all_parquet_files_list.txt \
         --output_parquet "output_parquet" \
-        --profile $workflow.profile
+        --writer_profile '${params.writer_profile instanceof Map ? groovy.json.JsonOutput.toJson(params.writer_profile) : params.writer_profile}' \
+        --profile $workflow.profile \
+        --workers ${params.merge_workers} \
+        --part_bytes ${params.merge_part_bytes} \
+        ${partitionFlag} \
+        ${sortFlag} \
+        ${datasetFlag}
     """
 }
 
@@ -202,7 +323,8 @@ process analyze_parquet_files {
         --project_level_yearly_download_counts project_level_yearly_download_counts.json \
         --project_level_top_download_counts project_level_top_download_counts.json \
         --all_data all_data.json \
-        --profile $workflow.profile
+        --profile $workflow.profile \
+        --workers ${params.analysis_workers}
     """
 }
 
@@ -368,31 +490,69 @@ workflow {
     // Step 2: Run statistics in parallel with processing log files
     def stats_file = run_log_file_stat(file_paths)
 
-    file_paths
-        .splitText()                // Split file_list.txt into individual lines
-        .map { it.split('\t')[0].trim() }  // Split each line by tab and take the first column (file name)
-        .set { file_path }          // Save the channel
+    // Step 2: Process the log files and generate Parquet files
+    def all_parquet_files
+    if (params.work_unit_bytes > 0) {
+        // Pack the log files into units of about work_unit_bytes, oversized files get a sharded task of their own
+        pack_work_units(file_paths).unit_lists
+            .flatten()
+            .branch {
+                shard: it.name.endsWith('.shard.txt')
+                pack: true
+            }
+            .set { work_unit }
+
+        work_unit.shard
+            .map { it.text.split('\t')[0].trim() }  // A shard unit holds a single log file
+            .set { file_path }
+
+        all_parquet_files = process_log_files(work_unit.pack).parquet_files.flatten()
+            .mix(process_log_file(file_path))
+    } else if (params.files_per_task > 0) {
+        // Parse files_per_task log files in each task, in one process pool
+        file_paths
+            .splitText(by: params.files_per_task, file: true)  // Split file_list.txt into chunk files
+            .set { file_list_chunk }
+
+        all_parquet_files = process_log_files(file_list_chunk).parquet_files.flatten()
+    } else {
+        file_paths
+            .splitText()                // Split file_list.txt into individual lines
+            .map { it.split('\t')[0].trim() }  // Split each line by tab and take the first column (file name)
+            .set { file_path }          // Save the channel
 
-    // Step 2: Process each log file and generate Parquet files
-    def all_parquet_files = process_log_file(file_path)
+        all_parquet_files = process_log_file(file_path)
+    }
 
     // Collect all parquet files into a single channel for analysis
     all_parquet_files
         .collect()                  // Collect all parquet files into a single list
         .set { parquet_file_list }  // Save the collected files as a new channel
 
-    merge_parquet_files(parquet_file_list)
+    // The analysis and the report can read the per-file Parquet outputs directly, but the bot classifier
+    // reads a single merged file
+    def skip_merge = params.skip_merge && !params.enable_bot_classification
+    def parquet_for_analysis
+    if (skip_merge) {
+        // List the per-file outputs, read as one dataset by analyze_parquet_files and run_file_download_stat
+        parquet_for_analysis = parquet_file_list
+            .flatten()
+            .map { it.toString() }
+            .collectFile(name: 'parquet_parts.txt', newLine: true, sort: true)
+    } else {
+        merge_parquet_files(parquet_file_list)
+
+        // Step 2.5: Optionally classify downloads into bots, hubs, and organic users
+        if (params.enable_bot_classification) {
+            classify_bot_downloads(merge_parquet_files.out.output_parquet)
+        }
 
-    // Step 2.5: Optionally classify downloads into bots, hubs, and organic users
-    if (params.enable_bot_classification) {
-        classify_bot_downloads(merge_parquet_files.out.output_parquet)
+        // Use annotated parquet if bot classification is enabled, otherwise use merged parquet
+        parquet_for_analysis = params.enable_bot_classification
+            ? classify_bot_downloads.out.annotated_parquet
+            : merge_parquet_files.out.output_parquet
     }
 
-    // Use annotated parquet if bot classification is enabled, otherwise use merged parquet
-    def parquet_for_analysis = params.enable_bot_classification
-        ? classify_bot_downloads.out.annotated_parquet
-        : merge_parquet_files.out.output_parquet
-
     // Step 3: Analyze Parquet files
     analyze_parquet_files(parquet_for_analysis)
 
@@ -0,0 +1,151 @@
+"""
+Unit tests for ArrowLogFileParser, including parity with LogFileParser.
+"""
+import unittest
+import tempfile
+import os
+import gzip
+import pyarrow.parquet as pq
+
+from filedownloadstat.log_file_parser import LogFileParser
+from filedownloadstat.arrow_log_parser import ArrowLogFileParser
+from filedownloadstat.log_file_util import FileUtil
+
+
+LOG_LINES = [
+    # Valid rows, including a nanosecond timestamp and placeholder geoip values
+    "2023-01-01T23:57:16.000Z\tcaf4815df53c650523eb4943a05bc7b7906e5507\t669943668\t/pride/data/archive/2016/12/PXD004242/filename.raw\tOUT\t03dbae9a96db63fa62487cd3c134d05230858127\tComplete\tUnited Kingdom\tCambridgeshire\tSawston\t52.1202,0.1845\thttp\tpublic",
+    "2024-09-14T07:14:07.419698061Z\t599e60a8a2abb676f6c8143315c3819be4613ac4\t572328757\t/pride-archive/2022/11/PXD029198/D3.raw\tOUT\t03dbae9a96db63fa62487cd3c134d05230858127\tcomplete \tUnited States\t{geoip_region_name}\t%{geoip_city_name}\t 40.3864,-74.5111 \tftp\tpublic",
+    "2023-11-16T14:17:18.963Z\t206692352bb826652461c90c0e056045282f508d\t619815434\t/xfer/public/pride/data/archive/2023/11/PXD012558/LF_Natowicz_10_091916.raw.mgf\tOUT\tf1e078517ffda4b7cc0389661184ecc05cf6682f\tComplete\tGermany\t\t\t\tgridftp-globus\tpublic",
+    # Literal '\t' separators written by some log producers
+    "2023-01-02T10:00:00.000Z\\tuser_hash\\t1\\t/pride/data/archive/2016/12/PXD004242/other.raw\\tOUT\\thash\\tComplete\\tFrance\\tIle-de-France\\tParis\\t48.85,2.35\\thttp\\tpublic",
+    # Irrelevant rows: other resource, partial download, no accession, no filename, wrong column count
+    "2023-01-01T23:57:16.000Z\tuser\t1\t/biostudies/fire/S-BIAD/199/S-BIAD1199/file.tif\tOUT\thash\tComplete\tUnited Kingdom\tA\tB\t1,2\thttp\tpublic",
+    "2023-01-01T23:57:16.000Z\tuser\t1\t/pride/data/archive/2016/12/PXD004242/filename.raw\tOUT\thash\tPartial\tUnited Kingdom\tA\tB\t1,2\thttp\tpublic",
+    "2023-01-01T23:57:16.000Z\tuser\t1\t/pride/data/archive/2016/12/README.txt\tOUT\thash\tComplete\tUnited Kingdom\tA\tB\t1,2\thttp\tpublic",
+    "2023-01-01T23:57:16.000Z\tuser\t1\t/pride/data/archive/2016/12/PXD004242/\tOUT\thash\tComplete\tUnited Kingdom\tA\tB\t1,2\thttp\tpublic",
+    "2023-01-01T23:57:16.000Z\tuser\t1\t/pride/data/archive/2016/12/PXD004242/filename.raw\tOUT",
+    "",
+]
+
+
+class TestArrowLogFileParser(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.log_file = os.path.join(self.temp_dir, "test_log.tsv.gz")
+        with gzip.open(self.log_file, "wt") as f:
+            for _ in range(50):
+                f.write("\n".join(LOG_LINES) + "\n")
+        self.parser_args = dict(
+            resource_list=["/pride/data/archive", "/pride-archive", "/xfer/public/pride"],
+            completeness_list=["complete"],
+            accession_pattern_list=["PXD\\d{6}"]
+        )
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        import shutil
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    @staticmethod
+    def _parse_all(parser, batch_size):
+        return [row for batch in parser.parse_gzipped_tsv(batch_size) for row in batch]
+
+    def test_parity_with_python_parser(self):
+        """Test the Arrow engine produces exactly the rows of the Python engine."""
+        expected = self._parse_all(LogFileParser(self.log_file, **self.parser_args), 7)
+        actual = self._parse_all(ArrowLogFileParser(self.log_file, **self.parser_args), 7)
+
+        self.assertEqual(len(expected), 200)
+        self.assertEqual(actual, expected)
+
+    def test_parity_with_multiple_accession_patterns(self):
+        """Test the first matching pattern wins, as in get_accession."""
+        args = dict(self.parser_args, accession_pattern_list=["PXD\\d{3}", "PXD\\d{6}"])
+        expected = self._parse_all(LogFileParser(self.log_file, **args), 1000)
+        actual = self._parse_all(ArrowLogFileParser(self.log_file, **args), 1000)
+
+        self.assertEqual(actual, expected)
+        self.assertEqual(actual[0]["accession"], "PXD004")
+
+    def test_parity_with_accession_in_directory_and_filename(self):
+        """Test an earlier pattern matching the file name wins over a later one matching the directory."""
+        log_file = os.path.join(self.temp_dir, "biostudies.tsv.gz")
+        paths = [
+            "/biostudies/fire/E-MTAB-/813/E-MTAB-6813/Files/S-BIAD77_copy.tif",
+            "/biostudies/fire/E-MTAB-/813/E-MTAB-6813/Files/data.tif",
+            "/biostudies/fire/S-BIAD/199/S-BIAD1199/E-MTAB-1_file.tif",
+            "/biostudies/fire/other/E-MTAB-42.zip",
+        ]
+        with gzip.open(log_file, "wt") as f:
+            for path in paths * 3:
+                f.write(f"2023-01-01T23:57:16.000Z\tuser\t1\t{path}\tOUT\thash\tComplete\tUnited Kingdom\tA\tB\t1,2\thttp\tpublic\n")
+        args = dict(resource_list=["/biostudies"], completeness_list=["complete"],
+                    accession_pattern_list=["S-BIAD\\d+", "E-MTAB-\\d+"])
+        expected = self._parse_all(LogFileParser(log_file, **args), 5)
+        actual = self._parse_all(ArrowLogFileParser(log_file, **args), 5)
+
+        self.assertEqual(actual, expected)
+        self.assertEqual([row["accession"] for row in expected[:4]], ["S-BIAD77", "E-MTAB-6813", "S-BIAD1199", "E-MTAB-42"])
+
+    def test_column_projection(self):
+        """Test both engines produce only the requested columns, with the values of a full parse."""
+        columns = ["method", "date", "accession", "geo_location"]
+        full = self._parse_all(LogFileParser(self.log_file, **self.parser_args), 1000)
+        expected = [{name: row[name] for name in ("date", "accession", "method", "geo_location")} for row in full]
+
+        for parser_class in (LogFileParser, ArrowLogFileParser):
+            parser = parser_class(self.log_file, columns=columns, **self.parser_args)
+            actual = [row for batch in parser.parse_record_batches(64) for row in batch.to_pylist()]
+            self.assertEqual(actual, expected, parser_class.__name__)
+
+    def test_parse_summary_matches_python_parser(self):
+        """Test both engines report the same pre-filter counts."""
+        python_parser = LogFileParser(self.log_file, **self.parser_args)
+        arrow_parser = ArrowLogFileParser(self.log_file, **self.parser_args)
+        self._parse_all(python_parser, 100)
+        self._parse_all(arrow_parser, 100)
+
+        self.assertEqual(arrow_parser.parse_summary, python_parser.parse_summary)
+        self.assertEqual(python_parser.parse_summary["lines_read"], 500)
+        self.assertEqual(python_parser.parse_summary["rows_parsed"], 200)
+
+    def test_batches_respect_batch_size(self):
+        """Test batches are full except for the last one."""
+        parser = ArrowLogFileParser(self.log_file, **self.parser_args)
+        sizes = [len(batch) for batch in parser.parse_gzipped_tsv(64)]
+        self.assertEqual(sizes, [64, 64, 64, 8])
+
+    def test_corrupted_file_is_skipped(self):
+        """Test corrupted files are handled gracefully like the Python engine."""
+        corrupted_file = os.path.join(self.temp_dir, "corrupted.tsv.gz")
+        with open(corrupted_file, "wb") as f:
+            f.write(b"not a valid gzip file")
+
+        parser = ArrowLogFileParser(corrupted_file, **self.parser_args)
+        self.assertEqual(list(parser.parse_gzipped_tsv(10)), [])
+
+    def test_process_log_file_with_arrow_engine(self):
+        """Test both engines write the same Parquet file through FileUtil."""
+        file_util = FileUtil()
+        outputs = {}
+        for engine in ("python", "arrow"):
+            outputs[engine] = os.path.join(self.temp_dir, f"{engine}.parquet")
+            file_util.process_log_file(
+                self.log_file,
+                outputs[engine],
+                self.parser_args["resource_list"],
+                self.parser_args["completeness_list"],
+                100,
+                self.parser_args["accession_pattern_list"],
+                engine=engine
+            )
+
+        self.assertTrue(pq.read_table(outputs["arrow"]).equals(pq.read_table(outputs["python"])))
+
+
+if __name__ == '__main__':
+    unittest.main()
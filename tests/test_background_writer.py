@@ -0,0 +1,108 @@
+"""
+Unit tests for the BackgroundWriter.
+"""
+import unittest
+import tempfile
+import os
+import gzip
+import shutil
+import threading
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from filedownloadstat.background_writer import BackgroundWriter
+from filedownloadstat.parquet_writer import ParquetWriter
+from filedownloadstat.log_file_util import FileUtil
+
+
+LOG_LINE = "2023-01-01T00:00:00.000Z\tuser_hash\t123\t/pride/data/archive/2023/01/PXD000001/file.raw\tOUT\thash\tComplete\tUnited Kingdom\tCambridgeshire\tCambridge\t52.2053,0.1218\thttp\tpublic\n"
+
+
+class BlockingWriter:
+    """Writer whose writes wait for a release, recording the batches written."""
+
+    def __init__(self, fail_at=None):
+        self.release = threading.Event()
+        self.written = []
+        self.fail_at = fail_at
+        self.finalized = False
+
+    def write_record_batch(self, batch):
+        self.release.wait()
+        if len(self.written) == self.fail_at:
+            raise OSError("disk full")
+        self.written.append(batch)
+        return True
+
+    def finalize(self):
+        self.finalized = True
+        return False
+
+
+class TestBackgroundWriter(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.batch = pa.RecordBatch.from_pylist([{"filename": "file.raw"}], schema=pa.schema([("filename", pa.string())]))
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_batches_are_written_in_order(self):
+        """Test every queued batch is written by the wrapped writer, in order."""
+        output = os.path.join(self.temp_dir, "out.parquet")
+        writer = BackgroundWriter(ParquetWriter(output, write_strategy='batch', columns=["filename"]), max_pending=2)
+        for i in range(20):
+            writer.write_record_batch(pa.RecordBatch.from_pylist([{"filename": f"file{i}"}], schema=self.batch.schema))
+        writer.finalize()
+
+        self.assertEqual(pq.read_table(output).column("filename").to_pylist(), [f"file{i}" for i in range(20)])
+
+    def test_full_queue_blocks_the_producer(self):
+        """Test the producer waits once max_pending batches are queued."""
+        wrapped = BlockingWriter()
+        writer = BackgroundWriter(wrapped, max_pending=2)
+        producer = threading.Thread(target=lambda: [writer.write_record_batch(self.batch) for _ in range(5)])
+        producer.start()
+        producer.join(0.2)
+        self.assertTrue(producer.is_alive())
+
+        wrapped.release.set()
+        producer.join()
+        writer.finalize()
+        self.assertEqual(len(wrapped.written), 5)
+        self.assertTrue(wrapped.finalized)
+
+    def test_writer_failure_is_raised_as_parquet_write_error(self):
+        """Test a failure of the writer thread reaches the producer as a ParquetWriteError."""
+        wrapped = BlockingWriter(fail_at=1)
+        wrapped.release.set()
+        writer = BackgroundWriter(wrapped, max_pending=1)
+        with self.assertRaises(Exception) as context:
+            for _ in range(10):
+                writer.write_record_batch(self.batch)
+            writer.finalize()
+
+        self.assertEqual(type(context.exception).__name__, "ParquetWriteError")
+        self.assertIn("disk full", context.exception.context["original_error"])
+        self.assertFalse(wrapped.finalized)
+
+    def test_process_log_file_with_write_queue(self):
+        """Test a pipelined parse writes the same output as an inline one."""
+        log_file = os.path.join(self.temp_dir, "test.log.tsv.gz")
+        with gzip.open(log_file, "wt") as f:
+            f.write(LOG_LINE * 50)
+        outputs = []
+        for write_queue in (0, 2):
+            outputs.append(os.path.join(self.temp_dir, f"queue-{write_queue}.parquet"))
+            self.assertTrue(FileUtil().process_log_file(log_file, outputs[-1], ["/pride/data/archive"], ["complete"], 7,
+                                                        ["PXD\\d{6}"], write_queue=write_queue))
+
+        self.assertTrue(pq.read_table(outputs[1]).equals(pq.read_table(outputs[0])))
+
+
+if __name__ == '__main__':
+    unittest.main()
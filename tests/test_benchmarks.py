@@ -0,0 +1,549 @@
+"""
+Micro-benchmarks for the hot paths of the pipeline.
+Run with `python -m pytest tests/test_benchmarks.py -s` to see the measured rates.
+The results are always checked, but the timings are only compared with RUN_BENCHMARKS=1, since
+they depend on the load of the machine.
+"""
+import os
+import re
+import time
+import shutil
+import tempfile
+import unittest
+from datetime import date, datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from filedownloadstat.group_counter import GroupCounter
+from filedownloadstat.log_file_parser import LogFileParser
+from filedownloadstat.parquet_writer import ParquetWriter, ParquetWriterProfile
+from filedownloadstat.parquet_sorter import ParquetSorter
+from filedownloadstat.parquet_analyzer import ParquetAnalyzer
+from filedownloadstat.parquet_reader import ParquetReader
+
+# Assert the timing comparisons, not only print them
+RUN_BENCHMARKS = os.environ.get("RUN_BENCHMARKS") == "1"
+
+
+def _rate(func, items, repeat=3):
+    """Best rows/sec of `func` over `items`."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        best = min(best, time.perf_counter() - start)
+    return len(items) / best
+
+
+def _interleaved_rates(before, after, items, repeat=7):
+    """Best rows/sec of `before` and `after`, measured alternately so both see the same machine load."""
+    best_before = best_after = 0.0
+    for _ in range(repeat):
+        best_before = max(best_before, _rate(before, items, repeat=1))
+        best_after = max(best_after, _rate(after, items, repeat=1))
+    return best_before, best_after
+
+
+class TestAccessionMatcherBenchmark(unittest.TestCase):
+    """Accession lookup: per-row regex recompilation vs compiled matcher with directory cache."""
+
+    ROW_COUNT = 20000
+    PATTERNS = ["PXD\\\\d{6}", "MSV\\\\d{9}"]
+
+    @classmethod
+    def setUpClass(cls):
+        cls.rows = [
+            [
+                "2023-01-01T23:57:16.000Z", "user", "1",
+                f"/pride/data/archive/2016/12/PXD{i % 50:06d}/file_{i}.raw",
+                "OUT", "hash", "Complete", "United Kingdom", "A", "B", "1,2", "http", "public"
+            ]
+            for i in range(cls.ROW_COUNT)
+        ]
+        cls.parser = LogFileParser("", ["/pride/data/archive"], ["complete"], cls.PATTERNS)
+
+    def _legacy_accession(self, path):
+        """get_accession as it was: fix escaping, then re.search every pattern."""
+        for pattern in self.PATTERNS:
+            match = re.search(re.sub(r"\\\\", r"\\", pattern), path)
+            if match:
+                return match.group()
+        return None
+
+    def _legacy_row(self, row):
+        """is_relevant_row and parse_row each looked the accession up."""
+        if self._legacy_accession(row[3]) is not None:
+            return self._legacy_accession(row[3])
+        return None
+
+    def test_accession_matcher_rows_per_second(self):
+        """Test the compiled matcher returns the same accessions, faster."""
+        expected = [self._legacy_row(row) for row in self.rows]
+        self.assertEqual([self.parser.relevant_accession(row) for row in self.rows], expected)
+
+        before = _rate(self._legacy_row, self.rows)
+        after = _rate(self.parser.relevant_accession, self.rows)
+        print(f"\naccession lookup: before {before:,.0f} rows/s, after {after:,.0f} rows/s ({after / before:.1f}x)")
+        if RUN_BENCHMARKS:
+            self.assertGreater(after, before)
+
+
+class TestTimestampDecoderBenchmark(unittest.TestCase):
+    """Timestamp decoding: strptime per row vs fixed-layout slicing with day cache."""
+
+    ROW_COUNT = 20000
+
+    @classmethod
+    def setUpClass(cls):
+        cls.timestamps = [
+            f"2024-09-{13 + i % 2:02d}T{i % 24:02d}:{i % 60:02d}:17.{'000Z' if i % 3 else '419698061Z'}"
+            for i in range(cls.ROW_COUNT)
+        ]
+        cls.parser = LogFileParser("", ["/pride/data/archive"], ["complete"], ["PXD\\d{6}"])
+
+    @staticmethod
+    def _legacy_decode(timestamp):
+        parsed_time = datetime.strptime(LogFileParser.clean_timestamp(timestamp), LogFileParser.DATETIME_FORMAT)
+        return parsed_time.date(), parsed_time.year, parsed_time.month
+
+    def test_timestamp_decoder_rows_per_second(self):
+        """Test the decoder returns the same dates as strptime, faster."""
+        self.assertEqual([self.parser.decode_timestamp(ts) for ts in self.timestamps],
+                         [self._legacy_decode(ts) for ts in self.timestamps])
+
+        before = _rate(self._legacy_decode, self.timestamps)
+        after = _rate(self.parser.decode_timestamp, self.timestamps)
+        print(f"\ntimestamp decoding: before {before:,.0f} rows/s, after {after:,.0f} rows/s ({after / before:.1f}x)")
+        if RUN_BENCHMARKS:
+            self.assertGreater(after, before)
+
+
+class TestLinePrefilterBenchmark(unittest.TestCase):
+    """Line scanning: decode and split every line vs byte-level pre-filter."""
+
+    LINE_COUNT = 20000
+
+    @classmethod
+    def setUpClass(cls):
+        # Most lines of a shared log belong to other resources
+        cls.lines = [
+            (f"2023-01-01T23:57:16.000Z\tuser\t1\t/{'pride/data/archive' if i % 10 == 0 else 'biostudies/fire'}"
+             f"/2016/12/PXD{i % 50:06d}/file_{i}.raw\tOUT\thash\tComplete\tUnited Kingdom\tA\tB\t1,2\thttp\tpublic\n").encode()
+            for i in range(cls.LINE_COUNT)
+        ]
+        cls.parser = LogFileParser("", ["/pride/data/archive"], ["complete"], ["PXD\\d{6}"])
+
+    def _legacy_scan(self, lines):
+        """Every line was decoded, split and checked field by field."""
+        return [fields for line_no, line in enumerate(lines, start=1)
+                if (fields := self.parser.parse_fields(line.decode("utf-8").replace('\\t', '\t').strip().split('\t'), line_no))]
+
+    def test_line_prefilter_lines_per_second(self):
+        """Test the pre-filter yields the same rows, faster."""
+        self.assertEqual(list(self.parser.parse_lines(self.lines)), self._legacy_scan(self.lines))
+        self.assertEqual(self.parser.parse_summary["skip_ratio"], 0.9)
+
+        before, after = _interleaved_rates(self._legacy_scan, lambda lines: list(self.parser.parse_lines(lines)), [self.lines])
+        before, after = before * self.LINE_COUNT, after * self.LINE_COUNT
+        print(f"\nline scanning: before {before:,.0f} lines/s, after {after:,.0f} lines/s ({after / before:.1f}x)")
+        if RUN_BENCHMARKS:
+            self.assertGreater(after, before)
+
+
+class TestWriterProfileBenchmark(unittest.TestCase):
+    """Parquet encoding: write time, file size and scan time of each writer profile."""
+
+    ROW_COUNT = 200000
+    BATCH_SIZE = 1000  # log_file_batch_size of the PRIDE parameters
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        countries = ["United Kingdom", "Germany", "China", "United States", "France"]
+        rows = [
+            {
+                "date": date(2023, 1 + i % 12, 1 + i % 28), "year": 2023, "month": 1 + i % 12,
+                "user": f"{(i * 7919) % 20000:040x}", "accession": f"PXD{(i * 31) % 5000:06d}",
+                "filename": f"file_{i % 300}.raw", "completed": "complete", "country": countries[i % 5],
+                "method": ("http", "ftp", "fasp-aspera")[i % 3], "timestamp": f"2023-01-01T00:00:{i % 60:02d}.000Z",
+                "geoip_region_name": "Cambridgeshire", "geoip_city_name": "Cambridge", "geo_location": "52.2053,0.1218",
+            }
+            for i in range(cls.ROW_COUNT)
+        ]
+        cls.batches = pa.Table.from_pylist(rows, schema=ParquetWriter.schema).to_batches(max_chunksize=cls.BATCH_SIZE)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def _write(self, name):
+        path = os.path.join(self.temp_dir, f"{name}.parquet")
+        start = time.perf_counter()
+        writer = ParquetWriter(path, write_strategy='batch', profile=ParquetWriterProfile.load(name))
+        for batch in self.batches:
+            writer.write_record_batch(batch)
+        writer.finalize()
+        return path, time.perf_counter() - start
+
+    @staticmethod
+    def _scan(path):
+        """Best time of a project count over the merged columns the analysis reads."""
+        best = float("inf")
+        for _ in range(3):
+            start = time.perf_counter()
+            pq.read_table(path, columns=["accession", "year"]).group_by("accession").aggregate([("year", "count")])
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    def test_writer_profiles(self):
+        """Test every profile writes the same rows, and zstd row groups make smaller files than the default."""
+        results = {}
+        print()
+        for name in ParquetWriterProfile.PROFILES:
+            path, write_seconds = self._write(name)
+            metadata = pq.read_metadata(path)
+            results[name] = (os.path.getsize(path), metadata.num_row_groups)
+            self.assertEqual(metadata.num_rows, self.ROW_COUNT)
+            print(f"writer profile {name}: write {write_seconds:.2f}s, {results[name][0] / 1e6:.2f} MB, "
+                  f"{metadata.num_row_groups} row groups, scan {self._scan(path) * 1000:.0f} ms")
+
+        self.assertEqual(results["default"][1], self.ROW_COUNT // self.BATCH_SIZE)
+        self.assertEqual(results["zstd"][1], 1)
+        self.assertLess(results["zstd"][0], results["default"][0])
+
+
+class TestRowBufferBenchmark(unittest.TestCase):
+    """Row buffering: slicing the remaining rows off at every flush vs skipping them with an offset."""
+
+    ROW_COUNTS = (10000, 40000, 160000)
+    BATCH_SIZE = 100
+
+    class LegacyWriter(ParquetWriter):
+        """_write_current_batch as it was: every flush copied the rows left in the buffer."""
+
+        def _pending_row_count(self):
+            return len(self.batch_data)
+
+        def _write_current_batch(self):
+            batch = pa.RecordBatch.from_pylist(self.batch_data[:self.batch_size], schema=self.record_schema)
+            self._get_writer().write_batch(self._to_schema(batch))
+            self.batch_data = self.batch_data[self.batch_size:]
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def _row_cost(self, writer_class, row_count, repeat=3):
+        """Best seconds per row of one write_batch call of row_count rows."""
+        rows = [{"accession": "PXD000001"}] * row_count
+        best = float("inf")
+        for _ in range(repeat):
+            writer = writer_class(os.path.join(self.temp_dir, "rows.parquet"), write_strategy='batch',
+                                  batch_size=self.BATCH_SIZE, columns=["accession"])
+            start = time.perf_counter()
+            writer.write_batch(rows)
+            writer.finalize()
+            best = min(best, time.perf_counter() - start)
+        return best / row_count
+
+    def test_row_cost_is_constant(self):
+        """Test the cost per row does not grow with the rows of a write_batch call."""
+        before = [self._row_cost(self.LegacyWriter, row_count) for row_count in self.ROW_COUNTS]
+        after = [self._row_cost(ParquetWriter, row_count) for row_count in self.ROW_COUNTS]
+        print()
+        for row_count, legacy_cost, cost in zip(self.ROW_COUNTS, before, after):
+            print(f"row buffer, {row_count:,} rows in one call: before {legacy_cost * 1e6:.2f} us/row, "
+                  f"after {cost * 1e6:.2f} us/row")
+
+        self.assertEqual(pq.read_metadata(os.path.join(self.temp_dir, "rows.parquet")).num_rows, self.ROW_COUNTS[-1])
+        if RUN_BENCHMARKS:
+            self.assertLess(after[-1], after[0] * 2)
+            self.assertLess(after[-1], before[-1])
+
+
+
+class TestSortedOutputBenchmark(unittest.TestCase):
+    """Merged output in log order against output sorted by accession and date: size and project lookups."""
+
+    ROW_COUNT = 400000
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        rows = [
+            {
+                "date": date(2023, 1 + i * 12 // cls.ROW_COUNT, 1 + i % 28), "year": 2023,
+                "month": 1 + i * 12 // cls.ROW_COUNT, "user": f"{(i * 7919) % 20000:040x}",
+                "accession": f"PXD{(i * 31) % 5000:06d}", "filename": f"file_{i % 300}.raw", "method": "http",
+            }
+            for i in range(cls.ROW_COUNT)
+        ]
+        cls.log_order = os.path.join(cls.temp_dir, "log_order.parquet")
+        writer = ParquetWriter(cls.log_order, write_strategy='batch', columns=list(rows[0]),
+                               profile=ParquetWriterProfile(compression="zstd", row_group_rows=ParquetSorter.SORTED_ROW_GROUP_ROWS))
+        for batch in pa.Table.from_pylist(rows, schema=writer.schema).to_batches(max_chunksize=10000):
+            writer.write_record_batch(batch)
+        writer.finalize()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    @staticmethod
+    def _lookup(path, accession):
+        """Row groups a reader filtering on accession opens, and the best time of the lookup."""
+        metadata = pq.read_metadata(path)
+        column = metadata.schema.names.index("accession")
+        opened = sum(
+            1 for i in range(metadata.num_row_groups)
+            if metadata.row_group(i).column(column).statistics.min <= accession <= metadata.row_group(i).column(column).statistics.max
+        )
+        best = float("inf")
+        for _ in range(3):
+            start = time.perf_counter()
+            pq.read_table(path, filters=[("accession", "=", accession)])
+            best = min(best, time.perf_counter() - start)
+        return opened, best
+
+    def test_sorted_output(self):
+        """Test the sorted output is smaller and a project lookup opens a single row group."""
+        sorted_path = os.path.join(self.temp_dir, "sorted.parquet")
+        start = time.perf_counter()
+        ParquetSorter(max_rows_in_memory=self.ROW_COUNT // 4).sort(
+            [self.log_order], sorted_path, writer_profile=ParquetWriterProfile(compression="zstd"))
+        sort_seconds = time.perf_counter() - start
+
+        results = {}
+        print()
+        for name, path in (("log order", self.log_order), ("sorted", sorted_path)):
+            opened, seconds = self._lookup(path, "PXD002500")
+            results[name] = (os.path.getsize(path), opened)
+            print(f"{name}: {results[name][0] / 1e6:.2f} MB, project lookup opens {opened} of "
+                  f"{pq.read_metadata(path).num_row_groups} row groups, {seconds * 1000:.1f} ms")
+        print(f"sort in 4 runs: {sort_seconds:.2f}s")
+
+        self.assertEqual(pq.read_metadata(sorted_path).num_rows, self.ROW_COUNT)
+        self.assertLess(results["sorted"][0], results["log order"][0])
+        self.assertEqual(results["sorted"][1], 1)
+
+
+class TestMergeBenchmark(unittest.TestCase):
+    """merge_parquet_files: batches streamed as Arrow vs the former round trip through pandas."""
+
+    FILE_COUNT = 8
+    ROW_COUNT = 50000
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        countries = ["United Kingdom", "Germany", "China", "United States", "France"]
+        rows = [
+            {
+                "date": date(2023, 1 + i % 12, 1 + i % 28), "year": 2023, "month": 1 + i % 12,
+                "user": f"{(i * 7919) % 20000:040x}", "accession": f"PXD{(i * 31) % 5000:06d}",
+                "filename": f"file_{i % 300}.raw", "completed": "complete", "country": countries[i % 5],
+                "method": ("http", "ftp", "fasp-aspera")[i % 3], "timestamp": f"2023-01-01T00:00:{i % 60:02d}.000Z",
+                "geoip_region_name": "Cambridgeshire", "geoip_city_name": "Cambridge", "geo_location": "52.2053,0.1218",
+            }
+            for i in range(cls.ROW_COUNT)
+        ]
+        table = pa.Table.from_pylist(rows, schema=ParquetWriter.schema)
+        cls.file_list = os.path.join(cls.temp_dir, "file_list.txt")
+        with open(cls.file_list, "w") as f:
+            for index in range(cls.FILE_COUNT):
+                path = os.path.join(cls.temp_dir, f"input{index}.parquet")
+                pq.write_table(table, path)
+                f.write(f"{path}\n")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def _legacy_merge(self, output):
+        """The former merge loop: every batch converted to pandas and back."""
+        writer = None
+        first_schema = None
+        with open(self.file_list) as f:
+            for path in f.read().split():
+                for batch in pq.ParquetFile(path).iter_batches(batch_size=100000):
+                    df = batch.to_pandas()
+                    if writer is None:
+                        first_schema = pa.Table.from_pandas(df).schema
+                        writer = pq.ParquetWriter(output, first_schema)
+                    writer.write_table(pa.Table.from_pandas(df, schema=first_schema))
+        writer.close()
+
+    @staticmethod
+    def _best(func, repeat=3):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    def test_merge_rows_per_second(self):
+        """Test the Arrow merge writes the same rows, and is not slower than the pandas round trip."""
+        legacy_output = os.path.join(self.temp_dir, "legacy.parquet")
+        output = os.path.join(self.temp_dir, "merged.parquet")
+        before = self._best(lambda: self._legacy_merge(legacy_output))
+        after = self._best(lambda: ParquetAnalyzer().merge_parquet_files(self.file_list, output))
+        rows = self.FILE_COUNT * self.ROW_COUNT
+        print()
+        print(f"merge {rows:,} rows: pandas round trip {rows / before:,.0f} rows/s, arrow {rows / after:,.0f} rows/s")
+
+        self.assertEqual(pq.read_metadata(output).num_rows, rows)
+        self.assertTrue(pq.read_table(output).drop_columns(["date"]).equals(
+            pq.read_table(legacy_output).drop_columns(["date"]).replace_schema_metadata(None).cast(
+                pq.read_table(output).drop_columns(["date"]).schema)))
+        if RUN_BENCHMARKS:
+            # Both are dominated by Parquet decoding and encoding; allow for timing noise
+            self.assertLess(after, before * 1.1)
+
+    @staticmethod
+    def _project_counts(source):
+        dataset = ParquetReader.open_dataset(source)
+        return dataset.to_table(columns=["accession"]).group_by("accession").aggregate([("accession", "count")])
+
+    def test_scan_parts_without_merge(self):
+        """Test counting projects over the per-file outputs beats merging them first."""
+        output = os.path.join(self.temp_dir, "merged_for_scan.parquet")
+        merged_counts = []
+
+        def merge_then_scan():
+            ParquetAnalyzer().merge_parquet_files(self.file_list, output)
+            merged_counts.append(self._project_counts(output))
+
+        before = self._best(merge_then_scan)
+        after = self._best(lambda: self._project_counts(self.file_list))
+        print()
+        print(f"project counts over {self.FILE_COUNT} parts: merge then scan {before * 1000:.0f} ms, "
+              f"scan the parts {after * 1000:.0f} ms")
+
+        self.assertTrue(self._project_counts(self.file_list).sort_by("accession").equals(
+            merged_counts[-1].sort_by("accession")))
+        if RUN_BENCHMARKS:
+            self.assertLess(after, before)
+
+
+class TestGroupCounterBenchmark(unittest.TestCase):
+    """analyze_parquet_files aggregation: GroupCounter accumulators vs per-batch pandas groupby, concat and regroup."""
+
+    ROW_COUNT = 400000
+    BATCH_SIZE = 20000
+    KEYS = (["accession"], ["accession", "filename"], ["accession", "year"])
+
+    @classmethod
+    def setUpClass(cls):
+        rows = [
+            {"year": 2020 + i % 4, "accession": f"PXD{(i * 31) % 5000:06d}", "filename": f"file_{i % 300}.raw"}
+            for i in range(cls.ROW_COUNT)
+        ]
+        table = pa.Table.from_pylist(rows, schema=ParquetWriter.project_schema(list(rows[0])))
+        cls.batches = table.to_batches(max_chunksize=cls.BATCH_SIZE)
+
+    def _legacy_counts(self):
+        """The former aggregation: partial counts of every batch kept until the end, then regrouped."""
+        partials = [[] for _ in self.KEYS]
+        for batch in self.batches:
+            df = batch.to_pandas()
+            for keys, partial in zip(self.KEYS, partials):
+                partial.append(df.groupby(keys, observed=True).size().reset_index(name="count"))
+        held = sum(len(frame) for partial in partials for frame in partial)
+        counts = [pd.concat(partial, ignore_index=True).groupby(keys, observed=True)["count"].sum().reset_index()
+                  for keys, partial in zip(self.KEYS, partials)]
+        return counts, held
+
+    def _counter_counts(self):
+        counters = [GroupCounter(keys) for keys in self.KEYS]
+        for batch in self.batches:
+            for counter in counters:
+                counter.update(batch)
+        return [counter.to_pandas() for counter in counters], sum(counter.group_count for counter in counters)
+
+    def test_group_counter(self):
+        """Test the accumulators give the same counts, holding one counter per group, and are not slower."""
+        before, after = float("inf"), float("inf")
+        for _ in range(3):
+            start = time.perf_counter()
+            legacy, legacy_held = self._legacy_counts()
+            before = min(before, time.perf_counter() - start)
+            start = time.perf_counter()
+            counts, held = self._counter_counts()
+            after = min(after, time.perf_counter() - start)
+        print()
+        print(f"aggregate {self.ROW_COUNT:,} rows in {len(self.batches)} batches: pandas groupby and concat "
+              f"{before * 1000:.0f} ms holding {legacy_held:,} partial rows, GroupCounter {after * 1000:.0f} ms "
+              f"holding {held:,} groups")
+
+        for expected, result in zip(legacy, counts):
+            self.assertEqual(result.values.tolist(), expected.values.tolist())
+        self.assertLess(held, legacy_held)
+        if RUN_BENCHMARKS:
+            self.assertLess(after, before)
+
+
+class TestParallelAnalysisBenchmark(unittest.TestCase):
+    """analyze_parquet_files aggregation and export: 1 to N worker processes over the row groups."""
+
+    ROW_COUNT = 400000
+    ROW_GROUP_ROWS = 25000
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        rows = [
+            {
+                "date": date(2020 + i % 4, 1 + i % 12, 1 + i % 28), "year": 2020 + i % 4, "month": 1 + i % 12,
+                "user": f"{(i * 7919) % 20000:040x}", "accession": f"PXD{(i * 31) % 5000:06d}",
+                "filename": f"file_{i % 300}.raw", "method": ("http", "ftp", "fasp-aspera")[i % 3],
+            }
+            for i in range(cls.ROW_COUNT)
+        ]
+        cls.input = os.path.join(cls.temp_dir, "input.parquet")
+        pq.write_table(pa.Table.from_pylist(rows, schema=ParquetWriter.project_schema(list(rows[0]))), cls.input,
+                       row_group_size=cls.ROW_GROUP_ROWS)
+        cls.cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def _aggregate(self, workers):
+        """Best seconds of the aggregation pass, its counts and its export."""
+        all_data = os.path.join(self.temp_dir, f"all_data_{workers}.json")
+        best = float("inf")
+        for _ in range(2):
+            start = time.perf_counter()
+            counters = ParquetAnalyzer().aggregate(self.input, all_data, workers=workers)
+            best = min(best, time.perf_counter() - start)
+        with open(all_data) as f:
+            export = f.read()
+        return best, [counter.to_table() for counter in counters], export
+
+    def test_analysis_scaling(self):
+        """Test every worker count gives the single-worker results, and 2 workers are faster given 2 cores
+        (with RUN_BENCHMARKS=1)."""
+        worker_counts = sorted({1, 2, min(max(self.cores, 2), 8)})
+        results = {workers: self._aggregate(workers) for workers in worker_counts}
+        print()
+        for workers, (seconds, _, _) in results.items():
+            print(f"analyze {self.ROW_COUNT:,} rows with {workers} worker(s) on {self.cores} core(s): "
+                  f"{seconds:.2f}s, {self.ROW_COUNT / seconds:,.0f} rows/s, speedup {results[1][0] / seconds:.2f}x")
+
+        for workers in worker_counts[1:]:
+            self.assertTrue(all(table.equals(expected) for table, expected in zip(results[workers][1], results[1][1])))
+            self.assertEqual(results[workers][2], results[1][2])
+        if RUN_BENCHMARKS and self.cores >= 2:
+            self.assertLess(results[2][0], results[1][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
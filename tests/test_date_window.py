@@ -0,0 +1,105 @@
+"""
+Unit tests for DateWindow and date pruning during log discovery.
+"""
+import unittest
+import tempfile
+import os
+import shutil
+from datetime import date
+from unittest.mock import patch
+
+from filedownloadstat.date_window import DateWindow
+from filedownloadstat.directory_scanner import DirectoryScanner
+
+
+class TestDateWindow(unittest.TestCase):
+
+    def test_path_period(self):
+        """Test the period of a path comes from its most specific date."""
+        window = DateWindow()
+        self.assertEqual(window.path_period("2023"), (date(2023, 1, 1), date(2023, 12, 31)))
+        self.assertEqual(window.path_period("2024/02"), (date(2024, 2, 1), date(2024, 2, 29)))
+        self.assertEqual(window.path_period("2024/02/access-2024-02-03.tsv.gz"), (date(2024, 2, 3), date(2024, 2, 3)))
+        self.assertEqual(window.path_period("2024/access_202402.tsv.gz"), (date(2024, 2, 1), date(2024, 2, 29)))
+        self.assertIsNone(window.path_period("misc/access.tsv.gz"))
+        self.assertIsNone(window.path_period("01"))
+
+    def test_includes(self):
+        """Test paths outside the window or in a skipped year are pruned."""
+        window = DateWindow("2023-11", "2024-02-10", skipped_years=[2022])
+        self.assertTrue(window.includes("2023"))
+        self.assertFalse(window.includes("2023/10"))
+        self.assertTrue(window.includes("2024/02/access-2024-02-10.tsv.gz"))
+        self.assertFalse(window.includes("2024/02/access-2024-02-11.tsv.gz"))
+        self.assertFalse(window.includes("2025"))
+        self.assertTrue(window.includes("misc/access.tsv.gz"))
+        self.assertFalse(DateWindow(skipped_years=[2022]).includes("2022/05"))
+
+    def test_partition_filters(self):
+        """Test the partition filters keep the months of the window outside the skipped years."""
+        self.assertIsNone(DateWindow().partition_filters())
+        self.assertEqual(DateWindow(skipped_years=[2022, 2021]).partition_filters(),
+                         [[("year", "not in", [2021, 2022])]])
+        self.assertEqual(DateWindow("2023-11", "2024-02-10").partition_filters(), [
+            [("year", "=", 2023), ("month", ">=", 11)],
+            [("year", ">", 2023), ("year", "<", 2024)],
+            [("year", "=", 2024), ("month", "<=", 2)],
+        ])
+        self.assertEqual(DateWindow("2024-02", "2024-03").partition_filters(),
+                         [[("year", "=", 2024), ("month", ">=", 2), ("month", "<=", 3)]])
+        self.assertEqual(DateWindow(to_date="2023").partition_filters(),
+                         [[("year", "<", 2023)], [("year", "=", 2023), ("month", "<=", 12)]])
+
+    def test_invalid_dates_raise(self):
+        """Test malformed or inverted windows are rejected."""
+        for from_date, to_date in (("2024-13", None), ("March", None), ("2024-02", "2024-01")):
+            with self.assertRaises(Exception) as context:
+                DateWindow(from_date, to_date)
+            self.assertEqual(type(context.exception).__name__, "ValidationError")
+
+
+class TestDatePruning(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.listing_cache = os.path.join(self.temp_dir, "listing.json")
+        self.root = os.path.join(self.temp_dir, "http", "public")
+        for year in ("2022", "2023", "2024"):
+            for month in ("01", "02"):
+                path = os.path.join(self.root, year, month, f"access-{year}-{month}-01.tsv.gz")
+                os.makedirs(os.path.dirname(path))
+                open(path, "w").close()
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def _scan(self, window):
+        scanner = DirectoryScanner(workers=4, listing_cache=self.listing_cache, date_window=window)
+        return [os.path.relpath(f.path, self.root) for f in scanner.scan([self.root])[0]]
+
+    def test_pruned_directories_are_not_listed(self):
+        """Test only the directories of the window are walked."""
+        scanner = DirectoryScanner(workers=1, date_window=DateWindow("2023-02", "2024", skipped_years=[2024]))
+        with patch.object(scanner, "_list_directory", wraps=scanner._list_directory) as list_directory:
+            files = scanner.scan([self.root])[0]
+
+        self.assertEqual([os.path.relpath(f.path, self.root) for f in files],
+                         [os.path.join("2023", "02", "access-2023-02-01.tsv.gz")])
+        listed = sorted(os.path.relpath(call.args[0], self.root) for call in list_directory.call_args_list)
+        self.assertEqual(listed, [".", "2023", os.path.join("2023", "02")])
+
+    def test_pruning_keeps_listing_cache_of_pruned_trees(self):
+        """Test a backfill of one month does not drop the cached listings of the other months."""
+        self.assertEqual(len(self._scan(None)), 6)
+        self.assertEqual(self._scan(DateWindow("2022-01", "2022-01")),
+                         [os.path.join("2022", "01", "access-2022-01-01.tsv.gz")])
+
+        scanner = DirectoryScanner(workers=4, listing_cache=self.listing_cache)
+        self.assertEqual(len(scanner._cached_listings), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
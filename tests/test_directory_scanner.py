@@ -0,0 +1,80 @@
+"""
+Unit tests for the DirectoryScanner.
+"""
+import unittest
+import tempfile
+import os
+import shutil
+from unittest.mock import patch
+
+from filedownloadstat.directory_scanner import DirectoryScanner
+
+
+class TestDirectoryScanner(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.listing_cache = os.path.join(self.temp_dir, "listing.json")
+        self.roots = [os.path.join(self.temp_dir, "http", "public"), os.path.join(self.temp_dir, "ftp", "public")]
+        for month in ("01", "02"):
+            self._write(os.path.join(self.roots[0], "2023", month, f"http-{month}.tsv.gz"), b"x" * int(month))
+        self._write(os.path.join(self.roots[1], "2023", "01", "ftp-01.tsv.gz"))
+        self._write(os.path.join(self.roots[1], "2023", "01", "notes.txt"))
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def _write(self, path, content=b"content"):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content)
+
+    def _scan(self, roots=None):
+        """Scan with a listing cache, counting the directories listed."""
+        with patch("os.scandir", wraps=os.scandir) as scandir:
+            files = DirectoryScanner(workers=4, listing_cache=self.listing_cache).scan(roots or self.roots)
+        return files, scandir.call_count
+
+    def test_scan_finds_files_of_each_root(self):
+        """Test files are found under each root, sorted, with their sizes."""
+        files = DirectoryScanner(workers=4).scan(self.roots + [os.path.join(self.temp_dir, "missing")])
+
+        self.assertEqual([os.path.basename(f.path) for f in files[0]], ["http-01.tsv.gz", "http-02.tsv.gz"])
+        self.assertEqual([f.size for f in files[0]], [1, 2])
+        self.assertEqual([os.path.basename(f.path) for f in files[1]], ["ftp-01.tsv.gz"])
+        self.assertEqual(files[2], [])
+
+    def test_unchanged_directories_are_not_listed_again(self):
+        """Test a second scan reuses the cached listings."""
+        first, listed = self._scan()
+        self.assertEqual(listed, 7)
+
+        second, listed = self._scan()
+
+        self.assertEqual(listed, 0)
+        self.assertEqual([[f.path for f in root_files] for root_files in second],
+                         [[f.path for f in root_files] for root_files in first])
+
+    def test_changed_directory_is_listed_again(self):
+        """Test a new file or month directory is found, listing only the changed directories."""
+        self._scan()
+        self._write(os.path.join(self.roots[0], "2023", "03", "http-03.tsv.gz"))
+
+        files, listed = self._scan()
+
+        self.assertEqual(listed, 2)  # The year directory and the new month directory
+        self.assertEqual(len(files[0]), 3)
+
+    def test_scanning_one_root_keeps_the_listings_of_others(self):
+        """Test the listing cache keeps the directories outside the scanned trees."""
+        self._scan()
+        self._scan(self.roots[:1])
+
+        self.assertEqual(self._scan()[1], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+Unit tests for the GroupCounter.
+"""
+import unittest
+import pyarrow as pa
+
+from filedownloadstat.group_counter import GroupCounter
+
+
+class TestGroupCounter(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.table = pa.table({
+            "accession": [f"PXD{(i * 7) % 11:06d}" for i in range(500)],
+            "filename": [f"file{(i * 3) % 17}.raw" for i in range(500)],
+            "year": pa.array([2020 + i % 4 for i in range(500)], type=pa.int16()),
+            "is_bot": [i % 3 == 0 for i in range(500)],
+        })
+
+    def _update(self, counter, table, batch_size=64):
+        for batch in table.to_batches(max_chunksize=batch_size):
+            counter.update(batch)
+        return counter
+
+    def test_counts_match_pandas_groupby(self):
+        """Test the counts accumulated over many batches match a groupby of all the rows."""
+        counter = self._update(GroupCounter(["accession", "filename", "year"]), self.table)
+
+        expected = (self.table.to_pandas().groupby(["accession", "filename", "year"]).size()
+                    .reset_index(name="count"))
+        result = counter.to_pandas()
+        self.assertEqual(result.columns.tolist(), ["accession", "filename", "year", "count"])
+        self.assertEqual(result.values.tolist(), expected.values.tolist())
+        self.assertEqual(counter.row_count, 500)
+
+    def test_sum_columns(self):
+        """Test boolean columns are summed per group."""
+        counter = self._update(GroupCounter(["accession"], {"bot_count": "is_bot"}), self.table)
+
+        expected = self.table.to_pandas().groupby("accession")["is_bot"].sum()
+        result = counter.to_pandas().set_index("accession")
+        self.assertEqual(result["bot_count"].to_dict(), expected.to_dict())
+        self.assertEqual(result["count"].sum(), 500)
+
+    def test_dictionary_columns_count_like_plain_columns(self):
+        """Test dictionary-encoded batches, whose dictionaries differ, give the same groups."""
+        plain = self._update(GroupCounter(["accession", "filename"]), self.table)
+        encoded = GroupCounter(["accession", "filename"])
+        for batch in self.table.to_batches(max_chunksize=64):
+            encoded.update(pa.RecordBatch.from_arrays(
+                [batch.column("accession").dictionary_encode(), batch.column("filename").dictionary_encode()],
+                names=["accession", "filename"]))
+
+        self.assertTrue(encoded.to_table().equals(plain.to_table()))
+
+    def test_null_keys_are_not_counted(self):
+        """Test rows with a null key are left out, as pandas does."""
+        table = pa.table({"accession": ["PXD000001", None, "PXD000001", "PXD000002"],
+                          "year": pa.array([2023, 2023, None, 2024], type=pa.int16())})
+        counter = self._update(GroupCounter(["accession", "year"]), table, batch_size=3)
+
+        self.assertEqual(counter.to_pandas().values.tolist(), [["PXD000001", 2023, 1], ["PXD000002", 2024, 1]])
+        self.assertEqual(counter.group_count, 4)
+
+    def test_combine_partial_counts(self):
+        """Test combining the partial counts of slices gives the counts of the whole table."""
+        whole = self._update(GroupCounter(["accession", "year"], {"bot_count": "is_bot"}), self.table)
+        combined = GroupCounter(["accession", "year"], {"bot_count": "is_bot"})
+        for offset in range(0, 500, 150):
+            partial = self._update(GroupCounter(["accession", "year"], {"bot_count": "is_bot"}),
+                                   self.table.slice(offset, 150))
+            combined.combine(partial.to_table())
+
+        self.assertTrue(combined.to_table().equals(whole.to_table()))
+        self.assertEqual(combined.row_count, 500)
+
+    def test_memory_is_bounded_by_groups(self):
+        """Test the accumulator keeps one counter per group however many batches it reads."""
+        counter = GroupCounter(["accession", "filename"])
+        for _ in range(20):
+            self._update(counter, self.table)
+
+        self.assertEqual(counter.group_count, len(self.table.to_pandas().groupby(["accession", "filename"])))
+        self.assertLessEqual(len(counter._counts), 2 * counter.group_count)
+        self.assertEqual(counter.to_pandas()["count"].sum(), 20 * 500)
+
+
+if __name__ == '__main__':
+    unittest.main()
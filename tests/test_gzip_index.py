@@ -0,0 +1,256 @@
+"""
+Unit tests for gzip member indexing, intra-file sharding and resumable reading.
+"""
+import unittest
+import tempfile
+import os
+import gzip
+import shutil
+import struct
+import zlib
+import pyarrow.parquet as pq
+from unittest.mock import patch
+
+from filedownloadstat import gzip_index
+from filedownloadstat.gzip_index import GzipCheckpoint, ResumableLineReader, build_gzip_index, plan_shards
+from filedownloadstat.log_file_parser import LogFileParser
+from filedownloadstat.log_file_util import FileUtil
+
+
+def bgzf_compress(data, block_size=500):
+    """Compress data as BGZF blocks (what bgzip writes), followed by the empty EOF block."""
+    blocks = []
+    for start in range(0, len(data), block_size):
+        blocks.append(data[start:start + block_size])
+    blocks.append(b"")
+    output = b""
+    for block in blocks:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+        deflated = compressor.compress(block) + compressor.flush()
+        header = b"\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff" + struct.pack("<H", 6)
+        header += b"BC" + struct.pack("<HH", 2, len(header) + 6 + len(deflated) + 8 - 1)
+        output += header + deflated + struct.pack("<II", zlib.crc32(block), len(block))
+    return output
+
+
+def multi_member_compress(data, member_size=700):
+    """Compress data as concatenated gzip members cut at arbitrary bytes."""
+    return b"".join(gzip.compress(data[start:start + member_size]) for start in range(0, len(data), member_size))
+
+
+class TestGzipIndex(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.data = b"".join(
+            f"2023-01-01T23:57:16.000Z\tuser{i}\t1\t/pride/data/archive/2016/12/PXD{i % 7:06d}/file_{i}.raw\tOUT"
+            f"\thash\tComplete\tUnited Kingdom\tA\tB\t1,2\thttp\tpublic\n".encode()
+            for i in range(300)
+        )
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def _write(self, name, content):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    def _shard_lines(self, path, shard_count):
+        members = build_gzip_index(path)
+        shards = plan_shards(path, members, os.path.getsize(path), shard_count)
+        return shards, [line for shard in shards for line in shard.iter_lines()]
+
+    def test_bgzf_blocks_are_indexed_from_headers(self):
+        """Test BGZF blocks are found without decompressing them."""
+        path = self._write("bgzf.tsv.gz", bgzf_compress(self.data))
+        members = build_gzip_index(path)
+
+        self.assertEqual(len(members), -(-len(self.data) // 500) + 1)
+        self.assertTrue(all(member.ends_with_newline is None for member in members))
+
+    def test_multi_member_file_is_indexed(self):
+        """Test members of concatenated gzip files are found and their line endings recorded."""
+        path = self._write("multi.tsv.gz", multi_member_compress(self.data))
+        members = build_gzip_index(path)
+
+        self.assertEqual(len(members), -(-len(self.data) // 700))
+        self.assertEqual(members[0].offset, 0)
+        self.assertTrue(members[-1].ends_with_newline)
+
+    def test_single_member_file_has_one_shard(self):
+        """Test a plain gzip file cannot be split."""
+        path = self._write("single.tsv.gz", gzip.compress(self.data))
+        shards, _ = self._shard_lines(path, 4)
+
+        self.assertEqual(len(shards), 1)
+
+    def test_single_member_file_is_not_decompressed(self):
+        """Test a plain gzip file is planned as one shard without decompressing it to find its members."""
+        path = self._write("single.tsv.gz", gzip.compress(self.data * 20))
+        with patch.object(gzip_index, "READ_SIZE", 1000), \
+                patch.object(gzip_index, "_scan_gzip_members", wraps=gzip_index._scan_gzip_members) as scan:
+            members = build_gzip_index(path)
+            self.assertIsNone(FileUtil()._plan_log_file_shards(path, 4))
+
+        scan.assert_not_called()
+        self.assertEqual([member.offset for member in members], [0])
+
+    def test_header_bytes_inside_a_member(self):
+        """Test gzip header bytes stored inside a member are not taken for a member boundary."""
+        data = self.data + b"\x1f\x8b\x08\x00" + self.data + gzip.compress(self.data)
+        path = self._write("single.tsv.gz", gzip.compress(data, compresslevel=0))
+        members = build_gzip_index(path)
+
+        self.assertEqual([member.offset for member in members], [0])
+
+    def test_shards_cover_every_line_once(self):
+        """Test lines cut by shard boundaries are read by exactly one shard, in order."""
+        expected = self.data.decode().splitlines()
+        for name, content in (("bgzf.tsv.gz", bgzf_compress(self.data, 333)),
+                              ("multi.tsv.gz", multi_member_compress(self.data, 457))):
+            path = self._write(name, content)
+            for shard_count in (2, 3, 8, 100):
+                shards, lines = self._shard_lines(path, shard_count)
+                self.assertGreater(len(shards), 1)
+                self.assertEqual([line.decode() for line in lines], expected, f"{name} in {shard_count} shards")
+
+    def test_parse_record_batches_of_shards(self):
+        """Test parsing every shard gives the rows of parsing the whole file."""
+        path = self._write("bgzf.tsv.gz", bgzf_compress(self.data))
+        parser = LogFileParser(path, ["/pride/data/archive"], ["complete"], ["PXD\\d{6}"])
+        expected = [row for batch in parser.parse_record_batches(64) for row in batch.to_pylist()]
+
+        shards = plan_shards(path, build_gzip_index(path), os.path.getsize(path), 5)
+        actual = [row for shard in shards for batch in parser.parse_record_batches(64, shard) for row in batch.to_pylist()]
+
+        self.assertEqual(len(expected), 300)
+        self.assertEqual(actual, expected)
+
+    def test_member_ending_at_a_read_boundary(self):
+        """Test members after one that ends exactly at the end of a read are not lost."""
+        path = self._write("multi.tsv.gz", multi_member_compress(self.data))
+        with patch.object(gzip_index, "READ_SIZE", len(gzip.compress(self.data[:700]))):
+            members = build_gzip_index(path)
+            data = b"".join(data for data, _ in gzip_index.iter_member_data(path, 0, 0))
+
+        self.assertEqual(len(members), -(-len(self.data) // 700))
+        self.assertEqual(data, self.data)
+
+    def test_process_log_file_with_workers(self):
+        """Test a sharded file is written in order, the same as with one worker."""
+        path = self._write("multi.tsv.gz", multi_member_compress(self.data))
+        file_util = FileUtil()
+        outputs = {}
+        for engine in ("python", "arrow"):
+            for workers in (1, 2):
+                outputs[engine, workers] = os.path.join(self.temp_dir, f"{engine}-{workers}.parquet")
+                file_util.process_log_file(path, outputs[engine, workers], ["/pride/data/archive"], ["complete"], 50,
+                                           ["PXD\\d{6}"], engine=engine, workers=workers)
+
+        expected = pq.read_table(outputs["python", 1])
+        self.assertEqual(expected.num_rows, 300)
+        for output in outputs.values():
+            self.assertTrue(pq.read_table(output).equals(expected))
+
+        projected = os.path.join(self.temp_dir, "projected.parquet")
+        file_util.process_log_file(path, projected, ["/pride/data/archive"], ["complete"], 50, ["PXD\\d{6}"],
+                                   workers=2, columns=["accession", "date"])
+        self.assertTrue(pq.read_table(projected).equals(expected.select(["date", "accession"])))
+        os.remove(projected)
+        self.assertEqual(sorted(os.listdir(self.temp_dir)),
+                         sorted(["multi.tsv.gz"] + [os.path.basename(output) for output in outputs.values()]))
+
+
+class TestResumableLineReader(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.log_file = os.path.join(self.temp_dir, "growing.tsv.gz")
+        self.output = os.path.join(self.temp_dir, "growing.parquet")
+        self.checkpoint_file = os.path.join(self.temp_dir, "growing.checkpoint.json")
+        self.lines = [
+            f"2023-01-01T23:57:16.000Z\tuser{i}\t1\t/pride/data/archive/2016/12/PXD{i % 7:06d}/file_{i}.raw\tOUT"
+            f"\thash\tComplete\tUnited Kingdom\tA\tB\t1,2\thttp\tpublic\n".encode()
+            for i in range(200)
+        ]
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def _append(self, data):
+        with open(self.log_file, "ab") as f:
+            f.write(gzip.compress(data))
+
+    def _process(self):
+        return FileUtil().process_log_file(self.log_file, self.output, ["/pride/data/archive"], ["complete"], 50,
+                                           ["PXD\\d{6}"], checkpoint_file=self.checkpoint_file)
+
+    def _part_users(self, part):
+        return pq.read_table(FileUtil.part_output_path(self.output, part)).column("user").to_pylist()
+
+    def test_reader_yields_complete_lines_after_checkpoint(self):
+        """Test a resumed reader starts after the checkpoint and leaves a trailing partial line."""
+        self._append(b"".join(self.lines[:10]) + self.lines[10][:20])
+        reader = ResumableLineReader(self.log_file)
+        self.assertEqual(len(list(reader.iter_lines())), 10)
+        checkpoint = reader.checkpoint(0)
+        self.assertEqual(checkpoint.line_no, 10)
+
+        self._append(self.lines[10][20:] + b"".join(self.lines[11:15]))
+        reader = ResumableLineReader(self.log_file, checkpoint)
+
+        self.assertTrue(reader.resumed)
+        self.assertEqual(reader.first_line_no, 11)
+        self.assertEqual([line + b"\n" for line in reader.iter_lines()], self.lines[10:15])
+        self.assertEqual(reader.checkpoint(1).compressed_offset, os.path.getsize(self.log_file))
+
+    def test_appended_records_go_to_next_part(self):
+        """Test each run parses only the appended records into a new part."""
+        self._append(b"".join(self.lines[:120]))
+        self.assertTrue(self._process())
+        self._append(b"".join(self.lines[120:]))
+        self.assertTrue(self._process())
+        self.assertFalse(self._process())
+
+        self.assertEqual(len(self._part_users(0)), 120)
+        self.assertEqual(len(self._part_users(1)), 80)
+        self.assertFalse(os.path.exists(FileUtil.part_output_path(self.output, 2)))
+        checkpoint = GzipCheckpoint.load(self.checkpoint_file)
+        self.assertEqual((checkpoint.line_no, checkpoint.part), (200, 1))
+        self.assertGreater(checkpoint.compressed_offset, 0)
+
+    def test_recompressed_file_skips_consumed_records(self):
+        """Test a file recompressed with more records resumes after the consumed ones."""
+        self._append(b"".join(self.lines[:120]))
+        self._process()
+        with open(self.log_file, "wb") as f:
+            f.write(gzip.compress(b"".join(self.lines)))
+        self._process()
+
+        self.assertEqual(len(self._part_users(1)), 80)
+
+    def test_replaced_file_starts_again(self):
+        """Test a log file replaced by another one is parsed again from part 0."""
+        self._append(b"".join(self.lines[:120]))
+        self._process()
+        self._append(b"".join(self.lines[120:]))
+        self._process()
+        with open(self.log_file, "wb") as f:
+            f.write(gzip.compress(b"".join(self.lines[50:])))
+        self._process()
+
+        self.assertEqual(len(self._part_users(0)), 150)
+        self.assertFalse(os.path.exists(FileUtil.part_output_path(self.output, 1)))
+        self.assertEqual(GzipCheckpoint.load(self.checkpoint_file).part, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
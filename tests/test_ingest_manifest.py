@@ -0,0 +1,155 @@
+"""
+Unit tests for IngestManifest and incremental ingestion through FileUtil.
+"""
+import unittest
+import tempfile
+import os
+import gzip
+import shutil
+import pyarrow.parquet as pq
+
+from filedownloadstat.ingest_manifest import IngestManifest
+from filedownloadstat.parquet_cache import ParquetCache
+from filedownloadstat.parquet_writer import ParquetWriter
+from filedownloadstat.log_file_parser import LogFileParser
+from filedownloadstat.log_file_util import FileUtil
+from filedownloadstat.log_file_analyzer import LogFileAnalyzer
+
+
+LOG_LINE = "2023-01-01T00:00:00.000Z\tuser_hash\t123\t/pride/data/archive/2023/01/PXD000001/file.raw\tOUT\thash\tComplete\tUnited Kingdom\tCambridgeshire\tCambridge\t52.2053,0.1218\thttp\tpublic\n"
+
+
+class CountingParser(LogFileParser):
+    """LogFileParser that counts how many files were parsed."""
+    parsed = []
+
+    def parse_record_batches(self, batch_size, source=None):
+        CountingParser.parsed.append(self.file_path)
+        return super().parse_record_batches(batch_size, source)
+
+
+class TestIngestManifest(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.temp_dir, "cache")
+        self.log_file = os.path.join(self.temp_dir, "http", "public", "test.log.tsv.gz")
+        os.makedirs(os.path.dirname(self.log_file))
+        self._write_log(3)
+        self.config = (["/pride/data/archive"], ["complete"], ["PXD\\d{6}"])
+        CountingParser.parsed = []
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def _write_log(self, line_count):
+        with gzip.open(self.log_file, "wt") as f:
+            f.write(LOG_LINE * line_count)
+
+    def _process(self, output_name):
+        output = os.path.join(self.temp_dir, output_name)
+        resource_list, completeness_list, accession_pattern_list = self.config
+        written = FileUtil(parser_factory=CountingParser).process_log_file(
+            self.log_file, output, resource_list, completeness_list, 1000, accession_pattern_list,
+            cache_dir=self.cache_dir
+        )
+        return written, output
+
+    def test_config_hash_depends_on_configuration(self):
+        """Test the configuration hash changes with any parser setting."""
+        base = IngestManifest.config_hash(*self.config)
+        self.assertEqual(base, IngestManifest.config_hash(["/pride/data/archive"], [" Complete"], ["PXD\\d{6}"]))
+        self.assertNotEqual(base, IngestManifest.config_hash(["/pride-archive"], ["complete"], ["PXD\\d{6}"]))
+        self.assertNotEqual(base, IngestManifest.config_hash(["/pride/data/archive"], ["complete"], ["MSV\\d{9}"]))
+        self.assertEqual(base, IngestManifest.config_hash(*self.config, columns=list(reversed(ParquetWriter.schema.names))))
+        self.assertNotEqual(base, IngestManifest.config_hash(*self.config, columns=["date", "accession"]))
+        self.assertNotEqual(base, IngestManifest.config_hash(*self.config, compact=True))
+
+    def test_unchanged_file_reuses_cached_output(self):
+        """Test a second run restores the cached output without parsing."""
+        written, first = self._process("first.parquet")
+        self.assertTrue(written)
+        written, second = self._process("second.parquet")
+
+        self.assertTrue(written)
+        self.assertEqual(CountingParser.parsed, [self.log_file])
+        self.assertTrue(pq.read_table(second).equals(pq.read_table(first)))
+
+    def test_modified_file_is_parsed_again(self):
+        """Test a file whose size or modification time changed is parsed again."""
+        self._process("first.parquet")
+        self._write_log(5)
+        written, output = self._process("second.parquet")
+
+        self.assertEqual(len(CountingParser.parsed), 2)
+        self.assertEqual(pq.read_metadata(output).num_rows, 5)
+
+    def test_reused_output_is_not_the_cached_object(self):
+        """Test an output restored from the manifest is a copy, so rewriting it leaves the cache intact."""
+        self._process("first.parquet")
+        written, output = self._process("first.parquet")
+        self.assertEqual(CountingParser.parsed, [self.log_file])
+        object_paths = [path for _, _, path in ParquetCache(self.cache_dir)._list_objects()]
+        self.assertFalse(os.path.samefile(object_paths[0], output))
+
+        self._write_log(5)
+        self._process("first.parquet")
+
+        self.assertEqual(pq.read_metadata(output).num_rows, 5)
+        self.assertEqual(pq.read_metadata(object_paths[0]).num_rows, 3)
+
+    def test_config_change_is_parsed_again(self):
+        """Test a change of parser configuration invalidates the entry."""
+        self._process("first.parquet")
+        self.config = (["/pride/data/archive"], ["complete", "partial"], ["PXD\\d{6}"])
+        self._process("second.parquet")
+
+        self.assertEqual(len(CountingParser.parsed), 2)
+
+    def test_file_without_rows_is_cached(self):
+        """Test a log file without relevant rows is not parsed again and writes no output."""
+        self.config = (["/other/archive"], ["complete"], ["PXD\\d{6}"])
+        self.assertFalse(self._process("first.parquet")[0])
+        written, output = self._process("second.parquet")
+
+        self.assertFalse(written)
+        self.assertFalse(os.path.exists(output))
+        self.assertEqual(len(CountingParser.parsed), 1)
+
+    def test_missing_cached_output_is_a_miss(self):
+        """Test an entry whose cached output was removed is parsed again."""
+        self._process("first.parquet")
+        ParquetCache(self.cache_dir).prune(0)
+        self._process("second.parquet")
+
+        self.assertEqual(len(CountingParser.parsed), 2)
+
+    def test_file_list_counts_new_and_unchanged_files(self):
+        """Test get_log_files logs the files recorded in the manifest, keeping the four file list columns."""
+        self._process("first.parquet")
+        new_file = os.path.join(os.path.dirname(self.log_file), "new.log.tsv.gz")
+        shutil.copyfile(self.log_file, new_file)
+        file_list = os.path.join(self.temp_dir, "file_list.txt")
+
+        with self.assertLogs(level="INFO") as logs:
+            FileUtil().process_access_methods(self.temp_dir, file_list, ["http"], ["public"], cache_dir=self.cache_dir)
+
+        counts = [(record.new, record.unchanged) for record in logs.records if record.getMessage() == "Files to ingest"]
+        self.assertEqual(counts, [(1, 1)])
+        with open(file_list) as f:
+            self.assertEqual(sorted(len(line.split("\t")) for line in f), [4, 4])
+
+        # The file list is still read by the log file statistics of the workflow
+        cwd = os.getcwd()
+        os.chdir(self.temp_dir)
+        try:
+            LogFileAnalyzer.plot_violin_for_protocols(file_list)
+        finally:
+            os.chdir(cwd)
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir, "file_size_violin_by_protocol.html")))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,8 +4,11 @@ Tests for new fields and error handling.
 """
 import unittest
 import os
+import gzip
+import shutil
+import tempfile
 import yaml
-from datetime import datetime
+from datetime import datetime, date
 from filedownloadstat.log_file_parser import LogFileParser
 
 
@@ -145,6 +148,30 @@ class TestLogParserExtended(unittest.TestCase):
         result = self.parser.clean_timestamp("2023-01-01T23:57:16Z")
         self.assertEqual(result, "2023-01-01T23:57:16")
 
+    def test_decode_timestamp(self):
+        """Test decode_timestamp for the millisecond and nanosecond log formats."""
+        self.assertEqual(self.parser.decode_timestamp("2024-09-13T23:58:17.000Z"), (date(2024, 9, 13), 2024, 9))
+        self.assertEqual(self.parser.decode_timestamp("2024-09-14T07:14:07.419698061Z"), (date(2024, 9, 14), 2024, 9))
+        # Layouts strptime accepts but slicing does not are still decoded
+        self.assertEqual(self.parser.decode_timestamp("2024-9-14T07:14:07.4Z"), (date(2024, 9, 14), 2024, 9))
+
+    def test_decode_timestamp_matches_strptime(self):
+        """Test decode_timestamp agrees with strptime on valid and malformed values."""
+        values = [
+            "2023-01-01T23:57:16.000Z", "2023-12-31T00:00:00.999999999Z", "2024-02-29T12:00:00.5Z",
+            "2023-02-30T10:00:00.000Z", "2023-01-01T24:00:00.000Z", "2023-01-01T23:57:16Z", "2023-13-01T00:00:00.000Z",
+            "not a timestamp", "",
+        ]
+        for value in values:
+            try:
+                parsed_time = datetime.strptime(self.parser.clean_timestamp(value), LogFileParser.DATETIME_FORMAT)
+                expected = (parsed_time.date(), parsed_time.year, parsed_time.month)
+            except ValueError:
+                with self.assertRaises(ValueError, msg=value):
+                    self.parser.decode_timestamp(value)
+            else:
+                self.assertEqual(self.parser.decode_timestamp(value), expected, msg=value)
+
     def test_parse_row_incomplete_status(self):
         """Test parsing row with incomplete status."""
         row = [
@@ -175,6 +202,58 @@ class TestLogParserExtended(unittest.TestCase):
         self.assertIsNotNone(parsed)
         self.assertEqual(parsed["completed"], "partial")
 
+    def test_parse_record_batches_matches_dict_batches(self):
+        """Test the columnar batch path yields the same rows as the dict path."""
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        log_file = os.path.join(temp_dir, "test_log.tsv.gz")
+        with gzip.open(log_file, "wt") as f:
+            for day in range(1, 6):
+                f.write(f"2023-01-0{day}T23:57:16.000Z\tuser{day}\t1\t/pride/data/archive/2016/12/PXD00424{day}/file.raw\tOUT\thash\tComplete\tUnited Kingdom\t{{geoip_region_name}}\tSawston\t52.1202,0.1845\thttp\tpublic\n")
+                f.write(f"2023-01-0{day}T23:57:16.000Z\tuser{day}\t1\t/other/archive/file.raw\tOUT\thash\tComplete\tUnited Kingdom\tA\tB\t1,2\thttp\tpublic\n")
+
+        parser = LogFileParser(
+            log_file,
+            resource_list=["/pride/data/archive"],
+            completeness_list=["complete"],
+            accession_pattern_list=["PXD\\d{6}"]
+        )
+        dict_rows = [row for batch in parser.parse_gzipped_tsv(2) for row in batch]
+        record_batches = list(parser.parse_record_batches(2))
+
+        self.assertEqual([batch.num_rows for batch in record_batches], [2, 2, 1])
+        self.assertEqual([row for batch in record_batches for row in batch.to_pylist()], dict_rows)
+        self.assertEqual(len(dict_rows), 5)
+
+    def test_parse_lines_prefilter(self):
+        """Test lines without a resource identifier or completeness status are skipped before splitting."""
+        parser = LogFileParser(
+            "",
+            resource_list=["/pride/data/archive"],
+            completeness_list=["complete"],
+            accession_pattern_list=["PXD\\d{6}"]
+        )
+        lines = [
+            b"2023-01-01T23:57:16.000Z\tuser\t1\t/pride/data/archive/2016/12/PXD004242/file.raw\tOUT\thash\tCOMPLETE\tUnited Kingdom\tA\tB\t1,2\thttp\tpublic\n",
+            b"2023-01-01T23:57:16.000Z\tuser\t1\t/other/archive/file.raw\tOUT\thash\tComplete\tUnited Kingdom\tA\tB\t1,2\thttp\tpublic\n",
+            b"2023-01-01T23:57:16.000Z\tuser\t1\t/pride/data/archive/2016/12/PXD004242/file.raw\tOUT\thash\tPartial\tUnited Kingdom\tA\tB\t1,2\thttp\tpublic\n",
+            b"2023-01-01T23:57:16.000Z\\tuser\\t1\\t/pride/data/archive/2016/12/PXD004242/file.raw\\tOUT\\thash\\tComplete\\tFrance\\tA\\tB\\t1,2\\thttp\\tpublic\n",
+        ]
+
+        fields = list(parser.parse_lines(lines))
+
+        self.assertEqual([row[4] for row in fields], ["PXD004242", "PXD004242"])
+        self.assertEqual([row[7] for row in fields], ["United Kingdom", "France"])
+        self.assertEqual(parser.parse_summary, {
+            "lines_read": 4, "lines_prefiltered": 2, "rows_parsed": 2, "skip_ratio": 0.5
+        })
+
+    def test_prefilter_disabled_for_escaped_identifiers(self):
+        """Test the pre-filter is not used when the literal '\\t' replacement could change a token."""
+        parser = LogFileParser("", ["/pride\\tarchive"], ["complete"], ["PXD\\d{6}"])
+        self.assertIsNone(parser._resource_tokens)
+        self.assertEqual(parser._completeness_tokens, (b"complete",))
+
 
 if __name__ == '__main__':
     unittest.main()
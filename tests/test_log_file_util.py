@@ -6,6 +6,7 @@ import tempfile
 import os
 import gzip
 from pathlib import Path
+import pyarrow.parquet as pq
 from filedownloadstat.log_file_util import FileUtil
 from filedownloadstat.exceptions import LogFileNotFoundError, LogFileCorruptedError
 
@@ -122,6 +123,84 @@ class TestFileUtil(unittest.TestCase):
             # This is acceptable if file doesn't match filters
             pass
 
+    def _write_log_file(self, relative_path, lines):
+        path = os.path.join(self.temp_dir, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with gzip.open(path, 'wt') as f:
+            f.writelines(lines)
+        return path
+
+    def test_process_log_files(self):
+        """Test process_log_files writes one parquet per file and a manifest."""
+        line = "2023-01-01T00:00:00.000Z\tuser_hash\t123\t/pride/data/archive/2023/01/PXD000001/file.raw\tOUT\thash\tComplete\tUnited Kingdom\tCambridgeshire\tCambridge\t52.2053,0.1218\thttp\tpublic\n"
+        other = line.replace("/pride/data/archive", "/biostudies")
+        files = [
+            self._write_log_file("http/public/a.log.tsv.gz", [line] * 3),
+            self._write_log_file("ftp/public/a.log.tsv.gz", [line, other]),  # Same file name, other protocol
+            self._write_log_file("ftp/public/b.log.tsv.gz", [other]),
+            os.path.join(self.temp_dir, "missing.log.tsv.gz"),
+        ]
+        file_list = os.path.join(self.temp_dir, "file_list.txt")
+        with open(file_list, "w") as f:
+            f.writelines(f"{path}\t{os.path.basename(path)}\t1\thttp\n" for path in files)
+        output_dir = os.path.join(self.temp_dir, "parquet")
+
+        for workers in (1, 2):
+            manifest = self.file_util.process_log_files(file_list, output_dir, ["/pride/data/archive"], ["complete"],
+                                                        1000, ["PXD\\d{6}"], workers=workers)
+            records = self.file_util.read_manifest(manifest)
+
+            self.assertEqual([record["path"] for record in records], files)
+            self.assertEqual([record["status"] for record in records], ["success", "success", "empty", "failed"])
+            self.assertIn("does not exist", records[3]["error"])
+            self.assertEqual([pq.read_metadata(record["output"]).num_rows for record in records[:2]], [3, 1])
+            self.assertNotEqual(records[0]["output"], records[1]["output"])
+            self.assertEqual(sorted(os.listdir(output_dir)),
+                             sorted([os.path.basename(record["output"]) for record in records[:2]] + ["manifest.tsv"]))
+
+    def test_process_log_files_slice(self):
+        """Test process_log_files only processes the requested slice of the file list."""
+        file_list = os.path.join(self.temp_dir, "file_list.txt")
+        with open(file_list, "w") as f:
+            f.writelines(f"{self.temp_dir}/missing{i}.tsv.gz\tmissing{i}.tsv.gz\t1\thttp\n" for i in range(5))
+
+        manifest = self.file_util.process_log_files(file_list, self.temp_dir, ["/pride/data/archive"], ["complete"],
+                                                    1000, ["PXD\\d{6}"], start=1, count=2)
+
+        self.assertEqual([os.path.basename(record["path"]) for record in self.file_util.read_manifest(manifest)],
+                         ["missing1.tsv.gz", "missing2.tsv.gz"])
+
+    def test_pack_work_units(self):
+        """Test files are packed into balanced units and oversized files get a shard unit."""
+        sizes = [5000, 900, 800, 700, 600, 500, 400, 300, 200, 100, 50, 50]
+        file_list = os.path.join(self.temp_dir, "file_list.txt")
+        with open(file_list, "w") as f:
+            f.writelines(f"/logs/http/public/f{i}.tsv.gz\tf{i}.tsv.gz\t{size}\thttp\n" for i, size in enumerate(sizes))
+        output_dir = os.path.join(self.temp_dir, "work_units")
+
+        manifest = self.file_util.pack_work_units(file_list, output_dir, target_bytes=1000, shard_threshold_bytes=4000)
+
+        with open(manifest) as f:
+            header = next(f).rstrip("\n").split("\t")
+            units = [dict(zip(header, line.rstrip("\n").split("\t"))) for line in f]
+        self.assertEqual([unit["kind"] for unit in units], ["shard", "pack", "pack", "pack", "pack", "pack"])
+        self.assertEqual(units[0]["size"], "5000")
+        self.assertTrue(all(900 <= int(unit["size"]) <= 1000 for unit in units[1:]))
+
+        unit_files = [self.file_util.read_file_metadata(os.path.join(output_dir, unit["file_list"])) for unit in units]
+        self.assertEqual([len(files) for files in unit_files], [int(unit["file_count"]) for unit in units])
+        self.assertEqual(sorted(f["size"] for files in unit_files for f in files), sorted(sizes))
+        self.assertEqual(unit_files[0][0], {"path": "/logs/http/public/f0.tsv.gz", "filename": "f0.tsv.gz",
+                                            "size": 5000, "protocol": "http"})
+
+    def test_pack_work_units_invalid_target(self):
+        """Test a non-positive unit size is rejected."""
+        file_list = os.path.join(self.temp_dir, "file_list.txt")
+        Path(file_list).touch()
+        with self.assertRaises(Exception) as context:
+            self.file_util.pack_work_units(file_list, self.temp_dir, target_bytes=0)
+        self.assertEqual(type(context.exception).__name__, "ValidationError")
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -5,11 +5,15 @@ import unittest
 import tempfile
 import os
 import json
+import shutil
+from unittest import mock
 import pandas as pd
 import pyarrow.parquet as pq
 import pyarrow as pa
 from datetime import date
 from filedownloadstat.parquet_analyzer import ParquetAnalyzer
+from filedownloadstat.parquet_reader import ParquetReader
+from filedownloadstat.parquet_writer import ParquetWriter, ParquetWriterProfile
 from filedownloadstat.exceptions import ParquetMergeError
 
 
@@ -235,6 +239,185 @@ class TestParquetAnalyzer(unittest.TestCase):
         analyzer.merge_parquet_files(file_list_path, output_file)
         self.assertTrue(os.path.exists(output_file))
 
+    def test_merge_parquet_files_keeps_writer_schema(self):
+        """Test the merged file has the ParquetWriter types, without pandas metadata or index column."""
+        analyzer = ParquetAnalyzer(batch_size=2)
+        file_list_path = os.path.join(self.temp_dir, "file_list.txt")
+        with open(file_list_path, 'w') as f:
+            f.write(f"{self.test_parquet_path}\n" * 2)
+
+        output_file = os.path.join(self.output_dir, "merged.parquet")
+        analyzer.merge_parquet_files(file_list_path, output_file)
+
+        merged = pq.read_table(output_file)
+        self.assertEqual(merged.column_names, ParquetWriter.schema.names)
+        self.assertNotIn(b"pandas", merged.schema.metadata or {})
+        self.assertEqual(merged.schema.field("month").type, pa.int8())
+        self.assertEqual(merged.schema.field("user").metadata, ParquetWriter.schema.field("user").metadata)
+        self.assertEqual(merged.num_rows, 6)
+        self.assertEqual(merged.column("date").to_pylist()[:3], pq.read_table(self.test_parquet_path).column("date").to_pylist())
+
+    def test_merge_compact_parquet_files(self):
+        """Test merging compact files keeps the compact physical types."""
+        analyzer = ParquetAnalyzer(batch_size=2)
+        file_list_path = os.path.join(self.temp_dir, "file_list.txt")
+        with open(file_list_path, 'w') as f:
+            for name in ("compact1.parquet", "compact2.parquet"):
+                compact_file = os.path.join(self.temp_dir, name)
+                writer = ParquetWriter(compact_file, write_strategy='batch', compact=True)
+                for batch in pq.read_table(self.test_parquet_path).to_batches():
+                    writer.write_record_batch(batch)
+                writer.finalize()
+                f.write(f"{compact_file}\n")
+
+        output_file = os.path.join(self.output_dir, "merged.parquet")
+        analyzer.merge_parquet_files(file_list_path, output_file)
+
+        merged = pq.read_table(output_file)
+        self.assertEqual(merged.num_rows, 6)
+        self.assertTrue(merged.schema.equals(ParquetWriter.COMPACT_SCHEMA, check_metadata=False))
+        self.assertEqual(sorted(merged.column("accession").to_pylist()), ["PXD000001"] * 4 + ["PXD000002"] * 2)
+
+    def test_merge_parquet_files_with_writer_profile(self):
+        """Test the merged file is encoded with the writer profile."""
+        analyzer = ParquetAnalyzer(batch_size=1)
+        file_list_path = os.path.join(self.temp_dir, "file_list.txt")
+        with open(file_list_path, 'w') as f:
+            f.write(f"{self.test_parquet_path}\n" * 2)
+
+        output_file = os.path.join(self.output_dir, "merged.parquet")
+        analyzer.merge_parquet_files(file_list_path, output_file, ParquetWriterProfile.load("zstd"))
+
+        metadata = pq.read_metadata(output_file)
+        self.assertEqual((metadata.num_rows, metadata.num_row_groups), (6, 1))
+        self.assertEqual(metadata.row_group(0).column(0).compression, "ZSTD")
+
+    def test_merge_partitioned_parquet_files(self):
+        """Test merging into a partitioned dataset, and merging that dataset back into a single file."""
+        analyzer = ParquetAnalyzer(batch_size=2)
+        file_list_path = os.path.join(self.temp_dir, "file_list.txt")
+        with open(file_list_path, 'w') as f:
+            f.write(f"{self.test_parquet_path}\n" * 2)
+
+        output_dir = os.path.join(self.output_dir, "merged.parquet")
+        analyzer.merge_parquet_files(file_list_path, output_dir, partitioned=True)
+        self.assertEqual(sorted(os.listdir(os.path.join(output_dir, "year=2023"))), ["month=1", "month=2"])
+
+        with open(file_list_path, 'w') as f:
+            f.write(f"{output_dir}\n")
+        self.assertEqual(analyzer.get_all_parquet_files(file_list_path), [output_dir])
+        output_file = os.path.join(self.output_dir, "remerged.parquet")
+        analyzer.merge_parquet_files(file_list_path, output_file)
+
+        merged = pq.read_table(output_file)
+        self.assertEqual(merged.column_names, pq.read_table(self.test_parquet_path).column_names)
+        self.assertEqual(sorted(merged.column("month").to_pylist()), [1, 1, 1, 1, 2, 2])
+
+    def _write_parts(self, count):
+        """Write count copies of the test file, and a file list of them."""
+        file_list_path = os.path.join(self.temp_dir, "file_list.txt")
+        with open(file_list_path, 'w') as f:
+            for index in range(count):
+                path = os.path.join(self.temp_dir, "parts", f"input{index:02d}.parquet")
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                shutil.copyfile(self.test_parquet_path, path)
+                f.write(f"{path}\n")
+        return file_list_path
+
+    def test_plan_parts(self):
+        """Test consecutive inputs are grouped into parts of about part_bytes."""
+        file_list_path = self._write_parts(5)
+        paths = ParquetAnalyzer().get_all_parquet_files(file_list_path)
+        size = os.path.getsize(paths[0])
+
+        self.assertEqual(ParquetAnalyzer.plan_parts(paths, size * 2), [paths[0:2], paths[2:4], paths[4:5]])
+        self.assertEqual(ParquetAnalyzer.plan_parts(paths, 1), [[path] for path in paths])
+
+    def test_tree_merge_matches_single_pass(self):
+        """Test merging parts from worker processes writes the rows of a single-pass merge, in order."""
+        file_list_path = self._write_parts(6)
+        single_pass = os.path.join(self.output_dir, "single.parquet")
+        tree = os.path.join(self.output_dir, "tree.parquet")
+        part_bytes = os.path.getsize(self.test_parquet_path) * 2
+        ParquetAnalyzer().merge_parquet_files(file_list_path, single_pass)
+        ParquetAnalyzer().merge_parquet_files(file_list_path, tree, workers=2, part_bytes=part_bytes)
+
+        self.assertTrue(pq.read_table(tree).equals(pq.read_table(single_pass)))
+        self.assertEqual([name for name in os.listdir(self.output_dir) if name.startswith(".merge-")], [])
+
+    def test_merge_directory_into_dataset_output(self):
+        """Test a directory of parts merges into a multi-file dataset with a _metadata summary."""
+        self._write_parts(5)
+        output_dir = os.path.join(self.output_dir, "merged")
+        part_bytes = os.path.getsize(self.test_parquet_path) * 2
+        ParquetAnalyzer().merge_parquet_files(os.path.join(self.temp_dir, "parts"), output_dir,
+                                              part_bytes=part_bytes, dataset_output=True)
+
+        self.assertEqual(sorted(os.listdir(output_dir)),
+                         ["_metadata", "part-00000.parquet", "part-00001.parquet", "part-00002.parquet"])
+        metadata = pq.read_metadata(os.path.join(output_dir, "_metadata"))
+        self.assertEqual((metadata.num_rows, metadata.num_row_groups), (15, 5))
+        merged = ParquetReader().read(output_dir)
+        self.assertEqual(merged.num_rows, 15)
+        self.assertEqual(merged.column_names, ParquetWriter.schema.names)
+
+        with self.assertRaises(Exception) as context:
+            ParquetAnalyzer().merge_parquet_files(os.path.join(self.temp_dir, "parts"), output_dir,
+                                                  partitioned=True, dataset_output=True)
+        self.assertEqual(type(context.exception).__name__, "ValidationError")
+
+    def test_plan_row_groups(self):
+        """Test consecutive row groups are split into runs of about equal rows."""
+        self.assertEqual(ParquetAnalyzer.plan_row_groups([10, 10, 10, 10, 10, 10], 3), [[0, 1], [2, 3], [4, 5]])
+        self.assertEqual(ParquetAnalyzer.plan_row_groups([50, 5, 5, 5, 5], 2), [[0], [1, 2, 3, 4]])
+        self.assertEqual(ParquetAnalyzer.plan_row_groups([10, 10], 8), [[0], [1]])
+
+    def test_parallel_analysis_matches_single_thread(self):
+        """Test worker processes combine into the counts and all_data export of a single-thread analysis."""
+        self._write_parts(6)
+        results = []
+        for workers in (1, 3):
+            persisted = {}
+            output_dir = os.path.join(self.output_dir, f"workers{workers}")
+            os.makedirs(output_dir)
+            names = ["project.json", "file.json", "yearly.json", "top.json", "all_data.json"]
+            with mock.patch.object(ParquetAnalyzer, "persist_project_level_yearly_download_counts",
+                                   lambda analyzer, df, output_file: persisted.update(yearly=df)):
+                ParquetAnalyzer(batch_size=2).analyze_parquet_files(
+                    os.path.join(self.temp_dir, "parts"), *[os.path.join(output_dir, name) for name in names],
+                    workers=workers)
+            outputs = {name: open(os.path.join(output_dir, name)).read() for name in names if name != "yearly.json"}
+            results.append((outputs, persisted["yearly"].values.tolist()))
+            self.assertEqual([name for name in os.listdir(output_dir) if name.startswith(".analysis-")], [])
+
+        self.assertEqual(results[1], results[0])
+        self.assertEqual(len(json.loads(results[0][0]["all_data.json"])), 18)
+        self.assertEqual(json.loads(results[0][0]["project.json"])[0]["count"], 12)
+
+    def test_compact_all_data_export_matches_standard(self):
+        """Test the all_data export of a compact file is the export of the standard file, but for nanoseconds."""
+        rows = pq.read_table(self.test_parquet_path).to_pylist()
+        for index, row in enumerate(rows):
+            row["user"] = f"{index:040x}"
+        rows[2]["timestamp"] = "2023-02-01T08:07:31.419698061Z"
+        standard = os.path.join(self.temp_dir, "standard.parquet")
+        compact = os.path.join(self.temp_dir, "compact.parquet")
+        for path, is_compact in ((standard, False), (compact, True)):
+            writer = ParquetWriter(path, write_strategy='batch', compact=is_compact)
+            writer.write_record_batch(pa.RecordBatch.from_pylist(rows, schema=ParquetWriter.schema))
+            writer.finalize()
+
+        exports = []
+        for path in (standard, compact):
+            all_data = os.path.join(self.output_dir, os.path.basename(path) + ".json")
+            ParquetAnalyzer().aggregate(path, all_data)
+            with open(all_data) as f:
+                exports.append(json.load(f))
+
+        self.assertEqual(exports[1][:2], exports[0][:2])
+        self.assertEqual([row["timestamp"] for row in exports[1]],
+                         ["2023-01-01T00:00:00.000Z", "2023-01-02T00:00:00.000Z", "2023-02-01T08:07:31.419698Z"])
+
     def test_merge_parquet_files_with_no_files_raises_error(self):
         """Test merge_parquet_files raises ParquetMergeError when no files found."""
         analyzer = ParquetAnalyzer()
@@ -0,0 +1,148 @@
+"""
+Unit tests for the content-addressed ParquetCache.
+"""
+import unittest
+import tempfile
+import os
+import gzip
+import shutil
+import pyarrow as pa
+import pyarrow.parquet as pq
+from unittest.mock import patch
+
+from filedownloadstat import parquet_cache
+from filedownloadstat.parquet_cache import ParquetCache
+from filedownloadstat.log_file_parser import LogFileParser
+from filedownloadstat.log_file_util import FileUtil
+
+
+LOG_LINE = "2023-01-01T00:00:00.000Z\tuser_hash\t123\t/pride/data/archive/2023/01/PXD000001/file.raw\tOUT\thash\tComplete\tUnited Kingdom\tCambridgeshire\tCambridge\t52.2053,0.1218\thttp\tpublic\n"
+
+
+class TestParquetCache(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.temp_dir, "cache")
+        self.cache = ParquetCache(self.cache_dir)
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def _write(self, name, content=b"content"):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    def _parquet(self, name, rows):
+        path = os.path.join(self.temp_dir, name)
+        pq.write_table(pa.table({"value": list(range(rows))}), path)
+        return path
+
+    def test_content_key(self):
+        """Test the key follows the content, parser version and configuration, not the path."""
+        key = self.cache.content_key(self._write("a.tsv.gz"), "config")
+
+        self.assertEqual(len(key), 40)
+        self.assertEqual(key, self.cache.content_key(self._write("b.tsv.gz"), "config"))
+        self.assertNotEqual(key, self.cache.content_key(self._write("c.tsv.gz", b"other"), "config"))
+        self.assertNotEqual(key, self.cache.content_key(self._write("a.tsv.gz"), "other config"))
+        with patch.object(parquet_cache.LogFileParser, "PARSER_VERSION", "next"):
+            self.assertNotEqual(key, self.cache.content_key(self._write("a.tsv.gz"), "config"))
+
+    def test_store_and_restore(self):
+        """Test stored outputs and empty markers are restored."""
+        self.assertIsNone(self.cache.lookup("ab" * 20))
+        self.cache.store("ab" * 20, self._parquet("out.parquet", 3))
+        self.cache.store("cd" * 20, None)
+
+        restored = os.path.join(self.temp_dir, "restored.parquet")
+        self.assertTrue(self.cache.restore(self.cache.lookup("ab" * 20), restored))
+        self.assertEqual(pq.read_metadata(restored).num_rows, 3)
+        self.assertFalse(self.cache.restore(self.cache.lookup("cd" * 20), os.path.join(self.temp_dir, "none.parquet")))
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, "none.parquet")))
+
+    def test_prune_evicts_least_recently_used(self):
+        """Test prune keeps the most recently used objects within the size bound."""
+        keys = ["a1" * 20, "b2" * 20, "c3" * 20]
+        for age, key in enumerate(keys):
+            object_path = self.cache.store(key, self._parquet(f"{key}.parquet", 100))
+            os.utime(object_path, (1000 + age, 1000 + age))
+        os.utime(self.cache.lookup(keys[0]))  # A hit makes the oldest object the most recently used
+        size = self.cache.stats()["bytes"] // 3
+
+        result = self.cache.prune(2 * size)
+
+        self.assertEqual(result["removed_objects"], 1)
+        self.assertIsNone(self.cache.lookup(keys[1]))
+        self.assertIsNotNone(self.cache.lookup(keys[0]))
+        self.assertIsNotNone(self.cache.lookup(keys[2]))
+        self.assertEqual(self.cache.stats()["objects"], 2)
+
+    def test_store_enforces_max_bytes(self):
+        """Test a bounded cache prunes itself after storing."""
+        cache = ParquetCache(self.cache_dir, max_bytes=1)
+        cache.store("ef" * 20, self._parquet("out.parquet", 10))
+
+        self.assertEqual(cache.stats()["objects"], 0)
+
+    def test_retry_on_copied_file_is_a_cache_hit(self):
+        """Test the same log content under another path reuses the cached output."""
+        log_files = [os.path.join(self.temp_dir, directory, "test.log.tsv.gz") for directory in ("first", "retry")]
+        for log_file in log_files:
+            os.makedirs(os.path.dirname(log_file))
+        with gzip.open(log_files[0], "wt") as f:
+            f.write(LOG_LINE * 4)
+        shutil.copyfile(log_files[0], log_files[1])
+
+        parsed = []
+
+        class CountingParser(LogFileParser):
+            def parse_record_batches(self, batch_size, source=None):
+                parsed.append(self.file_path)
+                return super().parse_record_batches(batch_size, source)
+
+        file_util = FileUtil(parser_factory=CountingParser)
+        outputs = []
+        for log_file in log_files:
+            outputs.append(log_file.replace(".log.tsv.gz", ".parquet"))
+            self.assertTrue(file_util.process_log_file(log_file, outputs[-1], ["/pride/data/archive"], ["complete"],
+                                                       1000, ["PXD\\d{6}"], cache_dir=self.cache_dir))
+
+        self.assertEqual(parsed, log_files[:1])
+        self.assertTrue(pq.read_table(outputs[1]).equals(pq.read_table(outputs[0])))
+
+    def test_reparse_to_same_output_keeps_cached_object(self):
+        """Test parsing a changed log to the same output leaves the object cached for the old log intact."""
+        log_file = os.path.join(self.temp_dir, "test.log.tsv.gz")
+        output = os.path.join(self.temp_dir, "out.parquet")
+        file_util = FileUtil()
+        for line_count in (5, 50):
+            with gzip.open(log_file, "wt") as f:
+                f.write(LOG_LINE * line_count)
+            self.assertTrue(file_util.process_log_file(log_file, output, ["/pride/data/archive"], ["complete"],
+                                                       1000, ["PXD\\d{6}"], cache_dir=self.cache_dir))
+
+        self.assertEqual(pq.read_metadata(output).num_rows, 50)
+        self.assertEqual(self.cache.stats()["objects"], 2)
+        object_rows = sorted(pq.read_metadata(path).num_rows for _, _, path in self.cache._list_objects())
+        self.assertEqual(object_rows, [5, 50])
+        for _, _, path in self.cache._list_objects():
+            self.assertFalse(os.path.samefile(path, output))
+
+    def test_restore_does_not_alias_object(self):
+        """Test overwriting a restored output leaves the cached object unchanged."""
+        object_path = self.cache.store("ab" * 20, self._parquet("out.parquet", 3))
+        restored = os.path.join(self.temp_dir, "restored.parquet")
+        self.cache.restore(object_path, restored)
+        pq.write_table(pa.table({"value": list(range(10))}), restored)
+
+        self.assertEqual(pq.read_metadata(object_path).num_rows, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
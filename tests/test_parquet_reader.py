@@ -4,10 +4,13 @@ Unit tests for ParquetReader class.
 import unittest
 import tempfile
 import os
+import shutil
 import pyarrow.parquet as pq
 import pyarrow as pa
 from datetime import date
 from filedownloadstat.parquet_reader import ParquetReader
+from filedownloadstat.parquet_writer import ParquetWriter
+from filedownloadstat.date_window import DateWindow
 from filedownloadstat.exceptions import ParquetReadError, ValidationError
 
 
@@ -77,6 +80,54 @@ class TestParquetReader(unittest.TestCase):
         self.assertIsInstance(result, pa.Table)
         self.assertEqual(len(result), 1)
 
+    def test_read_partitioned_dataset(self):
+        """Test a partitioned dataset reads as a single file, and filtered partitions are not opened."""
+        output = os.path.join(self.temp_dir, "partitioned")
+        writer = ParquetWriter(output, write_strategy='batch', partitioned=True)
+        table = pq.read_table(self.test_parquet_path)
+        writer.write_record_batch(table.to_batches()[0])
+        writer.write_record_batch(pa.RecordBatch.from_pylist([dict(table.to_pylist()[0], date=date(2024, 5, 1), year=2024, month=5)],
+                                                             schema=ParquetWriter.schema))
+        writer.finalize()
+
+        reader = ParquetReader()
+        result = reader.read(output)
+        self.assertEqual(result.column_names, ParquetWriter.schema.names)
+        self.assertEqual(result.column("year").type, pa.int16())
+        self.assertEqual(sorted(result.column("year").to_pylist()), [2023, 2024])
+
+        # A skipped year is pruned from the directory names, so even an unreadable file is not opened
+        with open(os.path.join(output, "year=2024", "month=5", "part-0.parquet"), "wb") as f:
+            f.write(b"not parquet")
+        result = reader.read(output, filters=DateWindow(skipped_years=[2024]).partition_filters())
+        self.assertTrue(result.equals(reader.read(self.test_parquet_path)))
+
+    def test_read_per_file_outputs(self):
+        """Test per-file outputs read as one table from a directory, a file list or a process_log_files manifest."""
+        parts_dir = os.path.join(self.temp_dir, "parts")
+        os.makedirs(parts_dir)
+        parts = []
+        for index in range(3):
+            parts.append(os.path.join(parts_dir, f"part{index}.parquet"))
+            shutil.copyfile(self.test_parquet_path, parts[-1])
+        manifest = os.path.join(parts_dir, "manifest.tsv")
+        with open(manifest, "w") as f:
+            f.write("path\toutput\tstatus\tseconds\terror\n")
+            f.write(f"a.tsv.gz\t{parts[0]}\tsuccess\t1.0\t\n")
+            f.write(f"b.tsv.gz\t{parts[1]}\tfailed\t1.0\tboom\n")
+        file_list = os.path.join(self.temp_dir, "file_list.txt")
+        with open(file_list, "w") as f:
+            f.write(f"{parts[2]}\n{os.path.join(self.temp_dir, 'missing.parquet')}\n{parts_dir}\n")
+
+        self.assertEqual(ParquetReader.resolve_paths(parts_dir), parts)
+        self.assertEqual(ParquetReader.resolve_paths(manifest), parts[:1])
+        self.assertEqual(ParquetReader.resolve_paths(file_list), parts[2:] + parts)
+
+        reader = ParquetReader()
+        self.assertEqual(reader.read(parts_dir).num_rows, 3)
+        self.assertEqual(reader.read(file_list).num_rows, 4)
+        self.assertEqual(reader.read(manifest).column_names, ParquetWriter.schema.names)
+
     def test_read_none_path_raises_validation_error(self):
         """Test read with None path raises ValidationError."""
         reader = ParquetReader()
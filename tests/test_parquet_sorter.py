@@ -0,0 +1,105 @@
+"""
+Unit tests for the ParquetSorter.
+"""
+import unittest
+import tempfile
+import os
+import shutil
+import pyarrow as pa
+import pyarrow.parquet as pq
+from datetime import date
+
+from filedownloadstat.parquet_sorter import ParquetSorter
+from filedownloadstat.parquet_writer import ParquetWriter
+from filedownloadstat.parquet_reader import ParquetReader
+from filedownloadstat.parquet_analyzer import ParquetAnalyzer
+
+
+class TestParquetSorter(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.inputs = []
+        for part in range(2):
+            rows = [
+                {"date": date(2023, 1 + i % 3, 1 + (i * 7 + part) % 28), "year": 2023, "month": 1 + i % 3,
+                 "user": f"user{i}", "accession": f"PXD{(i * 13 + part) % 7:06d}", "filename": f"file{part}_{i}.raw"}
+                for i in range(40)
+            ]
+            path = os.path.join(self.temp_dir, f"input{part}.parquet")
+            pq.write_table(pa.Table.from_pylist(rows, schema=ParquetWriter.project_schema(list(rows[0]))), path)
+            self.inputs.append(path)
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    @staticmethod
+    def _keys(table):
+        return list(zip(table.column("accession").to_pylist(), table.column("date").to_pylist()))
+
+    def test_sort_in_memory(self):
+        """Test the rows of every input are written once, sorted by accession and date."""
+        output = os.path.join(self.temp_dir, "sorted.parquet")
+        self.assertEqual(ParquetSorter().sort(self.inputs, output), 80)
+
+        table = pq.read_table(output)
+        self.assertEqual(self._keys(table), sorted(self._keys(table)))
+        self.assertEqual(sorted(table.column("filename").to_pylist()),
+                         sorted(pq.read_table(self.inputs[0]).column("filename").to_pylist()
+                                + pq.read_table(self.inputs[1]).column("filename").to_pylist()))
+        sorting_columns = pq.read_metadata(output).row_group(0).sorting_columns
+        self.assertEqual([table.column_names[column.column_index] for column in sorting_columns], ["accession", "date"])
+
+    def test_sort_in_runs_matches_sort_in_memory(self):
+        """Test inputs larger than max_rows_in_memory are sorted in runs to the same output."""
+        in_memory = os.path.join(self.temp_dir, "in_memory.parquet")
+        in_runs = os.path.join(self.temp_dir, "in_runs.parquet")
+        ParquetSorter(batch_size=7).sort(self.inputs, in_memory)
+        ParquetSorter(batch_size=7, max_rows_in_memory=25).sort(self.inputs, in_runs)
+
+        self.assertTrue(pq.read_table(in_runs).equals(pq.read_table(in_memory)))
+        self.assertEqual([name for name in os.listdir(self.temp_dir) if name.startswith(".sort-")], [])
+
+    def test_sort_compact_partitioned_output(self):
+        """Test compact inputs are sorted by their decoded accessions, within each month of a partitioned output."""
+        compact_input = os.path.join(self.temp_dir, "compact.parquet")
+        writer = ParquetWriter(compact_input, write_strategy='batch', compact=True,
+                               columns=ParquetReader.open_dataset(self.inputs[0]).schema.names)
+        for batch in pq.read_table(self.inputs[0]).to_batches():
+            writer.write_record_batch(batch)
+        writer.finalize()
+
+        output = os.path.join(self.temp_dir, "sorted")
+        ParquetSorter(max_rows_in_memory=15).sort([compact_input], output, partitioned=True)
+
+        self.assertEqual(sorted(os.listdir(os.path.join(output, "year=2023"))), ["month=1", "month=2", "month=3"])
+        january = pq.read_table(os.path.join(output, "year=2023", "month=1", "part-0.parquet"), partitioning=None)
+        self.assertEqual(january.column("accession").type, pa.dictionary(pa.int32(), pa.string()))
+        keys = [(str(accession), day) for accession, day in self._keys(january)]
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(ParquetReader().read(output).num_rows, 40)
+
+    def test_unknown_sort_column_raises(self):
+        """Test sorting by a column the inputs do not have raises a ValidationError."""
+        with self.assertRaises(Exception) as context:
+            ParquetSorter().sort(self.inputs, os.path.join(self.temp_dir, "sorted.parquet"), "country")
+        self.assertEqual(type(context.exception).__name__, "ValidationError")
+
+    def test_merge_parquet_files_with_sort_by(self):
+        """Test the merge step sorts the merged rows when sort_by is given."""
+        file_list_path = os.path.join(self.temp_dir, "file_list.txt")
+        with open(file_list_path, "w") as f:
+            f.write("\n".join(self.inputs) + "\n")
+        output = os.path.join(self.temp_dir, "merged.parquet")
+        ParquetAnalyzer().merge_parquet_files(file_list_path, output, sort_by=ParquetSorter.parse_sort_by("accession, date"))
+
+        table = pq.read_table(output)
+        self.assertEqual(table.num_rows, 80)
+        self.assertEqual(self._keys(table), sorted(self._keys(table)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,7 +7,7 @@ import os
 import pyarrow.parquet as pq
 import pyarrow as pa
 from datetime import date
-from filedownloadstat.parquet_writer import ParquetWriter
+from filedownloadstat.parquet_writer import ParquetWriter, ParquetWriterProfile
 from filedownloadstat.exceptions import ParquetWriteError, ValidationError
 
 
@@ -138,6 +138,141 @@ class TestParquetWriter(unittest.TestCase):
         self.assertTrue(result)
         self.assertTrue(os.path.exists(self.test_parquet_path))
 
+    def test_write_record_batch(self):
+        """Test write_record_batch writes columnar batches after buffered rows."""
+        writer = ParquetWriter(self.test_parquet_path, write_strategy='batch', batch_size=10)
+        row = {
+            "date": date(2023, 1, 1),
+            "year": 2023,
+            "month": 1,
+            "user": "test_user",
+            "accession": "PXD000001",
+            "filename": "test.raw",
+            "completed": "complete",
+            "country": "United Kingdom",
+            "method": "http",
+            "timestamp": "2023-01-01T00:00:00.000Z",
+            "geoip_region_name": "Cambridgeshire",
+            "geoip_city_name": "Cambridge",
+            "geo_location": "52.2053,0.1218"
+        }
+        writer.write_batch([row])
+        batch = pa.RecordBatch.from_pylist([dict(row, accession="PXD000002")] * 3, schema=ParquetWriter.schema)
+
+        self.assertTrue(writer.write_record_batch(batch))
+        self.assertFalse(writer.write_record_batch(batch.slice(0, 0)))
+        writer.finalize()
+
+        table = pq.read_table(self.test_parquet_path)
+        self.assertEqual(table.column("accession").to_pylist(), ["PXD000001"] + ["PXD000002"] * 3)
+
+    def test_project_schema(self):
+        """Test a projection keeps the requested columns in schema order and rejects unknown ones."""
+        self.assertEqual(ParquetWriter.project_schema(["country", "date", " year"]).names, ["date", "year", "country"])
+        self.assertTrue(ParquetWriter.project_schema(None).equals(ParquetWriter.schema))
+        with self.assertRaises(Exception) as context:
+            ParquetWriter.project_schema(["date", "ip_address"])
+        self.assertEqual(type(context.exception).__name__, "ValidationError")
+
+    def test_write_record_batch_with_columns(self):
+        """Test a projected writer only writes its columns."""
+        writer = ParquetWriter(self.test_parquet_path, write_strategy='batch', columns=["accession", "date"])
+        batch = pa.RecordBatch.from_pylist(
+            [{"date": date(2023, 1, 1), "accession": "PXD000001", "country": "France"}],
+            schema=ParquetWriter.schema
+        )
+
+        self.assertTrue(writer.write_record_batch(batch))
+        writer.finalize()
+
+        self.assertEqual(pq.read_table(self.test_parquet_path).column_names, ["date", "accession"])
+
+    def test_write_record_batch_compact(self):
+        """Test a compact writer converts standard batches to the compact physical types and back."""
+        user = "86f7e437faa5a7fce15d1ddcb9eaeaea377667b8"
+        rows = [
+            {"date": date(2023, 1, 1), "user": user, "country": "France", "timestamp": "2023-01-01T10:11:12.123456789Z"},
+            {"date": date(2023, 1, 2), "user": "test_user", "country": "France", "timestamp": "2023-01-02T00:00:00Z"},
+        ]
+        writer = ParquetWriter(self.test_parquet_path, write_strategy='batch', compact=True)
+        self.assertTrue(writer.write_record_batch(pa.RecordBatch.from_pylist(rows, schema=ParquetWriter.schema)))
+        writer.write_batch(rows[:1])
+        writer.finalize()
+
+        table = pq.read_table(self.test_parquet_path)
+        self.assertTrue(table.schema.equals(ParquetWriter.COMPACT_SCHEMA))
+        self.assertTrue(ParquetWriter.is_compact(table.schema))
+        self.assertFalse(ParquetWriter.is_compact(ParquetWriter.schema))
+        self.assertEqual(table.column("user").to_pylist()[0], bytes.fromhex(user))
+        self.assertEqual(len(table.column("user").to_pylist()[1]), 20)
+        self.assertEqual(table.column("country").type, pa.dictionary(pa.int32(), pa.string()))
+
+        readable = ParquetWriter.readable_batch(table.combine_chunks().to_batches()[0])
+        self.assertEqual(readable.column("user").to_pylist()[0::2], [user, user])
+        self.assertEqual(readable.column("timestamp").to_pylist(),
+                         ["2023-01-01T10:11:12.123456Z", "2023-01-02T00:00:00.000Z", "2023-01-01T10:11:12.123456Z"])
+        self.assertEqual(readable.column("date").to_pylist()[1], date(2023, 1, 2))
+
+    def test_write_batch_keeps_row_order(self):
+        """Test rows buffered over several calls are written once each, in order."""
+        writer = ParquetWriter(self.test_parquet_path, write_strategy='batch', batch_size=3, columns=["filename"])
+        writer.write_batch([{"filename": f"file{i}"} for i in range(10)])
+        writer.write_batch([{"filename": f"file{i}"} for i in range(10, 12)])
+        writer.write_record_batch(pa.RecordBatch.from_pylist([{"filename": "file12"}], schema=writer.schema))
+        writer.write_batch([{"filename": "file13"}])
+        writer.finalize()
+
+        self.assertEqual(pq.read_table(self.test_parquet_path).column("filename").to_pylist(),
+                         [f"file{i}" for i in range(14)])
+
+    def test_load_writer_profile(self):
+        """Test profiles load from a name or JSON settings and reject unknown ones."""
+        self.assertTrue(ParquetWriterProfile.load(None).is_default())
+        self.assertEqual(ParquetWriter.COMPRESSION, ParquetWriterProfile.load(None).compression)
+        self.assertEqual(ParquetWriter.COMPRESSION, "snappy")
+        self.assertEqual(ParquetWriterProfile.load("zstd").compression, "zstd")
+        profile = ParquetWriterProfile.load('{"profile": "indexed", "row_group_rows": 500}')
+        self.assertEqual((profile.row_group_rows, profile.bloom_filter_columns), (500, ["accession", "user"]))
+        self.assertEqual(ParquetWriterProfile.load({"compression": "gzip"}).compression, "gzip")
+        for invalid in ("fastest", '{"codec": "zstd"}', '{"compression": "lzo"}', '{"row_group_rows": 0}'):
+            with self.assertRaises(Exception) as context:
+                ParquetWriterProfile.load(invalid)
+            self.assertEqual(type(context.exception).__name__, "ValidationError")
+
+    def test_write_record_batch_with_profile(self):
+        """Test a profile with a row-group target coalesces batches into row groups of that size."""
+        profile = ParquetWriterProfile(compression="zstd", row_group_rows=250, bloom_filter_columns=["accession"])
+        writer = ParquetWriter(self.test_parquet_path, write_strategy='batch', columns=["accession", "year"],
+                               profile=profile)
+        table = pa.Table.from_pylist([{"accession": f"PXD{i:06d}", "year": 2023} for i in range(600)],
+                                     schema=writer.schema)
+        for batch in table.to_batches(max_chunksize=100):
+            writer.write_record_batch(batch)
+        writer.finalize()
+
+        metadata = pq.read_metadata(self.test_parquet_path)
+        self.assertEqual([metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)], [250, 250, 100])
+        self.assertEqual(metadata.row_group(0).column(0).compression, "ZSTD")
+        self.assertTrue(pq.read_table(self.test_parquet_path).equals(table))
+
+    def test_write_record_batch_partitioned(self):
+        """Test a partitioned writer writes one file per month, without the year and month columns."""
+        output = os.path.join(self.temp_dir, "partitioned")
+        writer = ParquetWriter(output, write_strategy='batch', columns=["year", "month", "filename"], partitioned=True)
+        rows = [{"year": 2023, "month": month, "filename": f"file{i}"} for i, month in enumerate([1, 2, 1, 12, 2])]
+        writer.write_record_batch(pa.RecordBatch.from_pylist(rows[:3], schema=writer.schema))
+        writer.write_record_batch(pa.RecordBatch.from_pylist(rows[3:], schema=writer.schema))
+        writer.finalize()
+
+        self.assertEqual(sorted(os.listdir(os.path.join(output, "year=2023"))), ["month=1", "month=12", "month=2"])
+        january = pq.read_table(os.path.join(output, "year=2023", "month=1", "part-0.parquet"), partitioning=None)
+        self.assertEqual(january.column_names, ["filename"])
+        self.assertEqual(january.column("filename").to_pylist(), ["file0", "file2"])
+
+        with self.assertRaises(Exception) as context:
+            ParquetWriter(output, columns=["filename"], partitioned=True)
+        self.assertEqual(type(context.exception).__name__, "ValidationError")
+
     def test_write_all_raises_on_invalid_directory(self):
         """Test write_all raises ParquetWriteError on invalid directory."""
         writer = ParquetWriter("/invalid/path/test.parquet")
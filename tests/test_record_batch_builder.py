@@ -0,0 +1,43 @@
+"""
+Unit tests for RecordBatchBuilder class.
+"""
+import unittest
+import pyarrow as pa
+from datetime import date
+from filedownloadstat.record_batch_builder import RecordBatchBuilder
+
+
+class TestRecordBatchBuilder(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.schema = pa.schema([
+            pa.field('date', pa.date64()),
+            pa.field('year', pa.int16()),
+            pa.field('accession', pa.string()),
+        ])
+
+    def test_build_returns_typed_batch(self):
+        """Test rows are turned into columns with the schema types."""
+        builder = RecordBatchBuilder(self.schema)
+        builder.append((date(2023, 1, 1), 2023, "PXD000001"))
+        builder.append((date(2023, 1, 2), 2023, "PXD000002"))
+        self.assertEqual(len(builder), 2)
+
+        batch = builder.build()
+        self.assertTrue(batch.schema.equals(self.schema))
+        self.assertEqual(batch.column("accession").to_pylist(), ["PXD000001", "PXD000002"])
+        self.assertEqual(batch.column("date").to_pylist(), [date(2023, 1, 1), date(2023, 1, 2)])
+
+    def test_build_resets_buffers(self):
+        """Test the builder is empty after a batch was built."""
+        builder = RecordBatchBuilder(self.schema)
+        builder.append((date(2023, 1, 1), 2023, "PXD000001"))
+        builder.build()
+
+        self.assertEqual(len(builder), 0)
+        self.assertEqual(builder.build().num_rows, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()